@@ -0,0 +1,170 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cubo import CuboFormacoes
+
+# Anos analisados (mesmo recorte de efeito_pandemia.sql)
+ANOS = range(2010, 2024)
+# Tendência ajustada só com anos sem pandemia
+ANOS_TENDENCIA = range(2010, 2020)
+# Períodos de efeito_pandemia.sql
+ANOS_PRE = range(2015, 2020)
+ANOS_POS = range(2022, 2024)
+# Fração de cada ano sob pandemia: 2020 teve metade do ano com pandemia
+PESO_PANDEMIA = {2020: 0.5, 2021: 1.0}
+# Dados de 2023 estão incompletos: aparecem na série, mas ficam fora das médias
+ANOS_INCOMPLETOS = (2023,)
+
+DIMENSOES = ['tipo_formacao', 'genero', 'flag_bolsa', 'regiao_instituicao', 'uf_instituicao', 'grande_area']
+
+
+def matriz_anual(cubo, dimensoes=DIMENSOES, ano='ano_conclusao'):
+    """Matriz ano x subgrupo com as contagens de formações
+
+    As colunas são um MultiIndex (dimensao, grupo), começando pelo total geral.
+    Todos os roll-ups vêm do cubo, sem reler as formações.
+    """
+    filtros = {ano: ANOS}
+    blocos = [cubo.rollup([ano], filtros).set_index(ano)['qtd'].rename(('total', 'total')).to_frame()]
+    for dim in dimensoes:
+        contagens = cubo.rollup([ano, dim], filtros)
+        matriz = contagens.pivot_table(index=ano, columns=dim, values='qtd', aggfunc='sum', observed=True)
+        matriz.columns = pd.MultiIndex.from_tuples([(dim, str(grupo)) for grupo in matriz.columns])
+        blocos.append(matriz)
+    matriz = pd.concat(blocos, axis=1).reindex(list(ANOS)).fillna(0)
+    matriz.index.name = 'ano'
+    matriz.columns.names = ['dimensao', 'grupo']
+    return matriz
+
+
+def matriz_area(parquet_file, ano='ano_conclusao'):
+    """Matriz ano x área (área não está no cubo; lida do Parquet processado)"""
+    df = pq.read_table(parquet_file, columns=[ano, 'area']).to_pandas()
+    df = df[df[ano].isin(ANOS)]
+    areas = df['area'].astype(object).str.split(r';\s*', regex=True)
+    df = df.assign(area=areas).explode('area')
+    df = df[df['area'].notna() & (df['area'] != '')]
+    matriz = df.groupby([ano, 'area']).size().unstack(fill_value=0).reindex(list(ANOS)).fillna(0)
+    matriz.columns = pd.MultiIndex.from_tuples([('area', grupo) for grupo in matriz.columns])
+    matriz.index.name = 'ano'
+    matriz.columns.names = ['dimensao', 'grupo']
+    return matriz
+
+
+class AnalisePandemia:
+    """Efeito da pandemia em todos os subgrupos de uma vez
+
+    Recebe a matriz ano x subgrupo (matriz_anual) e, numa única passada
+    vetorizada sobre todas as colunas: ajusta a tendência linear de 2010-2019,
+    projeta o esperado para os anos seguintes, calcula os resíduos (observado -
+    esperado) e as médias dos períodos de efeito_pandemia.sql.
+
+    A média do período de pandemia e o impacto ponderam os anos pela fração sob
+    pandemia (PESO_PANDEMIA: 2020 conta meio ano), então variacao_pandemia_pct e
+    impacto_pct medem o mesmo período. Os anos de ANOS_INCOMPLETOS ficam
+    marcados na série e fora das médias.
+    """
+
+    def __init__(self, matriz):
+        self.matriz = matriz
+        anos = matriz.index.to_numpy()
+        Y = matriz.to_numpy(dtype=float)
+
+        # Tendência: um polyfit com todas as colunas ao mesmo tempo
+        tendencia = np.isin(anos, list(ANOS_TENDENCIA))
+        x = anos[tendencia]
+        self.inclinacao, self.intercepto = np.polyfit(x, Y[tendencia], 1)
+        self.esperado = np.outer(anos, self.inclinacao) + self.intercepto
+        self.residuo = Y - self.esperado
+
+        ajuste = self.esperado[tendencia]
+        soma_residuos = ((Y[tendencia] - ajuste) ** 2).sum(axis=0)
+        soma_total = ((Y[tendencia] - Y[tendencia].mean(axis=0)) ** 2).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.r2 = np.where(soma_total > 0, 1 - soma_residuos / soma_total, np.nan)
+
+        completos = ~np.isin(anos, ANOS_INCOMPLETOS)
+        self.media_pre = Y[np.isin(anos, list(ANOS_PRE))].mean(axis=0)
+        pos = np.isin(anos, list(ANOS_POS)) & completos
+        self.media_pos = Y[pos].mean(axis=0) if pos.any() else np.full(Y.shape[1], np.nan)
+
+        self.peso = np.array([PESO_PANDEMIA.get(ano, 0.0) for ano in anos])
+        pandemia = self.peso > 0
+        self.media_pandemia = np.average(Y[pandemia], axis=0, weights=self.peso[pandemia])
+        esperado_pandemia = self.peso @ self.esperado
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.impacto_pct = np.where(
+                esperado_pandemia > 0, 100 * (self.peso @ self.residuo) / esperado_pandemia, np.nan
+            )
+
+    def resumo(self):
+        """Uma linha por subgrupo: tendência, médias dos períodos e impacto da pandemia"""
+        resumo = self.matriz.columns.to_frame(index=False)
+        resumo['inclinacao_anual'] = self.inclinacao
+        resumo['r2_tendencia'] = self.r2
+        resumo['media_pre'] = self.media_pre
+        resumo['media_pandemia'] = self.media_pandemia
+        resumo['media_pos'] = self.media_pos
+        with np.errstate(divide='ignore', invalid='ignore'):
+            resumo['variacao_pandemia_pct'] = np.where(
+                self.media_pre > 0, 100 * (self.media_pandemia - self.media_pre) / self.media_pre, np.nan
+            )
+        for ano in PESO_PANDEMIA:
+            i = self.matriz.index.get_loc(ano)
+            resumo[f'residuo_{ano}'] = self.residuo[i]
+        resumo['impacto_pct'] = self.impacto_pct
+        return resumo
+
+    def serie(self):
+        """Formato longo: uma linha por subgrupo e ano, com observado, esperado e resíduo"""
+        anos = self.matriz.index.to_numpy()
+        n_anos, n_grupos = self.matriz.shape
+        colunas = self.matriz.columns.to_frame(index=False)
+        serie = pd.DataFrame({
+            'dimensao': np.tile(colunas['dimensao'].to_numpy(), n_anos),
+            'grupo': np.tile(colunas['grupo'].to_numpy(), n_anos),
+            'ano': np.repeat(anos, n_grupos),
+            'observado': self.matriz.to_numpy(dtype=float).ravel(),
+            'esperado': self.esperado.ravel(),
+            'residuo': self.residuo.ravel(),
+            'peso_pandemia': np.repeat(self.peso, n_grupos),
+            'incompleto': np.repeat(np.isin(anos, ANOS_INCOMPLETOS), n_grupos),
+        })
+        with np.errstate(divide='ignore', invalid='ignore'):
+            serie['residuo_pct'] = np.where(serie['esperado'] > 0, 100 * serie['residuo'] / serie['esperado'], np.nan)
+        return serie
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Impacto da pandemia nas conclusões, por subgrupo")
+    arg_parser.add_argument("--parquet", default="output_lattes/curriculos_processados.parquet")
+    arg_parser.add_argument("--cubo", default="output_lattes/cubo_formacoes.parquet",
+                            help="Cubo de cubo.py (montado a partir do Parquet se não existir)")
+    arg_parser.add_argument("--output", default="output_lattes")
+    args = arg_parser.parse_args()
+
+    if Path(args.cubo).exists():
+        cubo = CuboFormacoes.load(args.cubo)
+    else:
+        cubo = CuboFormacoes.build(args.parquet)
+        cubo.save(args.cubo)
+
+    matriz = pd.concat([matriz_anual(cubo), matriz_area(args.parquet)], axis=1)
+    analise = AnalisePandemia(matriz)
+    resumo = analise.resumo()
+    output_dir = Path(args.output)
+    resumo.to_csv(output_dir / "pandemia_resumo.csv", index=False)
+    analise.serie().to_csv(output_dir / "pandemia_serie.csv", index=False)
+
+    print("="*60)
+    print(f"IMPACTO DA PANDEMIA ({matriz.shape[1]:,} subgrupos)")
+    print("="*60)
+    colunas = ['dimensao', 'grupo', 'media_pre', 'media_pandemia', 'impacto_pct']
+    print(resumo[resumo['dimensao'] != 'area'][colunas].to_string(index=False, float_format='{:.1f}'.format))
+    print(f"\n✓ Resumo: {output_dir / 'pandemia_resumo.csv'}")
+    print(f"✓ Série: {output_dir / 'pandemia_serie.csv'}")
+    print("="*60)
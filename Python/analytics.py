@@ -0,0 +1,285 @@
+import argparse
+import time
+from pathlib import Path
+
+import duckdb
+
+# Relações do esquema de SQL/SQL_Load/create_tables.sql, montadas como views sobre o
+# Parquet. Reproduzem o que load_data.sql faz a partir do CSV (vazios viram NULL,
+# pessoa = currículo mais recente, instituição = instituicao_id canônico do
+# data_processor, áreas separadas por ';') e as correções linha a linha de
+# small_fixes.sql (rótulos de tipo_formacao e das grandes áreas, UF 'ZZ' como NULL).
+VIEWS = (
+    """
+    CREATE OR REPLACE VIEW curriculos AS
+    SELECT
+        file_row_number + 1 AS formacao_id,
+        TRY_CAST(numero_identificador AS BIGINT) AS numero_identificador,
+        NULLIF(CAST(genero AS VARCHAR), '') AS genero,
+        TRY_CAST(data_atualizacao AS DATE) AS data_atualizacao,
+        NULLIF(CAST(uf_nascimento AS VARCHAR), '') AS uf_nascimento,
+        capital_nascimento,
+        NULLIF(CAST(regiao_nascimento AS VARCHAR), '') AS regiao_nascimento,
+        NULLIF(CAST(pais_nascimento AS VARCHAR), '') AS pais_nascimento,
+        CASE CAST(tipo_formacao AS VARCHAR)
+            WHEN 'DOUTORADO' THEN 'Doutorado'
+            WHEN 'MESTRADO' THEN 'Mestrado'
+            WHEN 'MESTRADO-PROFISSIONALIZANTE' THEN 'Mestrado Profissionalizante'
+            ELSE NULLIF(CAST(tipo_formacao AS VARCHAR), '')
+        END AS tipo_formacao,
+        curso_concluido,
+        TRY_CAST(ano_inicio AS INTEGER) AS ano_inicio,
+        TRY_CAST(ano_conclusao AS INTEGER) AS ano_conclusao,
+        NULLIF(CAST(grande_area AS VARCHAR), '') AS grande_area,
+        NULLIF(CAST(area AS VARCHAR), '') AS area,
+        flag_bolsa,
+        NULLIF(CAST(sigla_instituicao AS VARCHAR), '') AS sigla_instituicao,
+        NULLIF(NULLIF(CAST(uf_instituicao AS VARCHAR), ''), 'ZZ') AS uf_instituicao,
+        NULLIF(CAST(regiao_instituicao AS VARCHAR), '') AS regiao_instituicao,
+        NULLIF(CAST(pais_instituicao AS VARCHAR), '') AS pais_instituicao,
+        instituicao_id
+    FROM read_parquet({parquet}, file_row_number = true)
+    """,
+    """
+    CREATE OR REPLACE VIEW pessoas AS
+    SELECT ROW_NUMBER() OVER (ORDER BY numero_identificador) AS id, *
+    FROM (
+        SELECT DISTINCT ON (numero_identificador)
+            numero_identificador, genero, data_atualizacao, capital_nascimento,
+            uf_nascimento, regiao_nascimento, pais_nascimento
+        FROM curriculos
+        ORDER BY numero_identificador, data_atualizacao DESC NULLS LAST
+    )
+    """,
+    """
+    CREATE OR REPLACE VIEW instituicoes AS
+    SELECT DISTINCT ON (instituicao_id)
+        instituicao_id AS id, sigla_instituicao, uf_instituicao, regiao_instituicao, pais_instituicao
+    FROM curriculos
+    WHERE instituicao_id IS NOT NULL
+    ORDER BY instituicao_id
+    """,
+    """
+    CREATE OR REPLACE VIEW curriculos_areas AS
+    SELECT DISTINCT formacao_id, nome_area, tipo
+    FROM (
+        SELECT
+            formacao_id,
+            CASE TRIM(nome)
+                WHEN 'CIENCIAS_AGRARIAS' THEN 'Ciências Agrárias'
+                WHEN 'CIENCIAS_BIOLOGICAS' THEN 'Ciências Biológicas'
+                WHEN 'CIENCIAS_DA_SAUDE' THEN 'Ciências da Saúde'
+                WHEN 'CIENCIAS_EXATAS_E_DA_TERRA' THEN 'Ciências Exatas e da Terra'
+                WHEN 'CIENCIAS_HUMANAS' THEN 'Ciências Humanas'
+                WHEN 'CIENCIAS_SOCIAIS_APLICADAS' THEN 'Ciências Sociais Aplicadas'
+                WHEN 'ENGENHARIAS' THEN 'Engenharias'
+                WHEN 'LINGUISTICA_LETRAS_E_ARTES' THEN 'Linguística, Letras e Artes'
+                WHEN 'OUTROS' THEN 'Outros'
+                ELSE TRIM(nome)
+            END AS nome_area,
+            'grande_area' AS tipo
+        FROM curriculos, UNNEST(regexp_split_to_array(grande_area, ';\\s*')) AS t(nome)
+        UNION ALL
+        SELECT formacao_id, TRIM(nome), 'area'
+        FROM curriculos, UNNEST(regexp_split_to_array(area, ';\\s*')) AS t(nome)
+    )
+    WHERE nome_area <> ''
+    """,
+    """
+    CREATE OR REPLACE VIEW areas AS
+    SELECT ROW_NUMBER() OVER (ORDER BY tipo DESC, nome_area) AS id, nome_area, tipo
+    FROM (SELECT DISTINCT nome_area, tipo FROM curriculos_areas)
+    """,
+    """
+    CREATE OR REPLACE VIEW formacoes AS
+    SELECT
+        c.formacao_id AS id,
+        p.id AS pessoa_id,
+        c.instituicao_id,
+        c.tipo_formacao,
+        c.curso_concluido,
+        c.ano_inicio,
+        c.ano_conclusao,
+        c.flag_bolsa
+    FROM curriculos c
+    JOIN pessoas p ON p.numero_identificador = c.numero_identificador
+    """,
+    """
+    CREATE OR REPLACE VIEW formacoes_areas AS
+    SELECT ROW_NUMBER() OVER (ORDER BY ca.formacao_id, a.id) AS id, ca.formacao_id, a.id AS area_id
+    FROM curriculos_areas ca
+    JOIN areas a ON a.nome_area = ca.nome_area AND a.tipo = ca.tipo
+    """,
+)
+
+# Relações que podem ser materializadas (ver LattesAnalytics(materializar=True))
+RELACOES = ('pessoas', 'instituicoes', 'areas', 'formacoes', 'formacoes_areas')
+
+
+def split_statements(sql):
+    """Separa um script SQL em comandos, pelo ';' fora de strings e comentários
+
+    Trechos que só têm comentários são descartados. Um comando sem ';' no final
+    fica junto do seguinte, como aconteceria no psql.
+    """
+    statements = []
+    current = []
+    i = 0
+    n = len(sql)
+    while i < n:
+        char = sql[i]
+        if char in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if sql[end] == char:
+                    # Aspas duplicadas escapam a própria aspa ('it''s')
+                    if end + 1 < n and sql[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = n if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif char == ';':
+            statements.append(''.join(current))
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    statements.append(''.join(current))
+    return [s.strip() for s in statements if strip_comments(s).strip()]
+
+
+def strip_comments(sql):
+    """Remove as linhas que são só comentário (--)"""
+    linhas = [linha for linha in sql.splitlines() if not linha.strip().startswith('--')]
+    return '\n'.join(linhas)
+
+
+class LattesAnalytics:
+    """Executa as consultas de SQL/SQL_Queries direto sobre curriculos_processados.parquet
+
+    Usa DuckDB embutido no processo: não há banco para subir nem carga a fazer.
+    As relações pessoas, formacoes, instituicoes, areas e formacoes_areas são views
+    sobre o Parquet (ver VIEWS), então as consultas escritas para o Postgres rodam
+    sem alteração.
+    """
+
+    def __init__(self, parquet_file, database=":memory:", materializar=False):
+        """
+        Args:
+            parquet_file: curriculos_processados.parquet gerado pelo data_processor
+            database: Arquivo do DuckDB (":memory:" = só em memória)
+            materializar: Se True, grava as relações como tabelas em vez de views.
+                A carga leva alguns segundos, mas cada consulta deixa de recalcular
+                os ids e as junções. Vale a pena ao rodar muitos scripts seguidos.
+        """
+        self.parquet_file = Path(parquet_file)
+        if not self.parquet_file.exists():
+            raise FileNotFoundError(f"Parquet não encontrado: {self.parquet_file}")
+        self.con = duckdb.connect(str(database))
+
+        inicio = time.perf_counter()
+        parquet = "'" + str(self.parquet_file).replace("'", "''") + "'"
+        for view in VIEWS:
+            self.con.execute(view.format(parquet=parquet))
+        if materializar:
+            for relacao in RELACOES:
+                self.con.execute(f"CREATE OR REPLACE TABLE _{relacao} AS SELECT * FROM {relacao}")
+            for relacao in RELACOES:
+                self.con.execute(f"CREATE OR REPLACE VIEW {relacao} AS SELECT * FROM _{relacao}")
+        self.tempo_preparo = time.perf_counter() - inicio
+
+    def query(self, sql):
+        """Executa um comando e retorna o resultado como DataFrame (None se não houver)"""
+        relation = self.con.sql(sql)
+        return relation.df() if relation is not None else None
+
+    def run_file(self, sql_file, output_dir):
+        """Executa cada comando do script e exporta o resultado para CSV
+
+        Os resultados são gravados como <script>_NN.csv, onde NN é a posição do
+        comando no script. Um comando com erro é reportado e não interrompe os
+        seguintes.
+
+        Returns:
+            Lista com um dict por comando (numero, arquivo, linhas, segundos, erro)
+        """
+        sql_file = Path(sql_file)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        print(f"\n{sql_file.name}:")
+        relatorio = []
+        statements = split_statements(sql_file.read_text(encoding='utf-8'))
+        for numero, statement in enumerate(statements, start=1):
+            item = {"numero": numero, "arquivo": None, "linhas": None, "segundos": None, "erro": None}
+            inicio = time.perf_counter()
+            try:
+                df = self.query(statement)
+            except duckdb.Error as e:
+                item["erro"] = str(e).splitlines()[0]
+                primeira_linha = strip_comments(statement).strip().splitlines()[0]
+                print(f"  ✗ {numero:02d}: {item['erro']}")
+                print(f"       em: {primeira_linha[:70]}")
+            else:
+                item["segundos"] = time.perf_counter() - inicio
+                if df is not None:
+                    csv_file = output_dir / f"{sql_file.stem}_{numero:02d}.csv"
+                    df.to_csv(csv_file, index=False)
+                    item["arquivo"] = csv_file.name
+                    item["linhas"] = len(df)
+                    print(f"  ✓ {numero:02d}: {len(df):,} linhas em {item['segundos']:.2f}s -> {csv_file.name}")
+                else:
+                    print(f"  ✓ {numero:02d}: executado em {item['segundos']:.2f}s")
+            relatorio.append(item)
+        return relatorio
+
+    def run_all(self, sql_files, output_dir):
+        """Executa vários scripts e imprime o resumo"""
+        inicio = time.perf_counter()
+        relatorio = {}
+        for sql_file in sql_files:
+            relatorio[Path(sql_file).name] = self.run_file(sql_file, output_dir)
+
+        comandos = [item for itens in relatorio.values() for item in itens]
+        erros = sum(1 for item in comandos if item["erro"])
+        print("\n" + "="*60)
+        print(f"✓ {len(comandos) - erros} de {len(comandos)} comandos executados "
+              f"em {time.perf_counter() - inicio:.2f}s (preparo das views: {self.tempo_preparo:.2f}s)")
+        if erros:
+            print(f"⚠ {erros} comandos com erro")
+        print(f"✓ Resultados em: {output_dir}")
+        print("="*60)
+        return relatorio
+
+    def close(self):
+        self.con.close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Roda as consultas SQL direto sobre o Parquet processado, sem Postgres")
+    arg_parser.add_argument("sql_files", nargs="*", help="Scripts a executar (padrão: SQL/SQL_Queries/*.sql)")
+    arg_parser.add_argument("--parquet", default="output_lattes/curriculos_processados.parquet")
+    arg_parser.add_argument("--output", default="output_lattes/analytics", help="Pasta dos CSVs de resultado")
+    arg_parser.add_argument("--database", default=":memory:", help="Arquivo do DuckDB (padrão: em memória)")
+    arg_parser.add_argument("--materializar", action="store_true", help="Grava as relações como tabelas antes de consultar")
+    args = arg_parser.parse_args()
+
+    sql_files = args.sql_files or sorted(Path("SQL/SQL_Queries").glob("*.sql"))
+    analytics = LattesAnalytics(args.parquet, database=args.database, materializar=args.materializar)
+    try:
+        analytics.run_all(sql_files, args.output)
+    finally:
+        analytics.close()
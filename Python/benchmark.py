@@ -0,0 +1,305 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+from parser import LattesProcessor
+from data_processor import LattesDataProcessor
+
+# Valores usados para montar currículos com a mesma forma dos do Lattes
+NOMES = {
+    'F': ['Maria', 'Ana', 'Juliana', 'Fernanda', 'Patrícia', 'Aline', 'Camila', 'Letícia', 'Cláudia', 'Gisele'],
+    'M': ['José', 'João', 'Carlos', 'Paulo', 'Lucas', 'Marcos', 'Rafael', 'Luiz', 'Antônio', 'Thiago'],
+}
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Nascimento', 'Lima']
+CIDADES = {
+    'SP': ['São Paulo', 'Campinas', 'Ribeirão Preto'], 'RJ': ['Rio de Janeiro', 'Niterói'],
+    'MG': ['Belo Horizonte', 'Viçosa'], 'RS': ['Porto Alegre', 'Pelotas'], 'BA': ['Salvador', 'Feira de Santana'],
+    'PE': ['Recife', 'Olinda'], 'PR': ['Curitiba', 'Londrina'], 'CE': ['Fortaleza'], 'DF': ['Brasília'],
+}
+INSTITUICOES = [
+    ('USP', 'SP'), ('UNICAMP', 'SP'), ('UNESP', 'SP'), ('UFRJ', 'RJ'), ('PUC-Rio', 'RJ'), ('UFMG', 'MG'),
+    ('UFV', 'MG'), ('UFRGS', 'RS'), ('PUCRS', 'RS'), ('UFBA', 'BA'), ('UFPE', 'PE'), ('UFPR', 'PR'),
+    ('UFC', 'CE'), ('UnB', 'DF'), ('FGV-SP', 'SP'), ('Universidade%20Federal', 'ZZ'),
+]
+INSTITUICOES_EXTERIOR = [('MIT', 'Estados Unidos'), ('UL', 'Portugal'), ('UBA', 'Argentina')]
+AREAS = [
+    ('CIENCIAS_EXATAS_E_DA_TERRA', 'Física'), ('CIENCIAS_EXATAS_E_DA_TERRA', 'Química'),
+    ('CIENCIAS_HUMANAS', 'Educação'), ('CIENCIAS_HUMANAS', 'Educa&ccedil;&atilde;o'),
+    ('CIENCIAS_DA_SAUDE', 'Medicina'), ('CIENCIAS_AGRARIAS', 'Agronomia'),
+    ('ENGENHARIAS', 'Engenharia Elétrica'), ('CIENCIAS_SOCIAIS_APLICADAS', 'Administração'),
+    ('LINGUISTICA_LETRAS_E_ARTES', 'Lingüística'), ('OUTROS', 'Multidisciplinar'),
+]
+TIPOS = ['MESTRADO', 'MESTRADO', 'DOUTORADO', 'MESTRADO-PROFISSIONALIZANTE']
+STATUS = ['CONCLUIDO', 'CONCLUIDO', 'CONCLUIDO', 'EM_ANDAMENTO', 'INCOMPLETO']
+
+
+def _attrs(**kwargs):
+    return ''.join(f' {key.replace("_", "-")}={quoteattr(str(value))}' for key, value in kwargs.items())
+
+
+def build_curriculo_xml(rng, numero_id, formacoes=(0, 4), publicacoes=(0, 200)):
+    """Monta o XML de um currículo sintético com a estrutura do Lattes
+
+    Args:
+        rng: random.Random usado para sortear os valores
+        numero_id: NUMERO-IDENTIFICADOR (16 dígitos)
+        formacoes: Faixa (mín, máx) de mestrados/doutorados por currículo
+        publicacoes: Faixa (mín, máx) de artigos publicados, que só incham o XML
+    """
+    genero = rng.choice('FM')
+    uf = rng.choice(list(CIDADES))
+    exterior = rng.random() < 0.05
+    parts = ['<?xml version="1.0" encoding="ISO-8859-1" standalone="no" ?>\n']
+    parts.append(f'<CURRICULO-VITAE{_attrs(SISTEMA_ORIGEM_XML="LATTES", NUMERO_IDENTIFICADOR=numero_id, DATA_ATUALIZACAO=f"{rng.randint(1, 28):02d}{rng.randint(1, 12):02d}{rng.randint(2008, 2024)}", HORA_ATUALIZACAO="101010")}>')
+    parts.append(f'<DADOS-GERAIS{_attrs(NOME_COMPLETO=f"{rng.choice(NOMES[genero])} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}", NOME_EM_CITACOES_BIBLIOGRAFICAS="SILVA, A.", NACIONALIDADE="B", PAIS_DE_NASCIMENTO="Portugal" if exterior else "Brasil", UF_NASCIMENTO="" if exterior else uf, CIDADE_NASCIMENTO=rng.choice(CIDADES[uf]))}>')
+    parts.append(f'<RESUMO-CV{_attrs(TEXTO_RESUMO_CV_RH="Possui graduação e pós-graduação. " * rng.randint(1, 20))}/>')
+    parts.append('<ENDERECO FLAG-DE-PREFERENCIA="ENDERECO_INSTITUCIONAL"><ENDERECO-PROFISSIONAL CODIGO-INSTITUICAO-EMPRESA="000000000000"/></ENDERECO>')
+
+    parts.append('<FORMACAO-ACADEMICA-TITULACAO>')
+    parts.append(f'<GRADUACAO{_attrs(SEQUENCIA_FORMACAO="1", CODIGO_INSTITUICAO="000000000001", STATUS_DO_CURSO="CONCLUIDO", ANO_DE_INICIO="2000", ANO_DE_CONCLUSAO="2004")}/>')
+    instituicoes = {}
+    cursos = {}
+    for seq in range(rng.randint(*formacoes)):
+        tipo = rng.choice(TIPOS)
+        codigo_inst = f"{rng.randint(1, 400):012d}"
+        codigo_curso = f"{rng.randint(1, 900):08d}"
+        instituicoes[codigo_inst] = rng.choice(INSTITUICOES + INSTITUICOES_EXTERIOR * (rng.random() < 0.1))
+        cursos[codigo_curso] = rng.choice(AREAS)
+        ano_inicio = rng.randint(1980, 2022)
+        status = rng.choice(STATUS)
+        ano_conclusao = str(min(ano_inicio + rng.randint(2, 5), 2024)) if status == 'CONCLUIDO' else ''
+        parts.append(f'<{tipo}{_attrs(SEQUENCIA_FORMACAO=seq + 2, NIVEL="3", CODIGO_INSTITUICAO=codigo_inst, CODIGO_CURSO=codigo_curso, CODIGO_AREA_CURSO="00000000", STATUS_DO_CURSO=status, ANO_DE_INICIO=ano_inicio, ANO_DE_CONCLUSAO=ano_conclusao, FLAG_BOLSA=rng.choice(["SIM", "NAO"]), TITULO_DA_DISSERTACAO_TESE="Um estudo")}>')
+        parts.append('<PALAVRAS-CHAVE PALAVRA-CHAVE-1="estudo" PALAVRA-CHAVE-2="análise"/>')
+        if rng.random() < 0.7:
+            parts.append('<AREAS-DO-CONHECIMENTO>')
+            for n in range(rng.randint(1, 3)):
+                grande_area, area = rng.choice(AREAS)
+                parts.append(f'<AREA-DO-CONHECIMENTO-{n + 1}{_attrs(NOME_GRANDE_AREA_DO_CONHECIMENTO=grande_area, NOME_DA_AREA_DO_CONHECIMENTO=area, NOME_DA_SUB_AREA_DO_CONHECIMENTO="")}/>')
+            parts.append('</AREAS-DO-CONHECIMENTO>')
+        parts.append('<SETORES-DE-ATIVIDADE SETOR-DE-ATIVIDADE-1="Educação"/>')
+        parts.append(f'</{tipo}>')
+    parts.append('</FORMACAO-ACADEMICA-TITULACAO>')
+    parts.append('<ATUACOES-PROFISSIONAIS><ATUACAO-PROFISSIONAL CODIGO-INSTITUICAO="000000000001" NOME-INSTITUICAO="Universidade"/></ATUACOES-PROFISSIONAIS>')
+    parts.append('</DADOS-GERAIS>')
+
+    # Produção bibliográfica: a parte que não usamos e que domina o tamanho do XML
+    parts.append('<PRODUCAO-BIBLIOGRAFICA><ARTIGOS-PUBLICADOS>')
+    for seq in range(rng.randint(*publicacoes)):
+        parts.append(f'<ARTIGO-PUBLICADO SEQUENCIA-PRODUCAO="{seq + 1}">')
+        parts.append(f'<DADOS-BASICOS-DO-ARTIGO{_attrs(NATUREZA="COMPLETO", TITULO_DO_ARTIGO=f"Resultados do experimento {seq} em condições diversas", ANO_DO_ARTIGO=rng.randint(1990, 2024), IDIOMA="Português")}/>')
+        parts.append(f'<DETALHAMENTO-DO-ARTIGO{_attrs(TITULO_DO_PERIODICO_OU_REVISTA="Revista Brasileira", VOLUME="10", PAGINA_INICIAL="1", PAGINA_FINAL="20")}/>')
+        for autor in range(rng.randint(1, 5)):
+            nome_autor = f"{rng.choice(NOMES[rng.choice('FM')])} {rng.choice(SOBRENOMES)}"
+            parts.append(f'<AUTORES{_attrs(NOME_COMPLETO_DO_AUTOR=nome_autor, ORDEM_DE_AUTORIA=autor + 1)}/>')
+        parts.append('<PALAVRAS-CHAVE PALAVRA-CHAVE-1="experimento"/></ARTIGO-PUBLICADO>')
+    parts.append('</ARTIGOS-PUBLICADOS></PRODUCAO-BIBLIOGRAFICA>')
+
+    parts.append('<DADOS-COMPLEMENTARES><INFORMACOES-ADICIONAIS-INSTITUICOES>')
+    for codigo, (sigla, local) in sorted(instituicoes.items()):
+        if local in CIDADES or local == 'ZZ':
+            uf_inst, pais = local, 'Brasil'
+        else:
+            uf_inst, pais = '', local
+        parts.append(f'<INFORMACAO-ADICIONAL-INSTITUICAO{_attrs(CODIGO_INSTITUICAO=codigo, SIGLA_INSTITUICAO=sigla, SIGLA_UF_INSTITUICAO=uf_inst, SIGLA_PAIS_INSTITUICAO="BRA", NOME_PAIS_INSTITUICAO=pais)}/>')
+    parts.append('</INFORMACOES-ADICIONAIS-INSTITUICOES><INFORMACOES-ADICIONAIS-CURSOS>')
+    for codigo, (grande_area, area) in sorted(cursos.items()):
+        parts.append(f'<INFORMACAO-ADICIONAL-CURSO{_attrs(CODIGO_CURSO=codigo, NOME_GRANDE_AREA_DO_CONHECIMENTO=grande_area, NOME_DA_AREA_DO_CONHECIMENTO=area)}/>')
+    parts.append('</INFORMACOES-ADICIONAIS-CURSOS></DADOS-COMPLEMENTARES>')
+    parts.append('</CURRICULO-VITAE>')
+    return ''.join(parts).encode('iso-8859-1', errors='xmlcharrefreplace')
+
+
+def generate_corpus(dest, folders=3, per_folder=200, formacoes=(0, 4), publicacoes=(0, 200), seed=42):
+    """Gera um corpus sintético no layout do dump (pastas 00-99 com um ZIP por currículo)
+
+    Também grava um grupos.csv com os nomes usados, para o LattesDataProcessor.
+    Retorna um dicionário com a descrição do corpus gerado.
+    """
+    dest = Path(dest)
+    rng = random.Random(seed)
+    total_bytes = 0
+    numero = 0
+    for folder_num in range(folders):
+        folder_path = dest / f"{folder_num:02d}"
+        folder_path.mkdir(parents=True, exist_ok=True)
+        for _ in range(per_folder):
+            numero += 1
+            # Como no dump, os dois últimos dígitos do identificador definem a pasta
+            numero_id = f"{numero:014d}{folder_num:02d}"
+            xml = build_curriculo_xml(rng, numero_id, formacoes, publicacoes)
+            total_bytes += len(xml)
+            with zipfile.ZipFile(folder_path / f"{numero_id}.zip", 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+                zip_ref.writestr("curriculo.xml", xml)
+
+    with open(dest / "grupos.csv", 'w', encoding='utf-8') as f:
+        f.write("name,classification,frequency_female,frequency_male,frequency_total,frequency_group,group_name,ratio,names\n")
+        for genero, nomes in NOMES.items():
+            for nome in nomes:
+                f.write(f"{nome.upper()},{genero},0,0,0,0,{nome.upper()},1.0,{nome.upper()}|{nome.upper()}A\n")
+
+    return {
+        "folders": folders,
+        "per_folder": per_folder,
+        "curriculos": numero,
+        "formacoes": list(formacoes),
+        "publicacoes": list(publicacoes),
+        "seed": seed,
+        "xml_mb": total_bytes / 1e6,
+    }
+
+
+def _timed(func, repeat):
+    """Menor tempo (wall) de repeat execuções de func"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmarks(corpus_dir, repeat=3):
+    """Mede cada etapa do pipeline sobre um corpus e retorna os resultados
+
+    Etapas: extract_xml_from_zip, parse_curriculo, process_all,
+    convert_to_dataframe e LattesDataProcessor.process_data (sem o cache de
+    etapas; process_data_cache mede a reexecução com todas as etapas no cache).
+    """
+    corpus_dir = Path(corpus_dir)
+    zip_files = sorted(corpus_dir.glob("[0-9][0-9]/*.zip"))
+    folders = len({zip_file.parent.name for zip_file in zip_files})
+    results = {}
+
+    def record(name, seconds, items):
+        results[name] = {
+            "seconds": seconds,
+            "items": items,
+            "items_per_second": items / seconds if seconds > 0 else None,
+        }
+        print(f"  {name:<24} {seconds:8.3f} s  {results[name]['items_per_second'] or 0:10.1f} itens/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        processor = LattesProcessor(corpus_dir, tmp / "parse")
+
+        xml_contents = [(zip_file.name, processor.extract_xml_from_zip(zip_file)) for zip_file in zip_files]
+        record("extract_xml_from_zip",
+               _timed(lambda: [processor.extract_xml_from_zip(zip_file) for zip_file in zip_files], repeat),
+               len(zip_files))
+        record("parse_curriculo",
+               _timed(lambda: [processor.parse_curriculo(xml, name) for name, xml in xml_contents], repeat),
+               len(xml_contents))
+
+        # process_all e convert_to_dataframe escrevem em disco: saída nova a cada repetição
+        runs = iter(range(repeat))
+
+        def process_all():
+            output = tmp / f"process_all_{next(runs)}"
+            LattesProcessor(corpus_dir, output).process_all(max_folders=folders)
+
+        record("process_all", _timed(process_all, repeat), len(zip_files))
+
+        output = tmp / "process_all_0"
+        converter = LattesProcessor(corpus_dir, output)
+        record("convert_to_dataframe", _timed(converter.convert_to_dataframe, repeat), len(zip_files))
+
+        curriculos_data = output / "curriculos_data.parquet"
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = len(converter.convert_to_dataframe(write_csv=False))
+            data_processor = LattesDataProcessor(curriculos_data, corpus_dir / "grupos.csv", tmp / "processados")
+        record("process_data", _timed(data_processor.process_data, repeat), rows)
+
+        # Reexecução com todas as etapas no cache (aquecido antes da medição)
+        with contextlib.redirect_stdout(io.StringIO()):
+            data_processor = LattesDataProcessor(curriculos_data, corpus_dir / "grupos.csv", tmp / "processados_cache",
+                                                 cache_etapas=True)
+            data_processor.process_data()
+        record("process_data_cache", _timed(data_processor.process_data, repeat), rows)
+
+    return results
+
+
+def compare_results(previous, current, tolerance=0.10):
+    """Compara dois resultados de benchmark e retorna as etapas que ficaram mais lentas
+
+    Uma etapa regrediu se o tempo aumentou mais que tolerance (10% por padrão).
+    """
+    regressions = {}
+    print(f"\n{'Etapa':<24} {'anterior':>10} {'atual':>10} {'variação':>10}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        change = result["seconds"] / before["seconds"] - 1
+        flag = "  ⚠ regressão" if change > tolerance else ""
+        print(f"{name:<24} {before['seconds']:>9.3f}s {result['seconds']:>9.3f}s {change:>+9.1%}{flag}")
+        if change > tolerance:
+            regressions[name] = change
+    return regressions
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark do pipeline Lattes sobre um corpus sintético")
+    arg_parser.add_argument("--corpus", default="benchmarks/corpus", help="Pasta do corpus (gerado se não existir)")
+    arg_parser.add_argument("--folders", type=int, default=3)
+    arg_parser.add_argument("--per-folder", type=int, default=200)
+    arg_parser.add_argument("--max-formacoes", type=int, default=4)
+    arg_parser.add_argument("--max-publicacoes", type=int, default=200)
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--results-dir", default="benchmarks")
+    arg_parser.add_argument("--regenerate", action="store_true", help="Apaga e gera o corpus de novo")
+    args = arg_parser.parse_args()
+
+    corpus_dir = Path(args.corpus)
+    corpus_info_file = corpus_dir / "corpus.json"
+    if args.regenerate and corpus_dir.exists():
+        shutil.rmtree(corpus_dir)
+    if not corpus_info_file.exists():
+        print(f"Gerando corpus sintético em {corpus_dir}...")
+        corpus_info = generate_corpus(corpus_dir, args.folders, args.per_folder, (0, args.max_formacoes),
+                                      (0, args.max_publicacoes), args.seed)
+        with open(corpus_info_file, 'w') as f:
+            json.dump(corpus_info, f, indent=2)
+    with open(corpus_info_file, 'r') as f:
+        corpus_info = json.load(f)
+    print(f"Corpus: {corpus_info['curriculos']:,} currículos, {corpus_info['xml_mb']:.1f} MB de XML")
+
+    print("\nExecutando benchmarks...")
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": corpus_info,
+        "repeat": args.repeat,
+        "results": run_benchmarks(corpus_dir, args.repeat),
+    }
+
+    results_dir = Path(args.results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    previous_files = sorted(results_dir.glob("benchmark_*.json"))
+    results_file = results_dir / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Resultados: {results_file}")
+
+    # Comparar com a execução anterior sobre o mesmo corpus
+    for previous_file in reversed(previous_files):
+        with open(previous_file, 'r') as f:
+            previous = json.load(f)
+        if previous["corpus"] == corpus_info:
+            print(f"Comparando com {previous_file.name}")
+            compare_results(previous, results)
+            break
@@ -0,0 +1,150 @@
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Dimensões do cubo: tudo o que as análises de to_do.txt e efeito_pandemia.sql agrupam
+DIMENSOES = [
+    'ano_conclusao', 'tipo_formacao', 'genero', 'flag_bolsa', 'curso_concluido',
+    'regiao_instituicao', 'uf_instituicao', 'grande_area'
+]
+# Colunas que podem entrar no cubo além de DIMENSOES (build(extras=...)); cada uma
+# multiplica o número de células e o tempo de montagem
+EXTRAS = ['ano_inicio']
+ANOS = ('ano_conclusao', 'ano_inicio')
+
+
+class CuboFormacoes:
+    """Contagem de formações por todas as combinações de DIMENSOES (e dos extras pedidos)
+
+    Cada linha do cubo é uma combinação observada com a coluna qtd. Qualquer
+    agregação sobre um subconjunto das dimensões (rollup) é uma soma sobre o cubo,
+    que tem ordens de grandeza menos linhas que curriculos_processados.parquet.
+
+    grande_area guarda a combinação de grandes áreas da formação ("A; B"). No
+    rollup por grande_area ela é separada, e a formação conta uma vez em cada
+    grande área, como na junção com formacoes_areas do SQL. O mesmo vale para o
+    filtro por grande_area: com filtros={'grande_area': ['A', 'B']}, a formação
+    "A; B" conta duas vezes. Nos demais rollups os totais são exatos.
+    """
+
+    def __init__(self, cubo):
+        self.cubo = cubo
+        self.dimensoes = [col for col in cubo.columns if col != 'qtd']
+
+    @classmethod
+    def build(cls, parquet_file, batch_size=1_000_000, extras=()):
+        """Monta o cubo numa única leitura do Parquet processado, em lotes
+
+        Lê só as colunas de DIMENSOES (mais as de extras, ex: ['ano_inicio']);
+        cada lote é agregado e os parciais são somados no final, então a memória
+        não depende do tamanho da entrada.
+        """
+        desconhecidas = [col for col in extras if col not in EXTRAS]
+        if desconhecidas:
+            raise ValueError(f"Dimensões extras desconhecidas: {desconhecidas} (use {EXTRAS})")
+        dimensoes = DIMENSOES + [col for col in EXTRAS if col in extras]
+
+        parciais = []
+        arquivo = pq.ParquetFile(parquet_file)
+        for batch in arquivo.iter_batches(batch_size=batch_size, columns=dimensoes):
+            df = batch.to_pandas()
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype(object)
+            parciais.append(df.groupby(dimensoes, dropna=False).size().rename('qtd').reset_index())
+
+        if parciais:
+            cubo = pd.concat(parciais, ignore_index=True)
+            cubo = cubo.groupby(dimensoes, dropna=False)['qtd'].sum().reset_index()
+        else:
+            cubo = pd.DataFrame(columns=dimensoes + ['qtd'])
+        return cls(cls._tipar(cubo, dimensoes))
+
+    @staticmethod
+    def _tipar(cubo, dimensoes):
+        for col in dimensoes:
+            if col in ANOS:
+                cubo[col] = cubo[col].astype('Int16')
+            elif col in ('flag_bolsa', 'curso_concluido'):
+                cubo[col] = cubo[col].astype('boolean')
+            else:
+                cubo[col] = cubo[col].astype('category')
+        cubo['qtd'] = cubo['qtd'].astype('int64')
+        return cubo
+
+    def save(self, path):
+        self.cubo.to_parquet(path, index=False, compression='zstd')
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+    def rollup(self, por=(), filtros=None):
+        """Soma qtd agrupando pelas dimensões em `por`, depois de aplicar os filtros
+
+        Args:
+            por: Dimensões do resultado (vazio = total geral)
+            filtros: Dict dimensão -> valor ou coleção de valores aceitos
+                     (ex: {'ano_conclusao': range(2010, 2024), 'tipo_formacao': 'DOUTORADO'})
+
+        Returns:
+            DataFrame com as colunas de `por` e qtd, ordenado por `por`
+        """
+        por = list(por)
+        fora_do_cubo = [col for col in por + list(filtros or {}) if col not in self.dimensoes]
+        if fora_do_cubo:
+            raise ValueError(f"Dimensões fora do cubo: {fora_do_cubo} (monte com build(extras=...))")
+        cubo = self.cubo
+        for col, valor in (filtros or {}).items():
+            if col == 'grande_area':
+                continue
+            if isinstance(valor, (list, tuple, set, range)):
+                cubo = cubo[cubo[col].isin(list(valor))]
+            else:
+                cubo = cubo[cubo[col] == valor]
+
+        if 'grande_area' in por or 'grande_area' in (filtros or {}):
+            cubo = self._separar_grandes_areas(cubo, (filtros or {}).get('grande_area'))
+
+        if not por:
+            return pd.DataFrame({'qtd': [int(cubo['qtd'].sum())]})
+        resultado = cubo.groupby(por, dropna=False, observed=True)['qtd'].sum().reset_index()
+        return resultado.sort_values(por).reset_index(drop=True)
+
+    @staticmethod
+    def _separar_grandes_areas(cubo, filtro=None):
+        cubo = cubo.assign(grande_area=cubo['grande_area'].astype(object).str.split(r';\s*', regex=True))
+        cubo = cubo.explode('grande_area')
+        cubo = cubo[cubo['grande_area'].notna() & (cubo['grande_area'] != '')]
+        if filtro is not None:
+            aceitos = list(filtro) if isinstance(filtro, (list, tuple, set)) else [filtro]
+            cubo = cubo[cubo['grande_area'].isin(aceitos)]
+        return cubo
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Monta o cubo de contagens de formações")
+    arg_parser.add_argument("--parquet", default="output_lattes/curriculos_processados.parquet")
+    arg_parser.add_argument("--output", default="output_lattes/cubo_formacoes.parquet")
+    arg_parser.add_argument("--extras", nargs="*", default=[], choices=EXTRAS,
+                            help="Dimensões além de DIMENSOES (aumentam o cubo)")
+    args = arg_parser.parse_args()
+
+    print("="*60)
+    print("Montando cubo de formações")
+    print("="*60)
+    inicio = time.perf_counter()
+    cubo = CuboFormacoes.build(args.parquet, extras=args.extras)
+    cubo.save(args.output)
+    total = int(cubo.cubo['qtd'].sum())
+    print(f"✓ {total:,} formações -> {len(cubo.cubo):,} células em {time.perf_counter() - inicio:.1f}s")
+    print(f"✓ Cubo: {args.output} ({Path(args.output).stat().st_size / 1024:,.0f} KB)")
+
+    inicio = time.perf_counter()
+    por_ano = cubo.rollup(['ano_conclusao', 'flag_bolsa'], filtros={'ano_conclusao': range(2010, 2024)})
+    print(f"\nConclusões por ano e bolsa ({(time.perf_counter() - inicio) * 1000:.1f} ms):")
+    print(por_ano.pivot(index='ano_conclusao', columns='flag_bolsa', values='qtd').to_string())
+    print("="*60)
@@ -1,26 +1,162 @@
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from pathlib import Path
 import unicodedata
 import re
 
+# Muda quando o formato do índice de nomes ou a normalização mudam, invalidando o cache
+GRUPOS_CACHE_VERSION = 1
+
+# Linhas por row group do Parquet de saída. Com as linhas ordenadas por ano_conclusao,
+# cada row group cobre poucos anos e os filtros de load_processed descartam a maioria
+# deles pelas estatísticas; o padrão do pyarrow (~1M linhas) deixaria quase nada a podar
+ROW_GROUP_SIZE = 128 * 1024
+
+# Colunas finais (select_and_order_columns) e seus tipos no Parquet de saída. Colunas
+# com poucos valores distintos são dicionários (category no pandas); anos cabem em int16
+DICIONARIO = pa.dictionary(pa.int32(), pa.string())
+OUTPUT_SCHEMA = pa.schema([
+    ('numero_identificador', pa.string()), ('genero', DICIONARIO),
+    ('data_atualizacao', pa.date32()), ('uf_nascimento', DICIONARIO),
+    ('capital_nascimento', pa.bool_()), ('regiao_nascimento', DICIONARIO),
+    ('pais_nascimento', DICIONARIO), ('tipo_formacao', DICIONARIO),
+    ('curso_concluido', pa.bool_()), ('ano_inicio', pa.int16()), ('ano_conclusao', pa.int16()),
+    ('grande_area', DICIONARIO), ('area', DICIONARIO), ('flag_bolsa', pa.bool_()),
+    ('sigla_instituicao', DICIONARIO), ('uf_instituicao', DICIONARIO),
+    ('regiao_instituicao', DICIONARIO), ('pais_instituicao', DICIONARIO),
+    ('instituicao_id', pa.int32())
+])
+
+# Capital de cada UF, já normalizada (maiúsculas e sem acentos)
+CAPITAIS = {
+    'AC': 'RIO BRANCO', 'AL': 'MACEIO', 'AP': 'MACAPA', 'AM': 'MANAUS',
+    'BA': 'SALVADOR', 'CE': 'FORTALEZA', 'DF': 'BRASILIA', 'ES': 'VITORIA',
+    'GO': 'GOIANIA', 'MA': 'SAO LUIS', 'MT': 'CUIABA', 'MS': 'CAMPO GRANDE',
+    'MG': 'BELO HORIZONTE', 'PA': 'BELEM', 'PB': 'JOAO PESSOA', 'PR': 'CURITIBA',
+    'PE': 'RECIFE', 'PI': 'TERESINA', 'RJ': 'RIO DE JANEIRO', 'RN': 'NATAL',
+    'RS': 'PORTO ALEGRE', 'RO': 'PORTO VELHO', 'RR': 'BOA VISTA',
+    'SC': 'FLORIANOPOLIS', 'SP': 'SAO PAULO', 'SE': 'ARACAJU', 'TO': 'PALMAS'
+}
+
+# Instituições de referência (regras de SQL/SQL_Load/instituicao_fixes.sql): toda sigla
+# que contém a sigla mestra, e nenhuma das exceções, é a mesma instituição na UF da mestra
+INSTITUICOES_MESTRAS = {
+    sigla: (uf, ()) for sigla, uf in [
+        ('USP', 'SP'), ('UFRJ', 'RJ'), ('UNICAMP', 'SP'), ('UFRGS', 'RS'),
+        ('UFMG', 'MG'), ('UNB', 'DF'), ('PUCSP', 'SP'), ('UFPR', 'PR'),
+        ('UFBA', 'BA'), ('UFPB', 'PB'), ('UERJ', 'RJ'), ('UFRN', 'RN'),
+        ('UNIFESP', 'SP'), ('UFPA', 'PA'), ('UFSCAR', 'SP'), ('UFV', 'MG'),
+        ('UFSM', 'RS'), ('PUCRIO', 'RJ'), ('PUCRS', 'RS'), ('UFU', 'MG'),
+        ('UFES', 'ES'), ('UEL', 'PR'), ('UFLA', 'MG'), ('UFPEL', 'RS'),
+        ('UFJF', 'MG'), ('UFRRJ', 'RJ'), ('UFMT', 'MT'), ('UNISINOS', 'RS'),
+        ('FIOCRUZ', 'RJ'), ('UFAM', 'AM'), ('UFCG', 'PB'), ('UFRPE', 'PE'),
+        ('UECE', 'CE'), ('UFMS', 'MS'), ('UFPI', 'PI'), ('UFAL', 'AL'),
+        ('PUCMINAS', 'MG'), ('UTFPR', 'PR'), ('PUCPR', 'PR'), ('UDESC', 'SC'),
+        ('MACKENZIE', 'SP'), ('UNIOESTE', 'PR'), ('UFMA', 'MA'), ('UFAC', 'AC'),
+        ('UNIFAP', 'AP'), ('PUCRJ', 'RJ'), ('PUCGO', 'GO'), ('PUCMG', 'MG'),
+    ]
+}
+INSTITUICOES_MESTRAS.update({
+    'UNESP': ('SP', ('UNESPAR',)),
+    'UFSC': ('SC', ('UFSCAR',)),
+    'UFPE': ('PE', ('UFPEL',)),
+    'UFC': ('CE', ('UFCG', 'UFCS')),
+    'UFF': ('RJ', ('UFFS',)),
+    'UFG': ('GO', ('UFGD',)),
+    'UEM': ('PR', ('UEMA', 'UEMS', 'UEMG')),
+    'UFS': ('SE', ('UFSC', 'UFSM', 'UFSJ', 'UFSB')),
+    'UNIR': ('RO', ('UNIRIO', 'UNIROMA')),
+    'UFRR': ('RR', ('UFRRJ',)),
+    'UFT': ('TO', ('UFTM',)),
+})
+
+# UFs que mantêm uma PUC própria (SQL/SQL_Load/puc_fixes.sql); nas demais a PUC fica sem UF.
+# Como no passo 5 daquele script, toda PUC fica com a sigla 'PUC': as PUCs se distinguem
+# pela UF (no Brasil) ou pelo país, então agrupe por instituicao_id ou por (sigla, UF, país)
+ESTADOS_PUC = ('SP', 'GO', 'MG', 'PR', 'RJ', 'RS')
+
+
+@lru_cache(maxsize=100_000)
+def _normalizar(texto):
+    s = texto.strip().upper()
+    # decompor e remover marcas combinantes (acentos)
+    s = unicodedata.normalize('NFD', s)
+    s = ''.join(ch for ch in s if not unicodedata.combining(ch))
+    # opcional: remover caracteres que não sejam letras ou espaço
+    # s = re.sub(r'[^A-Z\s]', '', s)
+    return s
+
+
+def _limpar_sigla(sigla):
+    if not isinstance(sigla, str):
+        return sigla
+    sigla = unicodedata.normalize('NFKD', sigla)
+    sigla = ''.join(c for c in sigla if not unicodedata.combining(c))
+    sigla = sigla.upper()
+    sigla = sigla.replace('Ç', 'C')
+    sigla = sigla.replace('%20', '')
+    sigla = re.sub(r'[^A-Z0-9]', '', sigla)
+    return sigla.strip()
+
 class LattesDataProcessor:
     """Processa e enriquece dados dos currículos Lattes"""
     
-    def __init__(self, input_file, grupos_file, output_dir):
+    def __init__(self, input_file, grupos_file, output_dir, cache_dir=None, cache_etapas=False,
+                 cache_etapas_mb=2048):
+        """
+        Args:
+            input_file: curriculos_data (.parquet, .csv ou pasta de Parquets)
+            grupos_file: grupos.csv com a base de nomes
+            output_dir: Pasta de saída
+            cache_dir: Pasta do índice de nomes e do cache de etapas (padrão: output_dir/cache)
+            cache_etapas: Guarda o resultado de cada etapa de process_data em
+                          cache_dir/etapas, identificado pelas colunas de entrada e
+                          pelo código da etapa; só as etapas alteradas são refeitas.
+                          Desligado por padrão: cada execução grava as colunas de
+                          saída de todas as etapas, o que no dump completo passa
+                          de vários GB. Útil ao iterar sobre as etapas com uma
+                          amostra
+            cache_etapas_mb: Tamanho máximo de cache_dir/etapas. Ao fim de cada
+                             execução, as entradas que ela não usou são apagadas, das
+                             usadas há mais tempo para as mais recentes, até caber.
+                             As da execução atual sempre ficam, então uma única
+                             execução grande pode passar do limite
+        """
         self.input_file = Path(input_file)
         self.grupos_file = Path(grupos_file)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else self.output_dir / "cache"
+        self.cache_etapas = cache_etapas
+        self.cache_etapas_mb = cache_etapas_mb
+        self.arquivos_cache = set()
+        self.grupos_digest = None
+        self.indice_instituicoes = None
+        self.instituicoes_digest = None
         
         # Inicializar estruturas
         self.name_to_gender = {}
         self.nomes_principais = set()
+        self._grupos_df = None
         
         # Carregar base de nomes
         print("="*60)
         print("Carregando base de grupos de nomes...")
         print("="*60)
-        self.grupos_df = self._load_grupos()
+        self._load_grupos()
         
         # Estatísticas de classificação
         self.stats = {
@@ -46,33 +182,73 @@ class LattesDataProcessor:
     def _normalize_text(self, text):
         if pd.isna(text):
             return ''
-        s = str(text).strip().upper()
-        # decompor e remover marcas combinantes (acentos)
-        s = unicodedata.normalize('NFD', s)
-        s = ''.join(ch for ch in s if not unicodedata.combining(ch))
-        # opcional: remover caracteres que não sejam letras ou espaço
-        # s = re.sub(r'[^A-Z\s]', '', s)
-        return s
+        # Memoizado: nomes, cidades e UFs se repetem muito
+        return _normalizar(str(text))
+    
+    @property
+    def grupos_df(self):
+        """grupos.csv como DataFrame; com o índice vindo do cache, só é lido se usado"""
+        if self._grupos_df is None:
+            self._grupos_df = self._read_grupos_csv()
+        return self._grupos_df
+    
+    def _read_grupos_csv(self):
+        """Lê grupos.csv tentando diferentes encodings"""
+        last_error = None
+        for encoding in ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']:
+            try:
+                df = pd.read_csv(self.grupos_file, encoding=encoding)
+                print(f"✓ Arquivo carregado com encoding {encoding}")
+                print(f"  Colunas: {df.columns.tolist()}")
+                print(f"  Total de grupos: {len(df):,}")
+                return df
+            except Exception as e:
+                last_error = e
+                continue
+        
+        raise Exception(f"Não foi possível ler o arquivo. Último erro: {last_error}")
+    
+    def _normalize_unique(self, values):
+        """_normalize_text aplicado uma vez por valor distinto; devolve um array alinhado a values"""
+        return self._aplicar_por_valor(values, self._normalize_text, valor_ausente='')
+    
+    def _aplicar_por_valor(self, values, func, valor_ausente=None):
+        """Aplica func uma vez por valor distinto (via factorize) e devolve um array alinhado a values
+        
+        Valores ausentes (None/NaN) não passam por func e viram valor_ausente.
+        """
+        codigos, unicos = pd.factorize(pd.Series(values, dtype=object))
+        resultados = np.empty(len(unicos) + 1, dtype=object)
+        resultados[:-1] = [func(v) for v in unicos]
+        resultados[-1] = valor_ausente
+        return resultados[codigos]
     
     def _load_grupos(self):
-        """Carrega e processa o arquivo grupos.csv"""
+        """Carrega o índice de nomes de grupos.csv, usando o cache quando o arquivo não mudou
+        
+        O cache (cache_dir/grupos_<origem>_<hash>.pkl) guarda name_to_gender e
+        nomes_principais e é identificado pelo caminho do CSV (origem) e pelo
+        SHA-256 do seu conteúdo, então é refeito sozinho quando a base de nomes
+        muda. Só os caches antigos do mesmo CSV são apagados; os de outras bases
+        que usam o mesmo cache_dir ficam.
+        """
         try:
-            # Tentar diferentes encodings
-            df = None
-            last_error = None
-            for encoding in ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']:
-                try:
-                    df = pd.read_csv(self.grupos_file, encoding=encoding)
-                    print(f"✓ Arquivo carregado com encoding {encoding}")
-                    print(f"  Colunas: {df.columns.tolist()}")
-                    print(f"  Total de grupos: {len(df):,}")
-                    break
-                except Exception as e:
-                    last_error = e
-                    continue
+            digest = hashlib.sha256(self.grupos_file.read_bytes())
+            digest.update(str(GRUPOS_CACHE_VERSION).encode())
+            self.grupos_digest = digest.hexdigest()
+            origem = hashlib.sha256(str(self.grupos_file.resolve()).encode()).hexdigest()[:8]
+            cache_file = self.cache_dir / f"grupos_{origem}_{self.grupos_digest[:16]}.pkl"
+            
+            if cache_file.exists():
+                with open(cache_file, 'rb') as f:
+                    self.name_to_gender, self.nomes_principais = pickle.load(f)
+                print(f"✓ Índice de nomes carregado do cache ({cache_file.name})")
+                print(f"✓ Total no cache: {len(self.name_to_gender):,} nomes únicos")
+                print("="*60)
+                return
             
-            if df is None:
-                raise Exception(f"Não foi possível ler o arquivo. Último erro: {last_error}")
+            df = self._read_grupos_csv()
+            self._grupos_df = df
             
             # Verificar colunas
             required_cols = ['name', 'classification', 'names']
@@ -81,53 +257,48 @@ class LattesDataProcessor:
                 raise Exception(f"Colunas faltando: {missing}")
             
             print("\nCriando índice de nomes...")
+            # str() em cada classificação distinta, como no iterrows (NaN vira "NAN")
+            codigos, unicos = pd.factorize(df['classification'].astype(object), use_na_sentinel=False)
+            classificacoes = np.array([str(c).strip().upper() for c in unicos], dtype=object)[codigos]
             
-            # Indexar nomes principais
-            for idx, row in df.iterrows():
-                nome_principal = self._normalize_text(row['name'])
-                classification = str(row['classification']).strip().upper()
-                
-                if nome_principal:
-                    self.name_to_gender[nome_principal] = classification
-                    self.nomes_principais.add(nome_principal)
-                
-                if (idx + 1) % 5000 == 0:
-                    print(f"  Processados {idx + 1:,}/{len(df):,} grupos...")
+            # Indexar nomes principais (um nome repetido fica com a última classificação)
+            principais = pd.Series(classificacoes, index=self._normalize_unique(df['name']))
+            principais = principais[principais.index != '']
+            principais = principais.groupby(level=0, sort=False).last()
+            self.name_to_gender = principais.to_dict()
+            self.nomes_principais = set(principais.index)
             
             print(f"✓ {len(self.nomes_principais):,} nomes principais indexados")
             
-            # Indexar variações
+            # Indexar variações (uma variação repetida fica com a primeira classificação)
             print("\nIndexando variações de nomes...")
-            variacoes_count = 0
-            for idx, row in df.iterrows():
-                classification = str(row['classification']).strip().upper()
-                
-                if pd.notna(row['names']):
-                    names_list = str(row['names']).split('|')
-                    
-                    for variacao in names_list:
-                        variacao_clean = self._normalize_text(variacao)
-                        
-                        if variacao_clean and variacao_clean not in self.nomes_principais:
-                            if variacao_clean not in self.name_to_gender:
-                                self.name_to_gender[variacao_clean] = classification
-                                variacoes_count += 1
-                
-                if (idx + 1) % 5000 == 0:
-                    print(f"  Processados {idx + 1:,}/{len(df):,} grupos...")
+            com_variacoes = df['names'].notna().to_numpy()
+            variacoes = pd.Series(df['names'][com_variacoes].astype(str).str.split('|').to_numpy(dtype=object),
+                                  index=classificacoes[com_variacoes]).explode()
+            variacoes = pd.Series(variacoes.index, index=self._normalize_unique(variacoes.to_numpy()))
+            variacoes = variacoes[(variacoes.index != '') & ~variacoes.index.isin(self.nomes_principais)]
+            variacoes = variacoes[~variacoes.index.duplicated(keep='first')]
+            self.name_to_gender.update(variacoes.to_dict())
             
-            print(f"✓ {variacoes_count:,} variações adicionais indexadas")
+            print(f"✓ {len(variacoes):,} variações adicionais indexadas")
             print(f"✓ Total no cache: {len(self.name_to_gender):,} nomes únicos")
-            print("="*60)
             
-            return df
+            # Gravar o índice; caches de versões anteriores deste CSV são descartados
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for old_cache in self.cache_dir.glob(f"grupos_{origem}_*.pkl"):
+                old_cache.unlink()
+            tmp_file = cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((self.name_to_gender, self.nomes_principais), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+            print(f"✓ Índice salvo em cache ({cache_file.name})")
+            print("="*60)
             
         except Exception as e:
             print(f"\n⚠ ERRO: {e}")
             import traceback
             traceback.print_exc()
             print("⚠ Continuando sem base de nomes")
-            return None
     
     def predict_gender(self, nome_completo):
         """Prediz o gênero baseado no primeiro nome"""
@@ -142,6 +313,13 @@ class LattesDataProcessor:
         
         primeiro_nome = partes[0]
         
+        classificacao = self._classificar_primeiro_nome(primeiro_nome)
+        if classificacao is None:
+            self.stats['nomes_nao_classificados'].add(primeiro_nome)
+        return classificacao
+    
+    def _classificar_primeiro_nome(self, primeiro_nome):
+        """Regras de gênero para um primeiro nome já normalizado (None se não classificado)"""
         if primeiro_nome in self.name_to_gender:
             classificacao = self.name_to_gender[primeiro_nome]
             return classificacao
@@ -153,9 +331,45 @@ class LattesDataProcessor:
         elif primeiro_nome.endswith(('NE', 'TE', 'CE', 'SE')):
             return 'F'
         
-        self.stats['nomes_nao_classificados'].add(primeiro_nome)
         return None
     
+    def predict_gender_batch(self, nomes):
+        """Prediz o gênero de uma coluna de nomes completos, uma vez por primeiro nome distinto
+        
+        Os nomes completos são fatorados (uma pessoa tem várias formações), o
+        primeiro nome é separado só nos valores distintos, e cada primeiro nome
+        distinto é normalizado e classificado uma única vez; o resultado volta
+        para as linhas pelos códigos do factorize. Mesmo resultado de
+        predict_gender linha a linha, incluindo os nomes não classificados.
+        """
+        if not self.name_to_gender:
+            return pd.Series(None, index=nomes.index, dtype=object)
+        
+        codigos_nomes, nomes_unicos = pd.factorize(nomes.astype(object))
+        primeiros = pd.Series(nomes_unicos, dtype=object).str.split(n=1).str[0]
+        codigos_primeiros, unicos = pd.factorize(primeiros)
+        # Código do primeiro nome de cada linha (-1 para nome ausente)
+        codigos = np.append(codigos_primeiros, -1)[codigos_nomes]
+        
+        # Uma posição extra com None para os códigos -1 (nome ausente ou vazio)
+        resultados = np.empty(len(unicos) + 1, dtype=object)
+        refazer = np.zeros(len(unicos) + 1, dtype=bool)
+        for i, primeiro in enumerate(unicos):
+            partes = self._normalize_text(primeiro).split()
+            if not partes:
+                # Só acentos soltos: a normalização muda o primeiro nome, refaz linha a linha
+                refazer[i] = True
+                continue
+            resultados[i] = self._classificar_primeiro_nome(partes[0])
+            if resultados[i] is None:
+                self.stats['nomes_nao_classificados'].add(partes[0])
+        
+        genero = pd.Series(resultados[codigos], index=nomes.index, dtype=object)
+        linhas_refazer = refazer[codigos]
+        if linhas_refazer.any():
+            genero[linhas_refazer] = nomes[linhas_refazer].apply(self.predict_gender)
+        return genero
+    
     def get_region_from_uf(self, uf):
         """Retorna a região a partir da UF"""
         if pd.isna(uf):
@@ -207,6 +421,45 @@ class LattesDataProcessor:
         
         return curso_area
     
+    def _resolver_por_combinacao(self, df, regra, col_curso, col_formacao):
+        """Aplica regra(curso, formacao) uma vez por combinação distinta das duas colunas
+        
+        As combinações se repetem muito (milhares de linhas por área), então a regra
+        roda só nas combinações únicas e o resultado é espalhado de volta nas linhas.
+        Colunas ausentes valem None, como no row.get() do apply por linha.
+        """
+        pares = pd.DataFrame({
+            'curso': df[col_curso] if col_curso in df.columns else None,
+            'formacao': df[col_formacao] if col_formacao in df.columns else None
+        }, index=df.index)
+        codigos = pares.groupby(['curso', 'formacao'], dropna=False, sort=False).ngroup().to_numpy()
+        
+        # Primeira linha de cada combinação
+        _, primeiras = np.unique(codigos, return_index=True)
+        cursos = pares['curso'].to_numpy(dtype=object)[primeiras]
+        formacoes = pares['formacao'].to_numpy(dtype=object)[primeiras]
+        resultados = np.empty(len(primeiras), dtype=object)
+        resultados[:] = [regra(curso, formacao) for curso, formacao in zip(cursos, formacoes)]
+        
+        return pd.Series(resultados[codigos], index=df.index, dtype=object)
+    
+    def verificar_areas(self, df):
+        """Compara a resolução por combinação com o apply linha a linha original
+        
+        Retorna o número de linhas divergentes (0 = idêntico). Lento: só para validação.
+        """
+        divergencias = 0
+        for coluna, regra, col_curso, col_formacao in (
+            ('grande_area', self.process_grande_area, 'curso_grande_area', 'grande_area_formacao'),
+            ('area', self.process_area, 'curso_area', 'area_formacao')
+        ):
+            por_linha = df.apply(lambda row: regra(row.get(col_curso), row.get(col_formacao)), axis=1)
+            por_combinacao = self._resolver_por_combinacao(df, regra, col_curso, col_formacao)
+            iguais = (por_linha.isna() & por_combinacao.isna()) | (por_linha == por_combinacao)
+            print(f"{coluna}: {(~iguais).sum():,} linhas divergentes")
+            divergencias += int((~iguais).sum())
+        return divergencias
+    
     def process_flag_bolsa(self, df):
         """Converte a coluna 'flag_bolsa' para booleano."""
         df['flag_bolsa'] = (df['flag_bolsa'] == 'SIM')
@@ -220,32 +473,15 @@ class LattesDataProcessor:
 
     def _create_capital_column(self, df):
         """Cria uma coluna booleana para identificar se a cidade de nascimento é capital."""
-        capitais = {
-            'AC': 'RIO BRANCO', 'AL': 'MACEIO', 'AP': 'MACAPA', 'AM': 'MANAUS',
-            'BA': 'SALVADOR', 'CE': 'FORTALEZA', 'DF': 'BRASILIA', 'ES': 'VITORIA',
-            'GO': 'GOIANIA', 'MA': 'SAO LUIS', 'MT': 'CUIABA', 'MS': 'CAMPO GRANDE',
-            'MG': 'BELO HORIZONTE', 'PA': 'BELEM', 'PB': 'JOAO PESSOA', 'PR': 'CURITIBA',
-            'PE': 'RECIFE', 'PI': 'TERESINA', 'RJ': 'RIO DE JANEIRO', 'RN': 'NATAL',
-            'RS': 'PORTO ALEGRE', 'RO': 'PORTO VELHO', 'RR': 'BOA VISTA',
-            'SC': 'FLORIANOPOLIS', 'SP': 'SAO PAULO', 'SE': 'ARACAJU', 'TO': 'PALMAS'
-        }
-
-        def is_capital(row):
-            uf = row['uf_nascimento']
-            cidade = row['cidade_nascimento']
-            
-            if pd.isna(uf) or pd.isna(cidade):
-                return False
-            
-            # Normaliza os textos para comparação
-            uf_norm = self._normalize_text(uf)
-            cidade_norm = self._normalize_text(cidade)
-            
-            capital_do_uf = capitais.get(uf_norm)
-            
-            return cidade_norm == capital_do_uf
-
-        df['capital_nascimento'] = df.apply(is_capital, axis=1)
+        # Normaliza cada UF e cidade distinta uma vez e cruza com a tabela de capitais
+        uf_norm = pd.Series(self._normalize_unique(df['uf_nascimento']), index=df.index)
+        cidade_norm = self._normalize_unique(df['cidade_nascimento'])
+        capital_do_uf = uf_norm.map(CAPITAIS)
+        
+        df['capital_nascimento'] = (
+            (capital_do_uf == cidade_norm).fillna(False).astype(bool)
+            & df['uf_nascimento'].notna() & df['cidade_nascimento'].notna()
+        )
         return df
 
     def _convert_data_types(self, df):
@@ -258,20 +494,104 @@ class LattesDataProcessor:
         return df
     
     def _limpar_sigla_instituicao(self, df):
-        def limpar_texto(sigla):
-            if not isinstance(sigla, str):
-                return sigla
-            sigla = unicodedata.normalize('NFKD', sigla)
-            sigla = ''.join(c for c in sigla if not unicodedata.combining(c))
-            sigla = sigla.upper()
-            sigla = sigla.replace('Ç', 'C')
-            sigla = sigla.replace('%20', '')
-            sigla = re.sub(r'[^A-Z0-9]', '', sigla)
-            return sigla.strip()
-
-        # Aplica a limpeza à coluna existente
+        # Aplica a limpeza à coluna existente, uma vez por sigla distinta
         if 'sigla_instituicao' in df.columns:
-            df['sigla_instituicao'] = df['sigla_instituicao'].apply(limpar_texto)
+            siglas = df['sigla_instituicao']
+            limpas = self._aplicar_por_valor(siglas, _limpar_sigla)
+            df['sigla_instituicao'] = pd.Series(limpas, index=df.index).where(siglas.notna(), siglas)
+        return df
+    
+    def _mestras(self, siglas):
+        """Sigla mestra de cada sigla distinta (nula se nenhuma se aplica)
+    
+        Índice por substring: cada mestra é procurada uma vez em todas as siglas
+        distintas; quando mais de uma casa, vale a mais longa (em programas
+        conjuntos, 'UFSCAR/USP' vira 'UFSCARUSP', que contém UFSCAR e USP, e fica
+        com UFSCAR).
+        """
+        siglas = pd.Series(siglas, dtype=object)
+        mestras = pd.Series(None, index=siglas.index, dtype=object)
+        for mestra in sorted(INSTITUICOES_MESTRAS, key=len):
+            _, excecoes = INSTITUICOES_MESTRAS[mestra]
+            casa = siglas.str.contains(mestra, regex=False)
+            for excecao in excecoes:
+                casa &= ~siglas.str.contains(excecao, regex=False)
+            mestras[casa] = mestra
+        return dict(zip(siglas, mestras))
+    
+    def _canonizar_tripla(self, sigla, uf, pais, mestra):
+        """(sigla, uf, país) canônicos de uma instituição, na ordem dos scripts SQL"""
+        uf = '' if pd.isna(uf) or uf == 'ZZ' else uf
+        # instituicao_fixes.sql: FGV por UF e siglas que contêm uma mestra
+        if 'FGV' in sigla:
+            sigla, pais = 'FGV', 'Brasil'
+        elif pd.notna(mestra):
+            sigla, uf, pais = mestra, INSTITUICOES_MESTRAS[mestra][0], 'Brasil'
+        # puc_fixes.sql: uma PUC por UF em ESTADOS_PUC, uma sem UF no resto do Brasil
+        # e uma por país no exterior; PUCC/PUCA (Campinas) é a PUC de SP. A sigla vira
+        # 'PUC' (passo 5 do script), então PUCRS e PUCSP só diferem pela UF
+        if 'PUC' in sigla:
+            if pais == 'Brasil':
+                if 'PUCC' in sigla or 'PUCA' in sigla:
+                    uf = 'SP'
+                elif uf not in ESTADOS_PUC:
+                    uf = ''
+            elif pd.notna(pais):
+                uf = ''
+            sigla = 'PUC'
+        return sigla, uf, pais
+    
+    def _indexar_instituicoes(self, df):
+        """Resolve cada (sigla, uf, país) distinto para a instituição canônica e seu id
+    
+        Aplica as mesmas limpezas das etapas 9 e 11 às colunas da entrada, então o
+        índice pode ser montado antes do processamento, a partir só dessas colunas
+        (no modo em blocos, todos os blocos usam os mesmos ids). Substitui os merges
+        de instituicao_fixes.sql, puc_fixes.sql e small_fixes.sql, feitos no banco
+        depois da carga.
+        """
+        chave = ['sigla_instituicao', 'uf_instituicao', 'pais_instituicao']
+        triplas = self._limpar_sigla_instituicao(df[chave].drop_duplicates().copy())
+        triplas.loc[triplas['pais_instituicao'] != 'Brasil', 'uf_instituicao'] = ''
+        triplas = triplas[triplas['sigla_instituicao'].notna() & (triplas['sigla_instituicao'] != '')]
+        triplas = triplas.drop_duplicates().reset_index(drop=True)
+    
+        mestras = self._mestras(triplas['sigla_instituicao'].unique())
+        canonicas = pd.DataFrame(
+            [self._canonizar_tripla(sigla, uf, pais, mestras[sigla])
+             for sigla, uf, pais in triplas[chave].itertuples(index=False)],
+            columns=['sigla', 'uf', 'pais']
+        )
+    
+        # small_fixes.sql: no Brasil, a sigla com uma única UF absorve as ocorrências sem UF
+        brasil = canonicas['pais'] == 'Brasil'
+        ufs = canonicas[brasil & (canonicas['uf'] != '')].groupby('sigla')['uf'].unique()
+        uf_unica = ufs[ufs.str.len() == 1].str[0]
+        sem_uf = brasil & (canonicas['uf'] == '') & canonicas['sigla'].isin(uf_unica.index)
+        canonicas.loc[sem_uf, 'uf'] = canonicas.loc[sem_uf, 'sigla'].map(uf_unica)
+    
+        canonicas['regiao'] = np.where(brasil, canonicas['uf'].map(self.uf_to_region), '')
+        canonicas['regiao'] = canonicas['regiao'].where(canonicas['regiao'].notna(), None)
+        canonicas['instituicao_id'] = canonicas.groupby(['sigla', 'uf', 'pais'], dropna=False, sort=True).ngroup() + 1
+    
+        self.indice_instituicoes = pd.concat([triplas[chave], canonicas], axis=1)
+        self.instituicoes_digest = hashlib.sha256(
+            pd.util.hash_pandas_object(self.indice_instituicoes, index=False).to_numpy().tobytes()
+        ).hexdigest()[:16]
+        print(f"✓ {len(triplas):,} combinações de sigla/UF/país -> "
+              f"{canonicas['instituicao_id'].max() if len(canonicas) else 0:,} instituições")
+    
+    def canonizar_instituicoes(self, df):
+        """Substitui sigla/UF/região/país pela instituição canônica e adiciona instituicao_id"""
+        chave = ['sigla_instituicao', 'uf_instituicao', 'pais_instituicao']
+        if self.indice_instituicoes is None:
+            self._indexar_instituicoes(df)
+        canonico = df[chave].merge(self.indice_instituicoes, on=chave, how='left')
+        encontrado = canonico['instituicao_id'].notna().to_numpy()
+        for destino, origem in [('sigla_instituicao', 'sigla'), ('uf_instituicao', 'uf'),
+                                ('regiao_instituicao', 'regiao'), ('pais_instituicao', 'pais')]:
+            df.loc[encontrado, destino] = canonico.loc[encontrado, origem].to_numpy()
+        df['instituicao_id'] = canonico['instituicao_id'].astype('Int32').to_numpy()
         return df
     
     def corrigir_area(self, df):
@@ -309,7 +629,8 @@ class LattesDataProcessor:
             'numero_identificador', 'genero', 'data_atualizacao', 'uf_nascimento', 'capital_nascimento',
             'regiao_nascimento', 'pais_nascimento', 'tipo_formacao', 'curso_concluido',
             'ano_inicio', 'ano_conclusao', 'grande_area', 'area', 'flag_bolsa',
-            'sigla_instituicao', 'uf_instituicao', 'regiao_instituicao', 'pais_instituicao'
+            'sigla_instituicao', 'uf_instituicao', 'regiao_instituicao', 'pais_instituicao',
+            'instituicao_id'
         ]
         
         # Garante que apenas colunas existentes sejam selecionadas para evitar erros
@@ -317,121 +638,541 @@ class LattesDataProcessor:
                 
         return df[existing_columns]
     
-    def process_data(self):
-        """Processa o arquivo de dados"""
-        print("\nCarregando dados de currículos...")
+    def _tipar_saida(self, df):
+        """Converte as colunas finais para os tipos de OUTPUT_SCHEMA
         
-        if self.input_file.suffix == '.parquet':
-            df = pd.read_parquet(self.input_file)
-        elif self.input_file.suffix == '.csv':
-            df = pd.read_csv(self.input_file, encoding='utf-8-sig')
-        else:
-            raise ValueError("Use .parquet ou .csv")
+        Devolve o DataFrame tipado (category, Int16...) e a tabela Arrow
+        correspondente, com as linhas ordenadas por ano_conclusao (ordem estável,
+        nulos no fim). Anos fora do intervalo do int16 são erros de digitação
+        e viram nulos.
+        """
+        df = df.copy()
+        for field in OUTPUT_SCHEMA:
+            col = field.name
+            if pa.types.is_dictionary(field.type):
+                df[col] = df[col].astype('category')
+            elif pa.types.is_int16(field.type):
+                anos = pd.to_numeric(df[col], errors='coerce')
+                df[col] = anos.where(anos.between(-32768, 32767)).astype('Int16')
+            elif pa.types.is_int32(field.type):
+                df[col] = df[col].astype('Int32')
+            elif pa.types.is_string(field.type) and df[col].dtype != 'str':
+                df[col] = df[col].astype('str')
+        df = df.sort_values('ano_conclusao', kind='stable', na_position='last', ignore_index=True)
+        return df, pa.Table.from_pandas(df, schema=OUTPUT_SCHEMA, preserve_index=False)
+    
+    def _etapa_regioes(self, df):
+        df['regiao_nascimento'] = df['uf_nascimento'].apply(self.get_region_from_uf)
+        df['regiao_instituicao'] = df['uf_instituicao'].apply(self.get_region_from_uf)
+        return df
+    
+    def _etapa_grande_area(self, df):
+        df['grande_area'] = self._resolver_por_combinacao(
+            df, self.process_grande_area, 'curso_grande_area', 'grande_area_formacao'
+        )
+        return df
+    
+    def _etapa_area(self, df):
+        df['area'] = self._resolver_por_combinacao(
+            df, self.process_area, 'curso_area', 'area_formacao'
+        )
+        return df
+    
+    def _etapa_genero(self, df):
+        df['genero'] = self.predict_gender_batch(df['nome_completo'])
+        return df
+    
+    def _etapas(self):
+        """Etapas 1 a 12: (número, descrição, função, colunas de entrada, colunas de saída,
+        código do qual o resultado depende, configuração da qual o resultado depende)
         
-        print(f"✓ Carregados {len(df):,} registros")
+        No código basta a função da etapa: os auxiliares que ela usa são seguidos
+        por _codigo_etapa.
+        """
+        return [
+            (1, "Adicionando regiões", self._etapa_regioes,
+             ['uf_nascimento', 'uf_instituicao'], ['regiao_nascimento', 'regiao_instituicao'],
+             [self._etapa_regioes], self.uf_to_region),
+            (2, "Processando grande_area_definitivo", self._etapa_grande_area,
+             ['curso_grande_area', 'grande_area_formacao'], ['grande_area'],
+             [self._etapa_grande_area], None),
+            (3, "Processando area_definitivo", self._etapa_area,
+             ['curso_area', 'area_formacao'], ['area'],
+             [self._etapa_area], None),
+            (4, "Predizendo gênero", self._etapa_genero,
+             ['nome_completo'], ['genero'],
+             [self._etapa_genero], self.grupos_digest),
+            (5, "Convertendo 'flag_bolsa' para booleano", self.process_flag_bolsa,
+             ['flag_bolsa'], ['flag_bolsa'], [self.process_flag_bolsa], None),
+            (6, "Convertendo 'status_curso' para booleano", self.process_status_curso,
+             ['status_curso'], ['curso_concluido'], [self.process_status_curso], None),
+            (7, "Convertendo tipos de dados", self._convert_data_types,
+             ['data_atualizacao', 'ano_inicio', 'ano_conclusao'],
+             ['data_atualizacao', 'ano_inicio', 'ano_conclusao'], [self._convert_data_types], None),
+            (8, "Verificando se a cidade de nascimento é capital", self._create_capital_column,
+             ['uf_nascimento', 'cidade_nascimento'], ['capital_nascimento'],
+             [self._create_capital_column], CAPITAIS),
+            (9, "Limpando siglas de instituições", self._limpar_sigla_instituicao,
+             ['sigla_instituicao'], ['sigla_instituicao'],
+             [self._limpar_sigla_instituicao], None),
+            (10, "Corrigindo nomes de áreas", self.corrigir_area,
+             ['area'], ['area'], [self.corrigir_area], None),
+            (11, "Limpando uf do exterior", self.limpar_campos_exterior,
+             ['pais_instituicao', 'pais_nascimento', 'uf_instituicao', 'regiao_instituicao',
+              'uf_nascimento', 'regiao_nascimento'],
+             ['uf_instituicao', 'regiao_instituicao', 'uf_nascimento', 'regiao_nascimento'],
+             [self.limpar_campos_exterior], None),
+            (12, "Canonizando instituições", self.canonizar_instituicoes,
+             ['sigla_instituicao', 'uf_instituicao', 'pais_instituicao'],
+             ['sigla_instituicao', 'uf_instituicao', 'regiao_instituicao', 'pais_instituicao', 'instituicao_id'],
+             [self.canonizar_instituicoes], self.instituicoes_digest),
+        ]
+    
+    def _codigo_etapa(self, codigo):
+        """Código-fonte das funções listadas e de tudo o que elas chamam
         
-        # Resetar estatísticas
-        self.stats = {
-            'nomes_nao_classificados': set()
+        Segue, recursivamente, os métodos usados como self.<nome> e as funções
+        deste módulo citadas pelo nome, então editar um auxiliar (ex:
+        _normalize_text) também invalida o cache das etapas que o usam.
+        """
+        fontes = {}
+        pendentes = list(codigo)
+        while pendentes:
+            func = pendentes.pop()
+            func = inspect.unwrap(getattr(func, '__func__', func))
+            if func.__qualname__ in fontes:
+                continue
+            fonte = inspect.getsource(func)
+            fontes[func.__qualname__] = fonte
+            for nome in re.findall(r'self\.(\w+)', fonte):
+                metodo = inspect.getattr_static(type(self), nome, None)
+                if isinstance(metodo, (staticmethod, classmethod)):
+                    metodo = metodo.__func__
+                elif isinstance(metodo, property):
+                    metodo = metodo.fget
+                if inspect.isfunction(metodo):
+                    pendentes.append(metodo)
+            for nome in re.findall(r'\b(\w+)\b', fonte):
+                funcao = globals().get(nome)
+                if callable(funcao):
+                    funcao = inspect.unwrap(funcao)
+                    if inspect.isfunction(funcao) and funcao.__module__ == __name__:
+                        pendentes.append(funcao)
+        return [fontes[nome] for nome in sorted(fontes)]
+    
+    def _chave_etapa(self, df, entradas, codigo, config):
+        """Hash das colunas de entrada (valores e tipos), do código e da configuração da etapa"""
+        chave = hashlib.sha256()
+        chave.update(f"{len(df)}|{[(c, str(df[c].dtype)) for c in entradas]}".encode())
+        if entradas:
+            chave.update(pd.util.hash_pandas_object(df[entradas], index=False).to_numpy().tobytes())
+        for fonte in self._codigo_etapa(codigo):
+            chave.update(fonte.encode())
+        chave.update(repr(config).encode())
+        return chave.hexdigest()[:24]
+    
+    def _executar_etapa(self, df, etapa):
+        """Executa uma etapa ou reaproveita o resultado do cache; retorna (df, veio_do_cache)"""
+        numero, descricao, func, entradas, saidas, codigo, config = etapa
+        if not self.cache_etapas:
+            print(f"{numero}. {descricao}...")
+            return func(df), False
+        
+        entradas = [c for c in entradas if c in df.columns]
+        chave = self._chave_etapa(df, entradas, codigo, config)
+        cache_dir = self.cache_dir / "etapas"
+        cache_file = cache_dir / f"etapa{numero:02d}_{chave}.pkl"
+        meta_file = cache_file.with_suffix('.json')
+        
+        self.arquivos_cache.add(cache_file.name)
+        
+        if cache_file.exists() and meta_file.exists():
+            print(f"{numero}. {descricao}... (cache)")
+            # mtime marca o último uso (ordem de descarte de _limpar_cache_etapas)
+            os.utime(cache_file)
+            resultado = pd.read_pickle(cache_file)
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            for col in resultado.columns:
+                df[col] = resultado[col].set_axis(df.index)
+            df = df.drop(columns=[c for c in meta['removidas'] if c in df.columns])
+            self.stats['nomes_nao_classificados'].update(meta['nomes_nao_classificados'])
+            return df, True
+        
+        print(f"{numero}. {descricao}...")
+        colunas_antes = list(df.columns)
+        nomes_antes = set(self.stats['nomes_nao_classificados'])
+        df = func(df)
+        meta = {
+            'removidas': [c for c in colunas_antes if c not in df.columns],
+            'nomes_nao_classificados': sorted(self.stats['nomes_nao_classificados'] - nomes_antes)
         }
         
-        print("\n1. Adicionando regiões...")
-        df['regiao_nascimento'] = df['uf_nascimento'].apply(self.get_region_from_uf)
-        df['regiao_instituicao'] = df['uf_instituicao'].apply(self.get_region_from_uf)
+        # Gravação atômica: processos do modo em blocos podem gravar ao mesmo tempo
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        sufixo_tmp = f".{os.getpid()}.tmp"
+        df[[c for c in saidas if c in df.columns]].reset_index(drop=True).to_pickle(str(cache_file) + sufixo_tmp)
+        with open(str(meta_file) + sufixo_tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(str(cache_file) + sufixo_tmp, cache_file)
+        os.replace(str(meta_file) + sufixo_tmp, meta_file)
+        return df, False
+    
+    def _limpar_cache_etapas(self):
+        """Apaga entradas do cache de etapas não usadas nesta execução até caber em cache_etapas_mb
         
-        print("2. Processando grande_area_definitivo...")
-        df['grande_area'] = df.apply(
-            lambda row: self.process_grande_area(
-                row.get('curso_grande_area'),
-                row.get('grande_area_formacao')
-            ),
-            axis=1
-        )
+        As entradas usadas há mais tempo saem primeiro; as usadas nesta execução
+        (self.arquivos_cache) nunca são apagadas.
+        """
+        cache_dir = self.cache_dir / "etapas"
+        if not self.cache_etapas or not cache_dir.exists():
+            return
+        entradas = []
+        total = 0
+        for cache_file in cache_dir.glob("etapa*.pkl"):
+            meta_file = cache_file.with_suffix('.json')
+            tamanho = cache_file.stat().st_size + (meta_file.stat().st_size if meta_file.exists() else 0)
+            total += tamanho
+            if cache_file.name not in self.arquivos_cache:
+                entradas.append((cache_file.stat().st_mtime, cache_file, meta_file, tamanho))
         
-        print("3. Processando area_definitivo...")
-        df['area'] = df.apply(
-            lambda row: self.process_area(
-                row.get('curso_area'),
-                row.get('area_formacao')
-            ),
-            axis=1
-        )
+        limite = self.cache_etapas_mb * 1024 * 1024
+        apagadas = 0
+        for _, cache_file, meta_file, tamanho in sorted(entradas, key=lambda e: e[0]):
+            if total <= limite:
+                break
+            cache_file.unlink(missing_ok=True)
+            meta_file.unlink(missing_ok=True)
+            total -= tamanho
+            apagadas += 1
+        if apagadas:
+            print(f"✓ {apagadas:,} entradas antigas removidas do cache de etapas ({total / 1024 / 1024:,.0f} MB)")
+    
+    def _enriquecer(self, df):
+        """Etapas 1 a 12 do processamento
         
-        print("4. Predizendo gênero...")
-        df['genero'] = df['nome_completo'].apply(self.predict_gender)
-
-        # Salvar nomes não classificados
+        Cada etapa só depende da própria linha (e da base de nomes), então o
+        DataFrame pode ser processado inteiro ou em blocos independentes. Com
+        cache_etapas, cada etapa cujas colunas de entrada e código não mudaram
+        desde a última execução é lida do cache; self.etapas_em_cache registra
+        quais etapas foram reaproveitadas.
+        """
+        print()
+        self.etapas_em_cache = {}
+        for etapa in self._etapas():
+            df, em_cache = self._executar_etapa(df, etapa)
+            self.etapas_em_cache[etapa[0]] = em_cache
+        return df
+    
+    def _imprimir_relatorio_cache(self, em_cache, blocos=1):
+        """Resumo das etapas reaproveitadas (em_cache: etapa -> nº de blocos vindos do cache)"""
+        if not self.cache_etapas:
+            return
+        print(f"\nCache de etapas ({self.cache_dir / 'etapas'}):")
+        for numero, descricao, *_ in self._etapas():
+            hits = int(em_cache.get(numero, 0))
+            situacao = "cache" if hits == blocos else "recalculada" if hits == 0 else f"cache em {hits}/{blocos} blocos"
+            print(f"  {numero:>2}. {descricao}: {situacao}")
+    
+    def _salvar_nomes_nao_classificados(self):
         if self.stats['nomes_nao_classificados']:
             nomes_file = self.output_dir / "nomes_nao_classificados.txt"
             with open(nomes_file, 'w', encoding='utf-8') as f:
                 for nome in sorted(self.stats['nomes_nao_classificados']):
                     f.write(f"{nome}\n")
+    
+    def _contagens(self, df):
+        """Contagens usadas nas estatísticas; somáveis entre blocos (ver _somar_contagens)"""
+        return {
+            'total': len(df),
+            'regiao_nascimento': df['regiao_nascimento'].value_counts(),
+            'regiao_instituicao': df['regiao_instituicao'].value_counts(),
+            'genero': df['genero'].value_counts(),
+            'genero_indeterminado': int(df['genero'].isna().sum()),
+            'flag_bolsa': df['flag_bolsa'].value_counts(),
+            'capital_nascimento': df['capital_nascimento'].value_counts()
+        }
+    
+    @staticmethod
+    def _somar_contagens(total, bloco):
+        if total is None:
+            return bloco
+        return {
+            chave: (valor + bloco[chave] if not isinstance(valor, pd.Series)
+                    else valor.add(bloco[chave], fill_value=0).astype('int64').sort_values(ascending=False))
+            for chave, valor in total.items()
+        }
+    
+    def _imprimir_estatisticas(self, contagens):
+        total = contagens['total']
+        indeterminado = contagens['genero_indeterminado']
         
-        # Transformar colunas para booleano
-        print("5. Convertendo 'flag_bolsa' para booleano...")
-        df = self.process_flag_bolsa(df)
-        print("6. Convertendo 'status_curso' para booleano...")
-        df = self.process_status_curso(df)
-
-        # Converter tipos de dados
-        print("7. Convertendo tipos de dados...")
-        df = self._convert_data_types(df)
-
-        # Adiciona a coluna de capital
-        print("8. Verificando se a cidade de nascimento é capital...")
-        df = self._create_capital_column(df)
-
-        # Deixar dados mais bonitos
-        print("9. Limpando siglas de instituições...")
-        df = self._limpar_sigla_instituicao(df)
-
-        print("10. Corrigindo nomes de áreas...")
-        df = self.corrigir_area(df)
-
-        print("11. Limpando uf do exterior...")
-        df = self.limpar_campos_exterior(df)
-
-        # Selecionar e ordenar colunas
-        print("12. Selecionando e ordenando colunas finais...")
-        df_final = self.select_and_order_columns(df)
-        
-        # Estatísticas
         print("\n" + "="*60)
         print("ESTATÍSTICAS")
         print("="*60)
-        print(f"Total de registros: {len(df):,}")
+        print(f"Total de registros: {total:,}")
         
         print(f"\nRegiões de nascimento:")
-        print(df['regiao_nascimento'].value_counts().to_string())
+        print(contagens['regiao_nascimento'].to_string())
         
         print(f"\nRegiões de instituição:")
-        print(df['regiao_instituicao'].value_counts().to_string())
+        print(contagens['regiao_instituicao'].to_string())
 
         print(f"\nDistribuição de gênero:")
-        print(df['genero'].value_counts().to_string())
-        print(f"Gênero indeterminado: {df['genero'].isna().sum():,} ({df['genero'].isna().sum()/len(df)*100:.1f}%)")
+        print(contagens['genero'].to_string())
+        print(f"Gênero indeterminado: {indeterminado:,} ({indeterminado/total*100:.1f}%)")
         print(f"Nomes únicos não classificados: {len(self.stats['nomes_nao_classificados']):,}")
         
         print(f"\nDistribuição de bolsas:")
-        print(df['flag_bolsa'].value_counts().to_string())
+        print(contagens['flag_bolsa'].to_string())
 
         print("\nEstatísticas de Nascimento em Capital:")
-        print(df['capital_nascimento'].value_counts().to_string())
-        print(f"Percentual de nascidos em capital: {df['capital_nascimento'].mean()*100:.2f}%")
+        print(contagens['capital_nascimento'].to_string())
+        capitais = contagens['capital_nascimento'].get(True, 0)
+        print(f"Percentual de nascidos em capital: {capitais/total*100:.2f}%")
+    
+    def process_data(self, chunk_size=None, workers=None, salvar_csv=False, compression='zstd',
+                     verbose=False):
+        """Processa o arquivo de dados
+        
+        Args:
+            chunk_size: Se informado, processa em blocos de chunk_size linhas lidos
+                        em streaming (row groups do Parquet), em um pool de processos,
+                        gravando o Parquet (e o CSV) de saída bloco a bloco. A memória
+                        fica limitada aos blocos em andamento e o método retorna None.
+                        A ordenação por ano_conclusao vale dentro de cada bloco
+            workers: Número de processos do modo em blocos (None = todos os núcleos)
+            salvar_csv: Também grava curriculos_processados.csv (usado pelo load_data.sql)
+            compression: Codec do Parquet ('zstd', 'snappy', 'gzip', 'none'...)
+            verbose: No modo em blocos, mostra também os prints das etapas de cada
+                     bloco (na ordem dos blocos)
+        
+        Returns:
+            Em memória, o DataFrame final com os tipos de OUTPUT_SCHEMA, ordenado por
+            ano_conclusao (nulos no fim) e com o índice refeito (0..n-1) por
+            _tipar_saida: a ordem das linhas não é mais a da entrada
+        """
+        if chunk_size is not None:
+            self._process_chunked(chunk_size, workers, salvar_csv, compression, verbose)
+            return None
+        
+        print("\nCarregando dados de currículos...")
+        
+        # Diretório: saída direta do parser (output_format="parquet"), um arquivo por pasta
+        if self.input_file.is_dir() or self.input_file.suffix == '.parquet':
+            df = pd.read_parquet(self.input_file)
+        elif self.input_file.suffix == '.csv':
+            df = pd.read_csv(self.input_file, encoding='utf-8-sig')
+        else:
+            raise ValueError("Use .parquet ou .csv")
+        
+        print(f"✓ Carregados {len(df):,} registros")
+        
+        # Resetar estatísticas
+        self.stats = {
+            'nomes_nao_classificados': set()
+        }
+        
+        self._indexar_instituicoes(df)
+        self.arquivos_cache = set()
+        df = self._enriquecer(df)
+        self._imprimir_relatorio_cache(self.etapas_em_cache)
+        self._limpar_cache_etapas()
+        
+        # Salvar nomes não classificados
+        self._salvar_nomes_nao_classificados()
+
+        # Selecionar e ordenar colunas
+        print("13. Selecionando e ordenando colunas finais...")
+        df_final = self.select_and_order_columns(df)
+        
+        # Estatísticas
+        self._imprimir_estatisticas(self._contagens(df))
 
         # Salvar
         output_parquet = self.output_dir / "curriculos_processados.parquet"
         output_csv = self.output_dir / "curriculos_processados.csv"
         
         print(f"\nSalvando arquivos...")
-        df_final.to_parquet(output_parquet, index=False)
-        df_final.to_csv(output_csv, index=False, encoding='utf-8-sig')
-        
+        df_final, table = self._tipar_saida(df_final)
+        pq.write_table(table, output_parquet, compression=compression, row_group_size=ROW_GROUP_SIZE)
         print(f"✓ Parquet: {output_parquet}")
-        print(f"✓ CSV: {output_csv}")
+        if salvar_csv:
+            df_final.to_csv(output_csv, index=False, encoding='utf-8-sig')
+            print(f"✓ CSV: {output_csv}")
         print("="*60)
         
         return df_final
+    
+    def _ler_colunas(self, colunas):
+        """Lê só algumas colunas da entrada inteira (usado para montar índices globais)"""
+        if self.input_file.is_dir() or self.input_file.suffix == '.parquet':
+            return pd.read_parquet(self.input_file, columns=colunas)
+        elif self.input_file.suffix == '.csv':
+            return pd.read_csv(self.input_file, encoding='utf-8-sig', usecols=colunas)
+        raise ValueError("Use .parquet ou .csv")
+    
+    def _ler_blocos(self, chunk_size):
+        """Lê a entrada em blocos de até chunk_size linhas (RecordBatch ou DataFrame)"""
+        if self.input_file.is_dir() or self.input_file.suffix == '.parquet':
+            return ds.dataset(self.input_file, format='parquet').to_batches(batch_size=chunk_size)
+        elif self.input_file.suffix == '.csv':
+            return pd.read_csv(self.input_file, encoding='utf-8-sig', chunksize=chunk_size)
+        raise ValueError("Use .parquet ou .csv")
+    
+    def _process_chunked(self, chunk_size, workers, salvar_csv, compression, verbose=False):
+        """Processa a entrada em blocos em um pool de processos, gravando a saída em ordem
+        
+        Cada processo recebe uma cópia do processador (com a base de nomes) uma
+        única vez. No máximo 2 blocos por processo ficam em andamento; os
+        resultados são gravados na ordem da entrada, e as estatísticas e os nomes
+        não classificados de cada bloco são somados no final.
+        """
+        workers = workers or os.cpu_count() or 1
+        print(f"\nProcessando em blocos de {chunk_size:,} linhas com {workers} processo(s)...")
+        
+        # Ids de instituição são globais: o índice é montado antes, só com as colunas necessárias
+        self._indexar_instituicoes(self._ler_colunas(['sigla_instituicao', 'uf_instituicao', 'pais_instituicao']))
+        
+        output_parquet = self.output_dir / "curriculos_processados.parquet"
+        output_csv = self.output_dir / "curriculos_processados.csv"
+        tmp_parquet = output_parquet.with_name(output_parquet.name + '.tmp')
+        
+        self.stats = {
+            'nomes_nao_classificados': set()
+        }
+        self.arquivos_cache = set()
+        contagens = None
+        writer = None
+        em_cache = {}
+        blocos = 0
+        
+        def gravar(future):
+            nonlocal contagens, writer, blocos
+            df_final, contagens_bloco, nomes, etapas_em_cache, arquivos_cache, saida = future.result()
+            if verbose:
+                print(saida, end='')
+            contagens = self._somar_contagens(contagens, contagens_bloco)
+            self.stats['nomes_nao_classificados'] |= nomes
+            self.arquivos_cache |= arquivos_cache
+            for numero, hit in etapas_em_cache.items():
+                em_cache[numero] = em_cache.get(numero, 0) + hit
+            blocos += 1
+            
+            df_final, table = self._tipar_saida(df_final)
+            if writer is None:
+                # Metadados do pandas do primeiro bloco, para a leitura voltar com os mesmos dtypes
+                writer = pq.ParquetWriter(tmp_parquet, table.schema, compression=compression)
+            writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+            if csv_file is not None:
+                df_final.to_csv(csv_file, index=False, header=csv_file.tell() == 0)
+            print(f"  {contagens['total']:,} registros processados")
+        
+        csv_file = open(output_csv, 'w', encoding='utf-8-sig', newline='') if salvar_csv else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+            try:
+                pending = deque()
+                for bloco in self._ler_blocos(chunk_size):
+                    pending.append(executor.submit(_enriquecer_bloco, bloco))
+                    if len(pending) >= 2 * workers:
+                        gravar(pending.popleft())
+                while pending:
+                    gravar(pending.popleft())
+            finally:
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_parquet, OUTPUT_SCHEMA, compression=compression)
+                writer.close()
+                if csv_file is not None:
+                    csv_file.close()
+        os.replace(tmp_parquet, output_parquet)
+        
+        self._salvar_nomes_nao_classificados()
+        if blocos:
+            self._imprimir_relatorio_cache(em_cache, blocos)
+        self._limpar_cache_etapas()
+        if contagens is not None:
+            self._imprimir_estatisticas(contagens)
+        
+        print(f"\n✓ Parquet: {output_parquet}")
+        if salvar_csv:
+            print(f"✓ CSV: {output_csv}")
+        print("="*60)
+
+
+def load_processed(columns=None, filters=None, path="output_lattes/curriculos_processados.parquet"):
+    """Lê curriculos_processados.parquet só com as colunas e linhas pedidas, já tipado
+    
+    Os filtros viram uma expressão do pyarrow, avaliada durante a leitura: row
+    groups cujas estatísticas (mínimo/máximo) não podem satisfazê-la nem são
+    lidos, e as colunas não pedidas não saem do disco. O resultado vem com os
+    tipos de OUTPUT_SCHEMA (category, Int16, Int32, bool), sem conversões manuais.
+    
+    Args:
+        columns: Colunas a carregar (None = todas)
+        filters: Dict coluna -> condição. Um valor único compara igualdade; uma
+                 lista ou conjunto aceita qualquer um dos valores; uma tupla
+                 (mínimo, máximo) filtra o intervalo fechado, ex:
+                 {'ano_conclusao': (1970, 2025), 'tipo_formacao': ['DOUTORADO'],
+                  'uf_instituicao': 'SP'}
+        path: Parquet de saída do process_data (ou pasta de Parquets)
+    """
+    expressao = None
+    for coluna, condicao in (filters or {}).items():
+        campo = ds.field(coluna)
+        if isinstance(condicao, tuple):
+            minimo, maximo = condicao
+            parte = (campo >= minimo) & (campo <= maximo)
+        elif isinstance(condicao, (list, set, frozenset, range)):
+            parte = campo.isin(list(condicao))
+        else:
+            parte = campo == condicao
+        expressao = parte if expressao is None else expressao & parte
+    
+    dataset = ds.dataset(path, format='parquet')
+    table = dataset.to_table(columns=columns, filter=expressao)
+    df = table.to_pandas()
+    
+    # Parquets sem os metadados do pandas (ex: gravados por outras ferramentas)
+    for field in OUTPUT_SCHEMA:
+        if field.name not in df.columns:
+            continue
+        if pa.types.is_dictionary(field.type) and not isinstance(df[field.name].dtype, pd.CategoricalDtype):
+            df[field.name] = df[field.name].astype('category')
+        elif pa.types.is_int16(field.type):
+            df[field.name] = df[field.name].astype('Int16')
+        elif pa.types.is_int32(field.type):
+            df[field.name] = df[field.name].astype('Int32')
+    return df
+
+
+# Processador copiado para cada processo do modo em blocos (ver _init_worker)
+_worker_processor = None
+
+
+def _init_worker(processor):
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _enriquecer_bloco(bloco):
+    """Executado nos processos do pool: etapas 1 a 12 em um bloco
+    
+    Os prints das etapas são capturados e devolvidos junto com o resultado (o
+    processo principal os mostra em ordem, se verbose), em vez de saírem
+    intercalados entre os processos. O stderr não é tocado.
+    """
+    processor = _worker_processor
+    with contextlib.redirect_stdout(io.StringIO()) as saida:
+        df = bloco.to_pandas() if isinstance(bloco, pa.RecordBatch) else bloco
+        processor.stats = {
+            'nomes_nao_classificados': set()
+        }
+        processor.arquivos_cache = set()
+        df = processor._enriquecer(df)
+        resultado = (processor.select_and_order_columns(df), processor._contagens(df),
+                     processor.stats['nomes_nao_classificados'], processor.etapas_em_cache,
+                     processor.arquivos_cache)
+    return resultado + (saida.getvalue(),)
 
 
 if __name__ == "__main__":
@@ -441,4 +1182,7 @@ if __name__ == "__main__":
         output_dir="output_lattes"
     )
     
-    df = processor.process_data()
\ No newline at end of file
+    # Para o dump completo, processe em blocos em todos os núcleos:
+    # processor.process_data(chunk_size=500_000, salvar_csv=True)
+    # O CSV é lido pelo SQL/SQL_Load/load_data.sql
+    df = processor.process_data(salvar_csv=True)
\ No newline at end of file
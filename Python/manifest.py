@@ -0,0 +1,99 @@
+import sqlite3
+from pathlib import Path
+
+
+class ManifestIndex:
+    """Índice persistente dos ZIPs já processados, usado no modo incremental
+
+    Cada ZIP (caminho relativo à base, ex: "00/0000000000000001.zip") guarda
+    tamanho, mtime, hash do conteúdo e o NUMERO-IDENTIFICADOR/DATA-ATUALIZACAO
+    do XML. Um ZIP com o mesmo tamanho e mtime não é relido; com o mesmo hash não
+    é reparseado. Entradas não vistas na execução atual viram tombstones.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                path TEXT PRIMARY KEY,
+                folder TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha1 TEXT NOT NULL,
+                numero_identificador TEXT,
+                data_atualizacao TEXT,
+                removed INTEGER NOT NULL DEFAULT 0,
+                run_id TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_arquivos_folder ON arquivos(folder)")
+        self.conn.commit()
+
+    def get(self, path):
+        """Retorna (size, mtime, sha1, removed) do ZIP, ou None se nunca foi visto"""
+        return self.conn.execute(
+            "SELECT size, mtime, sha1, removed FROM arquivos WHERE path = ?", (path,)
+        ).fetchone()
+
+    def touch(self, path, run_id, size, mtime):
+        """Marca um ZIP inalterado como visto nesta execução"""
+        self.conn.execute(
+            "UPDATE arquivos SET run_id = ?, size = ?, mtime = ? WHERE path = ?",
+            (run_id, size, mtime, path)
+        )
+
+    def keep(self, path, run_id):
+        """Marca um ZIP como visto sem alterar tamanho, mtime e hash
+
+        Usado quando uma versão nova do ZIP não pôde ser lida: a versão anterior
+        continua valendo (nada de tombstone) e o arquivo é tentado de novo na
+        próxima execução.
+        """
+        self.conn.execute("UPDATE arquivos SET run_id = ? WHERE path = ?", (run_id, path))
+
+    def upsert(self, path, run_id, size, mtime, sha1, numero_identificador, data_atualizacao):
+        """Registra um ZIP novo ou alterado"""
+        self.conn.execute("""
+            INSERT INTO arquivos (path, folder, size, mtime, sha1, numero_identificador,
+                                  data_atualizacao, removed, run_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size = excluded.size, mtime = excluded.mtime, sha1 = excluded.sha1,
+                numero_identificador = excluded.numero_identificador,
+                data_atualizacao = excluded.data_atualizacao,
+                removed = 0, run_id = excluded.run_id
+        """, (path, path.split('/')[0], size, mtime, sha1, numero_identificador, data_atualizacao, run_id))
+
+    def mark_removed(self, run_id, folders):
+        """Marca como removidos os ZIPs das pastas percorridas que não foram vistos
+
+        Retorna os NUMERO-IDENTIFICADOR que deixaram de existir (tombstones). Um
+        currículo que apenas mudou de caminho continua ativo e não é retornado.
+        """
+        folders = list(folders)
+        if not folders:
+            return []
+        placeholders = ",".join("?" * len(folders))
+        self.conn.execute(f"""
+            UPDATE arquivos SET removed = 1, run_id = ?
+            WHERE run_id <> ? AND removed = 0 AND folder IN ({placeholders})
+        """, (run_id, run_id, *folders))
+        rows = self.conn.execute("""
+            SELECT DISTINCT numero_identificador FROM arquivos
+            WHERE removed = 1 AND run_id = ? AND numero_identificador IS NOT NULL
+              AND numero_identificador NOT IN (
+                  SELECT numero_identificador FROM arquivos
+                  WHERE removed = 0 AND numero_identificador IS NOT NULL
+              )
+            ORDER BY numero_identificador
+        """, (run_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
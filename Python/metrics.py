@@ -0,0 +1,141 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Etapas medidas na ingestão, na ordem do pipeline
+STAGES = ('zip_open', 'decompress', 'xml_parse', 'dict_build', 'serialize', 'write')
+
+
+class PipelineMetrics:
+    """Tempo acumulado por etapa da ingestão (wall e CPU separados), com exportação periódica
+
+    Cada etapa é medida com stage(nome). O tempo de CPU é o da thread atual, então
+    uma etapa esperando disco acumula wall mas quase nenhum CPU. Se export_dir for
+    informado, export() acrescenta um snapshot em metrics.jsonl e regrava
+    metrics.prom (formato texto do Prometheus, para o textfile collector).
+    """
+
+    def __init__(self, export_dir=None, interval=30.0):
+        """
+        Args:
+            export_dir: Pasta onde metrics.jsonl e metrics.prom são gravados (None = não exporta)
+            interval: Intervalo mínimo em segundos entre exportações de maybe_export()
+        """
+        self.wall = dict.fromkeys(STAGES, 0.0)
+        self.cpu = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+        self.counters = {"files": 0, "errors": 0}
+        self.gauges = {}
+        self.export_dir = Path(export_dir) if export_dir is not None else None
+        self.interval = interval
+        self.start_time = time.perf_counter()
+        self.last_export = self.start_time
+
+    @contextmanager
+    def stage(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.wall[name] += time.perf_counter() - wall_start
+            self.cpu[name] += time.thread_time() - cpu_start
+            self.calls[name] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def eta_seconds(self, files_remaining):
+        """Tempo restante estimado pela taxa de arquivos desta execução"""
+        elapsed = self.elapsed()
+        rate = self.counters["files"] / elapsed if elapsed > 0 else 0
+        eta = files_remaining / rate if rate > 0 else None
+        self.gauges["eta_seconds"] = eta
+        self.gauges["files_remaining"] = files_remaining
+        return eta
+
+    def snapshot(self):
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "elapsed_seconds": self.elapsed(),
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "stages": {
+                name: {
+                    "wall_seconds": self.wall[name],
+                    "cpu_seconds": self.cpu[name],
+                    "calls": self.calls[name],
+                }
+                for name in STAGES
+            },
+        }
+
+    def merge(self, snapshot):
+        """Soma um snapshot de outro processo (ex: um worker do modo paralelo)"""
+        for name, values in snapshot["stages"].items():
+            self.wall[name] += values["wall_seconds"]
+            self.cpu[name] += values["cpu_seconds"]
+            self.calls[name] += values["calls"]
+        for name, value in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def maybe_export(self):
+        if self.export_dir is not None and time.perf_counter() - self.last_export >= self.interval:
+            self.export()
+
+    def export(self):
+        if self.export_dir is None:
+            return
+        self.last_export = time.perf_counter()
+        snapshot = self.snapshot()
+        with open(self.export_dir / "metrics.jsonl", 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot) + '\n')
+
+        prom_file = self.export_dir / "metrics.prom"
+        tmp_file = prom_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text(snapshot))
+        os.replace(tmp_file, prom_file)
+
+    def prometheus_text(self, snapshot=None):
+        snapshot = snapshot or self.snapshot()
+        lines = []
+        for metric, key, help_text in (
+            ("lattes_stage_wall_seconds_total", "wall_seconds", "Tempo de relógio acumulado por etapa"),
+            ("lattes_stage_cpu_seconds_total", "cpu_seconds", "Tempo de CPU acumulado por etapa"),
+            ("lattes_stage_calls_total", "calls", "Execuções de cada etapa"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, values in snapshot["stages"].items():
+                lines.append(f'{metric}{{stage="{name}"}} {values[key]}')
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE lattes_{name}_total counter")
+            lines.append(f"lattes_{name}_total {value}")
+        for name, value in snapshot["gauges"].items():
+            if value is not None:
+                lines.append(f"# TYPE lattes_{name} gauge")
+                lines.append(f"lattes_{name} {value}")
+        lines.append("# TYPE lattes_elapsed_seconds gauge")
+        lines.append(f"lattes_elapsed_seconds {snapshot['elapsed_seconds']}")
+        return '\n'.join(lines) + '\n'
+
+    def print_summary(self):
+        """Imprime o tempo de cada etapa, para ver qual é o gargalo"""
+        total_wall = sum(self.wall.values())
+        print(f"{'Etapa':<12} {'wall (s)':>10} {'CPU (s)':>10} {'% wall':>8}")
+        for name in STAGES:
+            share = self.wall[name] / total_wall if total_wall > 0 else 0
+            print(f"{name:<12} {self.wall[name]:>10.2f} {self.cpu[name]:>10.2f} {share:>8.1%}")
+
+
+def format_eta(seconds):
+    """Formata segundos como 'Xh YY min' (ou '?' se a estimativa não existe)"""
+    if seconds is None:
+        return "?"
+    hours, rest = divmod(int(seconds), 3600)
+    mins, secs = divmod(rest, 60)
+    return f"{hours}h {mins:02d} min" if hours else f"{mins} min {secs:02d} s"
@@ -1,27 +1,549 @@
 import xml.etree.ElementTree as ET
 import zipfile
 import os
+import sys
+import fileinput
+import hashlib
+import io
 import json
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
+from manifest import ManifestIndex
+from metrics import PipelineMetrics, format_eta
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml é opcional; sem ele o backend é o ElementTree
+    lxml_etree = None
+
+# Tipos de formação extraídos, na ordem em que aparecem em "formacoes"
+FORMACAO_TIPOS = ('MESTRADO', 'MESTRADO-PROFISSIONALIZANTE', 'DOUTORADO')
+
+# Tags cujos atributos são extraídos
+EXTRACTED_TAGS = frozenset(FORMACAO_TIPOS + (
+    'DADOS-GERAIS', 'INFORMACAO-ADICIONAL-INSTITUICAO', 'INFORMACAO-ADICIONAL-CURSO'
+))
+
+# Tamanho dos blocos entregues ao parser incremental
+XML_CHUNK_SIZE = 64 * 1024
+
+# Backends de parse_curriculo aceitos em LattesProcessor(parser_backend=...)
+PARSER_BACKENDS = ('auto', 'lxml', 'etree')
+
+
+def _formacao_data(tipo, attrib):
+    """Campos de uma formação (MESTRADO, DOUTORADO...) a partir dos atributos do elemento"""
+    return {
+        "tipo": tipo,
+        "codigo_instituicao": attrib.get('CODIGO-INSTITUICAO'),
+        "codigo_curso": attrib.get('CODIGO-CURSO'),
+        "codigo_area_curso": attrib.get('CODIGO-AREA-CURSO'),
+        "status": attrib.get('STATUS-DO-CURSO'),
+        "ano_inicio": attrib.get('ANO-DE-INICIO'),
+        "ano_conclusao": attrib.get('ANO-DE-CONCLUSAO'),
+        "flag_bolsa": attrib.get('FLAG-BOLSA'),
+        "areas_conhecimento": []
+    }
+
+
+def _area_conhecimento(attrib):
+    return {
+        "nome_grande_area": attrib.get('NOME-GRANDE-AREA-DO-CONHECIMENTO'),
+        "nome_area": attrib.get('NOME-DA-AREA-DO-CONHECIMENTO')
+    }
+
+
+def build_curriculo(root_attrib, dados_gerais, formacoes, instituicoes, cursos, filename=None):
+    """Monta o dicionário do currículo no mesmo formato gravado no JSONL
+    
+    Comum aos backends de parse_curriculo.
+    
+    Args:
+        root_attrib: Atributos de CURRICULO-VITAE
+        dados_gerais: Atributos do primeiro DADOS-GERAIS (ou None)
+        formacoes: Formações já na ordem de FORMACAO_TIPOS (ver _formacao_data)
+        instituicoes: Atributos de cada INFORMACAO-ADICIONAL-INSTITUICAO
+        cursos: Atributos de cada INFORMACAO-ADICIONAL-CURSO
+        filename: Nome do arquivo (usado se NUMERO-IDENTIFICADOR não existir)
+    """
+    # Pegar NUMERO-IDENTIFICADOR do root ou do nome do arquivo
+    numero_id = root_attrib.get('NUMERO-IDENTIFICADOR')
+    if not numero_id and filename:
+        # Remove extensão .zip do filename
+        numero_id = filename.replace('.zip', '')
+    
+    # Pegar DATA-ATUALIZACAO do root também
+    data_atualizacao = root_attrib.get('DATA-ATUALIZACAO')
+    
+    data = {
+        "numero_identificador": numero_id,
+        "dados_gerais": {},
+        "formacoes": [],
+        "instituicoes": {},
+        "cursos": {}
+    }
+    
+    if dados_gerais is not None:
+        data["dados_gerais"] = {
+            "nome_completo": dados_gerais.get('NOME-COMPLETO'),
+            "pais_nascimento": dados_gerais.get('PAIS-DE-NASCIMENTO'),
+            "uf_nascimento": dados_gerais.get('UF-NASCIMENTO'),
+            "cidade_nascimento": dados_gerais.get('CIDADE-NASCIMENTO')
+        }
+    
+    # Adicionar data de atualização do root
+    if data_atualizacao:
+        data["dados_gerais"]["data_atualizacao"] = data_atualizacao
+    
+    codigos_instituicao = set()
+    codigos_curso = set()
+    for formacao_data in formacoes:
+        if formacao_data["codigo_instituicao"]:
+            codigos_instituicao.add(formacao_data["codigo_instituicao"])
+        if formacao_data["codigo_curso"]:
+            codigos_curso.add(formacao_data["codigo_curso"])
+        data["formacoes"].append(formacao_data)
+    
+    for inst in instituicoes:
+        codigo = inst.get('CODIGO-INSTITUICAO')
+        if codigo in codigos_instituicao:
+            data["instituicoes"][codigo] = {
+                "sigla_instituicao": inst.get('SIGLA-INSTITUICAO'),
+                "sigla_uf": inst.get('SIGLA-UF-INSTITUICAO'),
+                "nome_pais": inst.get('NOME-PAIS-INSTITUICAO')
+            }
+    
+    for curso in cursos:
+        codigo = curso.get('CODIGO-CURSO')
+        if codigo in codigos_curso:
+            data["cursos"][codigo] = {
+                "nome_grande_area": curso.get('NOME-GRANDE-AREA-DO-CONHECIMENTO'),
+                "nome_area": curso.get('NOME-DA-AREA-DO-CONHECIMENTO')
+            }
+    
+    return data
+
+
+class CurriculoExtractor:
+    """Extrai os campos usados de um currículo em uma única passada pelo XML
+    
+    Usa os eventos do XMLPullParser: os atributos necessários são copiados no
+    evento 'start' e cada elemento é descartado no 'end', então seções que não
+    usamos (produção bibliográfica, orientações...) não ficam em memória.
+    O resultado é idêntico ao das buscas './/' sobre a árvore completa.
+    """
+    
+    def __init__(self):
+        self.parser = ET.XMLPullParser(events=('start', 'end'))
+        self.stack = []
+        self.root_attrib = None
+        self.dados_gerais = None
+        self.formacoes = {tipo: [] for tipo in FORMACAO_TIPOS}
+        self.instituicoes = []
+        self.cursos = []
+        # Formações abertas: [elemento, dados, elemento AREAS-DO-CONHECIMENTO]
+        self.open_formacoes = []
+    
+    def feed(self, data):
+        self.parser.feed(data)
+        self._handle_events()
+    
+    def close(self):
+        self.parser.close()
+        self._handle_events()
+    
+    def _handle_events(self):
+        stack = self.stack
+        open_formacoes = self.open_formacoes
+        for event, elem in self.parser.read_events():
+            if event == 'start':
+                # Só tags de interesse (ou o conteúdo de uma formação) passam por _start
+                if elem.tag in EXTRACTED_TAGS or open_formacoes or not stack:
+                    self._start(elem)
+                stack.append(elem)
+            else:
+                stack.pop()
+                if open_formacoes and open_formacoes[-1][0] is elem:
+                    open_formacoes.pop()
+                # Descartar o elemento já lido
+                if stack:
+                    stack[-1].remove(elem)
+    
+    def _start(self, elem):
+        stack = self.stack
+        tag = elem.tag
+        
+        if not stack:
+            self.root_attrib = dict(elem.attrib)
+            return
+        
+        parent = stack[-1].tag
+        
+        # DADOS GERAIS (primeira ocorrência)
+        if tag == 'DADOS-GERAIS':
+            if self.dados_gerais is None:
+                self.dados_gerais = dict(elem.attrib)
+        
+        # FORMAÇÕES (Mestrado, Doutorado)
+        elif tag in self.formacoes and parent == 'FORMACAO-ACADEMICA-TITULACAO' and len(stack) > 1:
+            formacao_data = _formacao_data(tag, elem.attrib)
+            self.formacoes[tag].append(formacao_data)
+            self.open_formacoes.append([elem, formacao_data, None])
+        
+        # INFORMAÇÕES ADICIONAIS - INSTITUIÇÕES E CURSOS
+        elif (tag == 'INFORMACAO-ADICIONAL-INSTITUICAO' and parent == 'INFORMACOES-ADICIONAIS-INSTITUICOES'
+              and len(stack) > 2 and stack[-2].tag == 'DADOS-COMPLEMENTARES'):
+            self.instituicoes.append(dict(elem.attrib))
+        elif (tag == 'INFORMACAO-ADICIONAL-CURSO' and parent == 'INFORMACOES-ADICIONAIS-CURSOS'
+              and len(stack) > 2 and stack[-2].tag == 'DADOS-COMPLEMENTARES'):
+            self.cursos.append(dict(elem.attrib))
+        
+        if not self.open_formacoes:
+            return
+        
+        # AREAS-DO-CONHECIMENTO: só o primeiro bloco dentro de cada formação
+        if tag == 'AREAS-DO-CONHECIMENTO':
+            for formacao in self.open_formacoes:
+                if formacao[2] is None:
+                    formacao[2] = elem
+        # Pode ter AREA-DO-CONHECIMENTO-1, AREA-DO-CONHECIMENTO-2, etc
+        elif 'AREA-DO-CONHECIMENTO' in tag:
+            for formacao in self.open_formacoes:
+                if formacao[2] is stack[-1]:
+                    formacao[1]["areas_conhecimento"].append(_area_conhecimento(elem.attrib))
+    
+    def result(self, filename=None):
+        """Monta o dicionário do currículo no mesmo formato gravado no JSONL"""
+        if self.root_attrib is None:
+            raise ValueError("XML sem elemento raiz")
+        formacoes = [f for tipo in FORMACAO_TIPOS for f in self.formacoes[tipo]]
+        return build_curriculo(self.root_attrib, self.dados_gerais, formacoes,
+                               self.instituicoes, self.cursos, filename)
+
+
+if lxml_etree is not None:
+    # XPath compilados uma vez por processo (os mesmos caminhos das buscas do ElementTree)
+    XPATH_DADOS_GERAIS = lxml_etree.XPath('.//DADOS-GERAIS')
+    XPATH_FORMACOES = {
+        tipo: lxml_etree.XPath(f'.//FORMACAO-ACADEMICA-TITULACAO/{tipo}') for tipo in FORMACAO_TIPOS
+    }
+    XPATH_AREAS = lxml_etree.XPath(
+        "(.//AREAS-DO-CONHECIMENTO)[1]/*[contains(name(), 'AREA-DO-CONHECIMENTO')]"
+    )
+    XPATH_INSTITUICOES = lxml_etree.XPath(
+        './/DADOS-COMPLEMENTARES/INFORMACOES-ADICIONAIS-INSTITUICOES/INFORMACAO-ADICIONAL-INSTITUICAO'
+    )
+    XPATH_CURSOS = lxml_etree.XPath(
+        './/DADOS-COMPLEMENTARES/INFORMACOES-ADICIONAIS-CURSOS/INFORMACAO-ADICIONAL-CURSO'
+    )
+
+
+class LxmlExtractor:
+    """Backend lxml: monta a árvore com o parser do libxml2 e extrai os campos com XPath
+    
+    Mesma interface (feed/close/result) e mesmo resultado do CurriculoExtractor.
+    A árvore inteira fica em memória até o fim do currículo (inclusive no modo
+    stream_xml), então o pico de memória cresce com o tamanho do XML; por isso o
+    backend só é usado quando pedido.
+    """
+    
+    def __init__(self):
+        self.parser = lxml_etree.XMLParser(huge_tree=True, remove_comments=True, remove_pis=True)
+        self.root = None
+    
+    def feed(self, data):
+        self.parser.feed(data)
+    
+    def close(self):
+        self.root = self.parser.close()
+    
+    def result(self, filename=None):
+        """Monta o dicionário do currículo no mesmo formato gravado no JSONL"""
+        if self.root is None:
+            raise ValueError("XML sem elemento raiz")
+        root = self.root
+        
+        dados_gerais = XPATH_DADOS_GERAIS(root)
+        formacoes = []
+        for tipo in FORMACAO_TIPOS:
+            for elem in XPATH_FORMACOES[tipo](root):
+                formacao_data = _formacao_data(tipo, elem.attrib)
+                formacao_data["areas_conhecimento"] = [
+                    _area_conhecimento(area.attrib) for area in XPATH_AREAS(elem)
+                ]
+                formacoes.append(formacao_data)
+        
+        return build_curriculo(root.attrib, dados_gerais[0].attrib if dados_gerais else None, formacoes,
+                               [inst.attrib for inst in XPATH_INSTITUICOES(root)],
+                               [curso.attrib for curso in XPATH_CURSOS(root)], filename)
+
+
+def resolve_parser_backend(parser_backend):
+    """Valida o backend pedido e resolve 'auto' para 'lxml' se instalado, senão 'etree'"""
+    if parser_backend not in PARSER_BACKENDS:
+        raise ValueError(f"parser_backend deve ser um de {PARSER_BACKENDS}")
+    if parser_backend == 'auto':
+        return 'lxml' if lxml_etree is not None else 'etree'
+    if parser_backend == 'lxml' and lxml_etree is None:
+        raise ValueError("parser_backend='lxml' requer o pacote lxml instalado")
+    return parser_backend
+
+
+# Colunas de curriculos_data (uma linha por formação), todas texto como no XML
+FLAT_COLUMNS = [
+    "numero_identificador", "nome_completo", "pais_nascimento", "uf_nascimento",
+    "cidade_nascimento", "data_atualizacao", "tipo_formacao", "codigo_instituicao",
+    "codigo_curso", "codigo_area_curso", "status_curso", "ano_inicio", "ano_conclusao",
+    "flag_bolsa", "sigla_instituicao", "uf_instituicao", "pais_instituicao",
+    "curso_grande_area", "curso_area", "grande_area_formacao", "area_formacao"
+]
+FLAT_SCHEMA = pa.schema([(col, pa.string()) for col in FLAT_COLUMNS])
+
+
+def flatten_curriculo(data):
+    """Achata um currículo em registros, uma linha por formação (formato de curriculos_data)"""
+    records = []
+    
+    # Dados base
+    base = {
+        "numero_identificador": data["numero_identificador"],
+        "nome_completo": data["dados_gerais"].get("nome_completo"),
+        "pais_nascimento": data["dados_gerais"].get("pais_nascimento"),
+        "uf_nascimento": data["dados_gerais"].get("uf_nascimento"),
+        "cidade_nascimento": data["dados_gerais"].get("cidade_nascimento"),
+        "data_atualizacao": data["dados_gerais"].get("data_atualizacao")
+    }
+    
+    # Uma linha por formação
+    for formacao in data["formacoes"]:
+        record = base.copy()
+        
+        # Dados da formação
+        record["tipo_formacao"] = formacao.get("tipo")
+        record["codigo_instituicao"] = formacao.get("codigo_instituicao")
+        record["codigo_curso"] = formacao.get("codigo_curso")
+        record["codigo_area_curso"] = formacao.get("codigo_area_curso")
+        record["status_curso"] = formacao.get("status")
+        record["ano_inicio"] = formacao.get("ano_inicio")
+        record["ano_conclusao"] = formacao.get("ano_conclusao")
+        record["flag_bolsa"] = formacao.get("flag_bolsa")
+        
+        # Adicionar info de instituição
+        codigo_inst = formacao.get("codigo_instituicao")
+        if codigo_inst and codigo_inst in data["instituicoes"]:
+            record["sigla_instituicao"] = data["instituicoes"][codigo_inst].get("sigla_instituicao")
+            record["uf_instituicao"] = data["instituicoes"][codigo_inst].get("sigla_uf")
+            record["pais_instituicao"] = data["instituicoes"][codigo_inst].get("nome_pais")
+        else:
+            record["sigla_instituicao"] = None
+            record["uf_instituicao"] = None
+            record["pais_instituicao"] = None
+        
+        # Adicionar info de curso
+        codigo_curso = formacao.get("codigo_curso")
+        if codigo_curso and codigo_curso in data["cursos"]:
+            record["curso_grande_area"] = data["cursos"][codigo_curso].get("nome_grande_area")
+            record["curso_area"] = data["cursos"][codigo_curso].get("nome_area")
+        else:
+            record["curso_grande_area"] = None
+            record["curso_area"] = None
+        
+        # Áreas do conhecimento da formação (separadas e únicas)
+        areas_conhecimento = formacao.get("areas_conhecimento", [])
+        if areas_conhecimento:
+            # Extrair grandes áreas únicas
+            grandes_areas = list(set([
+                area.get('nome_grande_area', '') 
+                for area in areas_conhecimento 
+                if area.get('nome_grande_area')
+            ]))
+            
+            # Extrair áreas únicas
+            areas = list(set([
+                area.get('nome_area', '') 
+                for area in areas_conhecimento 
+                if area.get('nome_area')
+            ]))
+            
+            record["grande_area_formacao"] = "; ".join(sorted(grandes_areas)) if grandes_areas else None
+            record["area_formacao"] = "; ".join(sorted(areas)) if areas else None
+        else:
+            record["grande_area_formacao"] = None
+            record["area_formacao"] = None
+        
+        records.append(record)
+    
+    return records
+
+
+class JsonlWriter:
+    """Escrita bufferizada de um arquivo JSONL (uma linha por currículo)
+    
+    As linhas são acumuladas em memória e gravadas em lotes de batch_size;
+    sync() grava o que falta, faz fsync e retorna o offset do fim do arquivo.
+    """
+    
+    def __init__(self, path, batch_size=100, metrics=None):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+        self.buffer = []
+        self.file = open(self.path, 'ab')
+    
+    def write(self, data):
+        with self.metrics.stage('serialize'):
+            self.buffer.append(json.dumps(data, ensure_ascii=False) + '\n')
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        with self.metrics.stage('write'):
+            if self.buffer:
+                self.file.write(''.join(self.buffer).encode('utf-8'))
+                self.buffer.clear()
+            self.file.flush()
+    
+    def sync(self):
+        self.flush()
+        with self.metrics.stage('write'):
+            os.fsync(self.file.fileno())
+        return self.file.tell()
+    
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+class ParquetSink:
+    """Grava os registros achatados direto em um arquivo Parquet, sem passar pelo JSONL
+    
+    Os registros são acumulados até row_group_size linhas e então escritos como
+    um row group, então a memória fica limitada ao tamanho do row group. O arquivo
+    é escrito em .tmp e só aparece com o nome final em close().
+    """
+    
+    def __init__(self, path, row_group_size=50_000, metrics=None):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.row_group_size = row_group_size
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+        self.records = []
+        self.writer = pq.ParquetWriter(self.tmp_path, FLAT_SCHEMA)
+    
+    def write(self, data):
+        with self.metrics.stage('serialize'):
+            self.records.extend(flatten_curriculo(data))
+        if len(self.records) >= self.row_group_size:
+            self.flush()
+    
+    def flush(self):
+        if self.records:
+            with self.metrics.stage('serialize'):
+                table = pa.Table.from_pylist(self.records, schema=FLAT_SCHEMA)
+            with self.metrics.stage('write'):
+                self.writer.write_table(table, row_group_size=self.row_group_size)
+            self.records = []
+    
+    def close(self):
+        self.flush()
+        with self.metrics.stage('write'):
+            self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
 
 class LattesProcessor:
-    def __init__(self, base_path, output_dir="output"):
+    def __init__(self, base_path, output_dir="output", shard=None, output_format="jsonl",
+                 stream_xml=False, metrics_interval=30.0, prefetch=0, prefetch_depth=64,
+                 parser_backend="etree"):
+        """
+        Args:
+            base_path: Pasta com as subpastas 00 a 99 de ZIPs
+            output_dir: Pasta de saída
+            shard: Pasta atribuída a este processo no modo paralelo (uso interno)
+            output_format: "jsonl" grava curriculos_data.jsonl (convertido depois por
+                           convert_to_dataframe); "parquet" grava direto os registros
+                           achatados em curriculos_data_parquet/part-XX.parquet, um por pasta
+            stream_xml: Se True, o XML é descomprimido do ZIP em blocos direto para o
+                        parser, sem nunca ter o conteúdo inteiro em memória
+            metrics_interval: Intervalo em segundos entre as exportações das métricas
+                              por etapa (metrics.jsonl e metrics.prom na pasta de saída)
+            prefetch: Número de threads que leem os ZIPs do disco à frente do parser
+                      (0 = sem leitura antecipada). Útil em HD e disco de rede
+            prefetch_depth: Máximo de ZIPs lidos à frente; quando a fila enche, as
+                            leituras esperam o parser consumir
+            parser_backend: "etree" (padrão: ElementTree em uma passada, descartando cada
+                            elemento lido, com memória limitada), "lxml" (XPath
+                            pré-compilados, mais rápido, mas mantém a árvore inteira
+                            de cada currículo em memória) ou "auto", que usa lxml
+                            quando está instalado
+        """
+        if output_format not in ("jsonl", "parquet"):
+            raise ValueError("output_format deve ser 'jsonl' ou 'parquet'")
+        
         self.base_path = Path(base_path)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.output_format = output_format
+        self.stream_xml = stream_xml
+        self.prefetch = prefetch
+        self.prefetch_depth = prefetch_depth
+        self.parser_backend = resolve_parser_backend(parser_backend)
+        self.extractor_class = LxmlExtractor if self.parser_backend == 'lxml' else CurriculoExtractor
+        
+        # Opções repassadas aos processos do modo paralelo
+        self.options = {"output_format": output_format, "stream_xml": stream_xml,
+                        "prefetch": prefetch, "prefetch_depth": prefetch_depth,
+                        "parser_backend": self.parser_backend}
         
         # Arquivos de checkpoint e log
         self.checkpoint_file = self.output_dir / "checkpoint.json"
         self.progress_file = self.output_dir / "progress.json"
         self.error_log = self.output_dir / "errors.log"
         self.data_file = self.output_dir / "curriculos_data.jsonl"
+        self.parquet_dir = self.output_dir / "curriculos_data_parquet"
+        
+        # Modo incremental: índice dos ZIPs já vistos e deltas gerados
+        self.manifest_file = self.output_dir / "manifest.sqlite"
+        self.delta_dir = self.output_dir / "deltas"
+        if output_format == "parquet":
+            self.parquet_dir.mkdir(exist_ok=True)
+        
+        # Modo paralelo: cada pasta tem seu próprio shard JSONL e checkpoint
+        self.shard_dir = self.output_dir / "shards"
+        if shard is not None:
+            self.shard_dir.mkdir(exist_ok=True)
+            self.checkpoint_file = self.shard_dir / f"checkpoint_{shard:02d}.json"
+            self.data_file = self.shard_dir / f"curriculos_data_{shard:02d}.jsonl"
         
         # Carregar checkpoint se existir
         self.checkpoint = self.load_checkpoint()
         
+        # Contadores da execução atual
+        self.processed_count = self.checkpoint["processed_count"]
+        self.error_count = 0
+        self.start_time = time.time()
+        
+        # Tempo por etapa; os workers do modo paralelo não exportam, só devolvem o snapshot
+        self.metrics = PipelineMetrics(self.output_dir if shard is None else None, metrics_interval)
+        self.total_folders = 100
+        self.folder_sizes = []
+        
+        # Writer do JSONL, aberto na primeira pasta processada
+        self.writer = None
+        
     def load_checkpoint(self):
         """Carrega o último checkpoint para retomar processamento"""
         if self.checkpoint_file.exists():
@@ -30,349 +552,759 @@ class LattesProcessor:
         return {"last_folder": -1, "last_file": "", "processed_count": 0}
     
     def save_checkpoint(self, folder, file, count):
-        """Salva checkpoint atual"""
+        """Salva checkpoint atual
+        
+        Antes do checkpoint o JSONL é sincronizado em disco, e o offset gravado
+        (data_offset) marca exatamente as linhas cobertas por ele. O arquivo é
+        substituído atomicamente para nunca ficar pela metade.
+        """
         checkpoint = {
             "last_folder": folder,
             "last_file": file,
             "processed_count": count,
             "timestamp": datetime.now().isoformat()
         }
-        with open(self.checkpoint_file, 'w') as f:
+        if self.writer is not None:
+            checkpoint["data_offset"] = self.writer.sync()
+        elif "data_offset" in self.checkpoint:
+            # Modo paralelo: o JSONL principal não recebe dados, o offset continua valendo
+            checkpoint["data_offset"] = self.checkpoint["data_offset"]
+        tmp_file = self.checkpoint_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
             json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.checkpoint_file)
+    
+    def _data_size(self):
+        return self.data_file.stat().st_size if self.data_file.exists() else 0
+    
+    def open_writer(self):
+        """Abre o JSONL para escrita, descartando o que foi gravado depois do último checkpoint
+        
+        Linhas além de data_offset vieram de uma execução interrompida e serão
+        geradas de novo a partir de last_file, então o arquivo é truncado.
+        """
+        if self.writer is not None:
+            return self.writer
+        
+        self.truncate_to_checkpoint()
+        self.writer = JsonlWriter(self.data_file, metrics=self.metrics)
+        return self.writer
+    
+    def truncate_to_checkpoint(self):
+        """Descarta do JSONL as linhas gravadas depois de data_offset"""
+        data_offset = self.checkpoint.get("data_offset")
+        if data_offset is not None and self._data_size() > data_offset:
+            print(f"Descartando {self._data_size() - data_offset:,} bytes gravados após o último checkpoint")
+            os.truncate(self.data_file, data_offset)
+    
+    def close_writer(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
     
     def log_error(self, error_msg):
         """Registra erros em arquivo de log"""
         with open(self.error_log, 'a', encoding='utf-8') as f:
             f.write(f"[{datetime.now().isoformat()}] {error_msg}\n")
     
-    def extract_xml_from_zip(self, zip_path):
-        """Extrai XML de um arquivo ZIP"""
+    def extract_xml_from_zip(self, zip_path, raw=None):
+        """Extrai XML de um arquivo ZIP
+        
+        Args:
+            zip_path: Caminho do ZIP
+            raw: Bytes do ZIP já lidos do disco (se None, o arquivo é aberto)
+        """
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            with self.metrics.stage('zip_open'):
+                zip_ref = zipfile.ZipFile(io.BytesIO(raw) if raw is not None else zip_path, 'r')
+            with zip_ref:
                 xml_files = [f for f in zip_ref.namelist() if f.endswith('.xml')]
                 if xml_files:
-                    return zip_ref.read(xml_files[0])
+                    with self.metrics.stage('decompress'):
+                        return zip_ref.read(xml_files[0])
         except Exception as e:
             self.log_error(f"Erro ao extrair {zip_path}: {str(e)}")
         return None
     
+    def extract_xml_stream(self, zip_path, raw=None):
+        """Parseia o XML direto do ZIP, descomprimindo em blocos (modo stream_xml)
+        
+        Args:
+            zip_path: Caminho do ZIP
+            raw: Bytes do ZIP já lidos do disco (se None, o arquivo é aberto)
+        """
+        try:
+            with self.metrics.stage('zip_open'):
+                zip_ref = zipfile.ZipFile(io.BytesIO(raw) if raw is not None else zip_path, 'r')
+            with zip_ref:
+                xml_files = [f for f in zip_ref.namelist() if f.endswith('.xml')]
+                if xml_files:
+                    with zip_ref.open(xml_files[0]) as xml_file:
+                        return self.parse_curriculo(xml_file, Path(zip_path).name)
+        except Exception as e:
+            self.log_error(f"Erro ao extrair {zip_path}: {str(e)}")
+        return None
+    
+    def read_curriculo(self, zip_path, raw=None):
+        """Extrai e parseia o currículo de um ZIP; retorna None em caso de erro"""
+        if self.stream_xml:
+            return self.extract_xml_stream(zip_path, raw)
+        
+        # Extrair XML
+        xml_content = self.extract_xml_from_zip(zip_path, raw)
+        if xml_content is None:
+            return None
+        
+        # Parsear currículo (passando o nome do arquivo)
+        return self.parse_curriculo(xml_content, Path(zip_path).name)
+    
     def parse_curriculo(self, xml_content, filename=None):
         """Extrai informações de um currículo XML
         
+        O XML é lido em blocos pelo extrator do backend escolhido (CurriculoExtractor
+        ou LxmlExtractor).
+        
         Args:
-            xml_content: Conteúdo XML do currículo
+            xml_content: Conteúdo XML do currículo (bytes ou str) ou arquivo binário aberto
             filename: Nome do arquivo (usado se NUMERO-IDENTIFICADOR não existir)
         """
+        em_memoria = isinstance(xml_content, (bytes, bytearray, str))
+        if not em_memoria and not hasattr(xml_content, 'read'):
+            # Fora do try: um tipo errado é erro de uso, não um currículo ilegível
+            raise TypeError(f"xml_content deve ser bytes, str ou arquivo aberto, não {type(xml_content).__name__}")
         try:
-            root = ET.fromstring(xml_content)
-            
-            # Pegar NUMERO-IDENTIFICADOR do root ou do nome do arquivo
-            numero_id = root.get('NUMERO-IDENTIFICADOR')
-            if not numero_id and filename:
-                # Remove extensão .zip do filename
-                numero_id = filename.replace('.zip', '')
-            
-            # Pegar DATA-ATUALIZACAO do root também
-            data_atualizacao = root.get('DATA-ATUALIZACAO')
-            
-            data = {
-                "numero_identificador": numero_id,
-                "dados_gerais": {},
-                "formacoes": [],
-                "instituicoes": {},
-                "cursos": {}
-            }
-            
-            # DADOS GERAIS
-            dados_gerais = root.find('.//DADOS-GERAIS')
-            if dados_gerais is not None:
-                data["dados_gerais"] = {
-                    "nome_completo": dados_gerais.get('NOME-COMPLETO'),
-                    "pais_nascimento": dados_gerais.get('PAIS-DE-NASCIMENTO'),
-                    "uf_nascimento": dados_gerais.get('UF-NASCIMENTO'),
-                    "cidade_nascimento": dados_gerais.get('CIDADE-NASCIMENTO')
-                }
-            
-            # Adicionar data de atualização do root
-            if data_atualizacao:
-                data["dados_gerais"]["data_atualizacao"] = data_atualizacao
-            
-            # FORMAÇÕES (Mestrado, Doutorado)
-            formacao_paths = [
-                './/FORMACAO-ACADEMICA-TITULACAO/MESTRADO',
-                './/FORMACAO-ACADEMICA-TITULACAO/MESTRADO-PROFISSIONALIZANTE',
-                './/FORMACAO-ACADEMICA-TITULACAO/DOUTORADO'
-            ]
-            
-            codigos_instituicao = set()
-            codigos_curso = set()
-            
-            for path in formacao_paths:
-                for formacao in root.findall(path):
-                    tipo = path.split('/')[-1]
-                    
-                    formacao_data = {
-                        "tipo": tipo,
-                        "codigo_instituicao": formacao.get('CODIGO-INSTITUICAO'),
-                        "codigo_curso": formacao.get('CODIGO-CURSO'),
-                        "codigo_area_curso": formacao.get('CODIGO-AREA-CURSO'),
-                        "status": formacao.get('STATUS-DO-CURSO'),
-                        "ano_inicio": formacao.get('ANO-DE-INICIO'),
-                        "ano_conclusao": formacao.get('ANO-DE-CONCLUSAO'),
-                        "flag_bolsa": formacao.get('FLAG-BOLSA'),
-                        "areas_conhecimento": []
-                    }
-                    
-                    # Adicionar códigos aos sets para buscar depois
-                    if formacao_data["codigo_instituicao"]:
-                        codigos_instituicao.add(formacao_data["codigo_instituicao"])
-                    if formacao_data["codigo_curso"]:
-                        codigos_curso.add(formacao_data["codigo_curso"])
-                    
-                    # AREAS-DO-CONHECIMENTO dentro da formação
-                    # Pode ter AREA-DO-CONHECIMENTO-1, AREA-DO-CONHECIMENTO-2, etc
-                    areas_conhecimento = formacao.find('.//AREAS-DO-CONHECIMENTO')
-                    if areas_conhecimento is not None:
-                        # Buscar todas as áreas (AREA-DO-CONHECIMENTO, AREA-DO-CONHECIMENTO-1, etc)
-                        for child in areas_conhecimento:
-                            if 'AREA-DO-CONHECIMENTO' in child.tag:
-                                formacao_data["areas_conhecimento"].append({
-                                    "nome_grande_area": child.get('NOME-GRANDE-AREA-DO-CONHECIMENTO'),
-                                    "nome_area": child.get('NOME-DA-AREA-DO-CONHECIMENTO')
-                                })
-                    
-                    data["formacoes"].append(formacao_data)
-            
-            # INFORMAÇÕES ADICIONAIS - INSTITUIÇÕES
-            for inst in root.findall('.//DADOS-COMPLEMENTARES/INFORMACOES-ADICIONAIS-INSTITUICOES/INFORMACAO-ADICIONAL-INSTITUICAO'):
-                codigo = inst.get('CODIGO-INSTITUICAO')
-                if codigo in codigos_instituicao:
-                    data["instituicoes"][codigo] = {
-                        "sigla_instituicao": inst.get('SIGLA-INSTITUICAO'),
-                        "sigla_uf": inst.get('SIGLA-UF-INSTITUICAO'),
-                        "nome_pais": inst.get('NOME-PAIS-INSTITUICAO')
-                    }
-            
-            # INFORMAÇÕES ADICIONAIS - CURSOS
-            for curso in root.findall('.//DADOS-COMPLEMENTARES/INFORMACOES-ADICIONAIS-CURSOS/INFORMACAO-ADICIONAL-CURSO'):
-                codigo = curso.get('CODIGO-CURSO')
-                if codigo in codigos_curso:
-                    data["cursos"][codigo] = {
-                        "nome_grande_area": curso.get('NOME-GRANDE-AREA-DO-CONHECIMENTO'),
-                        "nome_area": curso.get('NOME-DA-AREA-DO-CONHECIMENTO')
-                    }
-            
-            return data
+            extractor = self.extractor_class()
+            if em_memoria:
+                with self.metrics.stage('xml_parse'):
+                    for start in range(0, len(xml_content), XML_CHUNK_SIZE):
+                        extractor.feed(xml_content[start:start + XML_CHUNK_SIZE])
+            else:
+                # No modo stream a descompressão acontece a cada read()
+                while True:
+                    with self.metrics.stage('decompress'):
+                        chunk = xml_content.read(XML_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    with self.metrics.stage('xml_parse'):
+                        extractor.feed(chunk)
+            with self.metrics.stage('xml_parse'):
+                extractor.close()
+            with self.metrics.stage('dict_build'):
+                return extractor.result(filename)
             
         except Exception as e:
             self.log_error(f"Erro ao parsear XML: {str(e)}")
             return None
     
-    def process_all(self, max_folders=None):
-        """Processa todos os currículos
+    def process_folder(self, folder_num, verbose=True):
+        """Processa todos os ZIPs de uma pasta, atualizando os contadores da instância
         
         Args:
-            max_folders: Número máximo de pastas a processar (None = todas)
-                        Ex: max_folders=3 processa apenas pastas 00, 01, 02
+            folder_num: Número da pasta (0 a 99)
+            verbose: Se True, imprime o progresso a cada 100 currículos
         """
-        start_time = time.time()
-        processed_count = self.checkpoint["processed_count"]
-        error_count = 0
+        # Pular pastas já processadas
+        if folder_num <= self.checkpoint["last_folder"]:
+            return
         
-        # Define quantas pastas processar
-        total_folders = max_folders if max_folders is not None else 100
+        folder_name = f"{folder_num:02d}"
+        folder_path = self.base_path / folder_name
         
-        print(f"Iniciando processamento...")
-        print(f"Processando {total_folders} pasta(s)")
-        print(f"Retomando do folder {self.checkpoint['last_folder'] + 1}")
+        if not folder_path.exists():
+            print(f"Pasta {folder_name} não encontrada, pulando...")
+            return
         
-        # Processar pastas de 00 a 99 (ou até max_folders)
-        for folder_num in range(total_folders):
-            # Pular pastas já processadas
-            if folder_num <= self.checkpoint["last_folder"]:
-                continue
-                
-            folder_name = f"{folder_num:02d}"
-            folder_path = self.base_path / folder_name
-            
-            if not folder_path.exists():
-                print(f"Pasta {folder_name} não encontrada, pulando...")
-                continue
-            
+        if verbose:
             print(f"\nProcessando pasta {folder_name}...")
-            
-            # Listar todos os arquivos ZIP
-            zip_files = sorted(folder_path.glob("*.zip"))
-            
-            if not zip_files:
-                print(f"Nenhum arquivo ZIP encontrado em {folder_name}")
-                continue
-            
+        
+        # Listar todos os arquivos ZIP
+        zip_files = sorted(folder_path.glob("*.zip"))
+        
+        if not zip_files:
+            print(f"Nenhum arquivo ZIP encontrado em {folder_name}")
+            return
+        
+        if verbose:
             print(f"Encontrados {len(zip_files)} arquivos ZIP")
-            
-            for i, zip_file in enumerate(zip_files):
-                # Pular arquivos já processados na última pasta
-                if folder_num == self.checkpoint["last_folder"] + 1:
-                    if zip_file.name <= self.checkpoint["last_file"]:
-                        continue
+        self.folder_sizes.append(len(zip_files))
+        
+        if self.output_format == "parquet":
+            # Um arquivo por pasta; uma pasta interrompida é refeita do início
+            writer = ParquetSink(self.parquet_dir / f"part-{folder_num:02d}.parquet", metrics=self.metrics)
+        else:
+            writer = self.open_writer()
+        
+        # Pular arquivos já processados na última pasta
+        resume_after = ""
+        if folder_num == self.checkpoint["last_folder"] + 1:
+            resume_after = self.checkpoint["last_file"]
+        pending_files = [zip_file for zip_file in zip_files if zip_file.name > resume_after]
+        skipped = len(zip_files) - len(pending_files)
+        
+        for i, (zip_file, future) in enumerate(self.read_ahead(pending_files), start=skipped):
+            try:
+                self.metrics.counters["files"] += 1
+                raw = None
+                if future is not None:
+                    # Espera pela leitura antecipada (contada como abertura do ZIP)
+                    with self.metrics.stage('zip_open'):
+                        raw = future.result()
+                data = self.read_curriculo(zip_file, raw)
+                if data is None:
+                    self.error_count += 1
+                    self.metrics.counters["errors"] += 1
+                    continue
                 
-                try:
-                    # Extrair XML
-                    xml_content = self.extract_xml_from_zip(zip_file)
-                    if xml_content is None:
-                        error_count += 1
-                        continue
-                    
-                    # Parsear currículo (passando o nome do arquivo)
-                    data = self.parse_curriculo(xml_content, zip_file.name)
-                    if data is None:
-                        error_count += 1
-                        continue
-                    
-                    # Salvar em arquivo JSONL (uma linha por currículo)
-                    with open(self.data_file, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps(data, ensure_ascii=False) + '\n')
-                    
-                    processed_count += 1
-                    
-                    # Atualizar checkpoint a cada 100 currículos
-                    if processed_count % 100 == 0:
-                        self.save_checkpoint(folder_num, zip_file.name, processed_count)
-                        elapsed = time.time() - start_time
-                        rate = processed_count / elapsed
-                        
-                        # Calcular tempo restante baseado nos arquivos desta pasta
-                        files_remaining_in_folder = len(zip_files) - (i + 1)
-                        remaining_seconds = files_remaining_in_folder / rate if rate > 0 else 0
-
-                        # Converter tempo restante em minutos e segundos
-                        mins, secs = divmod(int(remaining_seconds), 60)
+                # Salvar no JSONL (uma linha por currículo) ou no Parquet (uma por formação)
+                writer.write(data)
+                
+                self.processed_count += 1
+                
+                # Atualizar checkpoint a cada 100 currículos
+                if self.processed_count % 100 == 0:
+                    # A pasta atual ainda não terminou: o checkpoint aponta para a
+                    # anterior, e last_file indica até onde esta já foi lida.
+                    # No modo Parquet a pasta só é confirmada quando o arquivo fecha
+                    if self.output_format == "jsonl":
+                        self.save_checkpoint(folder_num - 1, zip_file.name, self.processed_count)
+                    # Tempo restante da execução inteira: o que falta nesta pasta
+                    # mais as pastas seguintes, pela média de arquivos por pasta
+                    files_remaining_in_folder = len(zip_files) - (i + 1)
+                    avg_files_per_folder = sum(self.folder_sizes) / len(self.folder_sizes)
+                    folders_remaining = max(self.total_folders - folder_num - 1, 0)
+                    eta = self.metrics.eta_seconds(
+                        files_remaining_in_folder + folders_remaining * avg_files_per_folder
+                    )
+                    self.metrics.maybe_export()
+                    if verbose:
+                        elapsed = time.time() - self.start_time
+                        rate = self.processed_count / elapsed
                         
-                        print(f"Processados: {processed_count:,} | "
-                              f"Erros: {error_count:,} | "
+                        print(f"Processados: {self.processed_count:,} | "
+                              f"Erros: {self.error_count:,} | "
                               f"Taxa: {rate:.1f}/s | "
                               f"Restam nesta pasta: {files_remaining_in_folder:,} | "
-                              f"Tempo estimado:  {mins} min {secs:02d} s")
-                
-                except Exception as e:
-                    self.log_error(f"Erro ao processar {zip_file}: {str(e)}")
-                    error_count += 1
+                              f"Tempo estimado (total): {format_eta(eta)}")
             
-            # Checkpoint ao final de cada pasta
-            self.save_checkpoint(folder_num, "", processed_count)
+            except Exception as e:
+                self.log_error(f"Erro ao processar {zip_file}: {str(e)}")
+                self.error_count += 1
+                self.metrics.counters["errors"] += 1
+        
+        # Checkpoint ao final de cada pasta
+        if self.output_format == "parquet":
+            writer.close()
+        self.save_checkpoint(folder_num, "", self.processed_count)
+    
+    def read_ahead(self, zip_files):
+        """Itera (zip_file, future) na ordem; future traz os bytes do ZIP (None sem prefetch)"""
+        if self.prefetch <= 0:
+            return ((zip_file, None) for zip_file in zip_files)
+        return prefetch_zips(zip_files, self.prefetch, self.prefetch_depth)
+    
+    def process_all(self, max_folders=None, workers=1, incremental=False):
+        """Processa todos os currículos
+        
+        Args:
+            max_folders: Número máximo de pastas a processar (None = todas)
+                        Ex: max_folders=3 processa apenas pastas 00, 01, 02
+            workers: Número de processos. Com workers > 1 cada pasta é processada
+                     em paralelo e gravada no seu próprio shard (ver shard_dir)
+            incremental: Usa o manifest (manifest.sqlite) para parsear apenas ZIPs
+                         novos ou alterados; o resultado vai para um arquivo de
+                         delta em deltas/, aplicado depois com apply_deltas()
+        """
+        if incremental and workers > 1:
+            raise ValueError("O modo incremental é executado em um único processo (workers=1)")
+        
+        self.start_time = time.time()
+        
+        # Define quantas pastas processar
+        total_folders = max_folders if max_folders is not None else 100
+        self.total_folders = total_folders
+        
+        print(f"Iniciando processamento...")
+        print(f"Backend do parser: {self.parser_backend}")
+        print(f"Processando {total_folders} pasta(s)")
+        
+        if incremental:
+            self.processed_count = 0
+            self._process_incremental(total_folders)
+        elif workers > 1:
+            print(f"Retomando do folder {self.checkpoint['last_folder'] + 1}")
+            self._process_all_parallel(total_folders, workers)
+        else:
+            print(f"Retomando do folder {self.checkpoint['last_folder'] + 1}")
+            self._check_no_pending_shards()
+            # Processar pastas de 00 a 99 (ou até max_folders)
+            try:
+                for folder_num in range(total_folders):
+                    self.process_folder(folder_num)
+            finally:
+                self.close_writer()
         
         # Estatísticas finais
-        total_time = time.time() - start_time
+        total_time = time.time() - self.start_time
         print(f"\n{'='*60}")
         print(f"PROCESSAMENTO CONCLUÍDO!")
-        print(f"Total processado: {processed_count:,}")
-        print(f"Total de erros: {error_count:,}")
+        print(f"Total processado: {self.processed_count:,}")
+        print(f"Total de erros: {self.error_count:,}")
         print(f"Tempo total: {total_time/3600:.2f} horas")
-        print(f"Taxa média: {processed_count/total_time:.1f} currículos/segundo")
+        print(f"Taxa média: {self.processed_count/total_time:.1f} currículos/segundo")
         print(f"{'='*60}")
+        self.metrics.gauges["eta_seconds"] = 0
+        self.metrics.gauges["files_remaining"] = 0
+        self.metrics.print_summary()
+        self.metrics.export()
         
         # Salvar estatísticas
         stats = {
-            "processed_count": processed_count,
-            "error_count": error_count,
+            "processed_count": self.processed_count,
+            "error_count": self.error_count,
             "total_time_hours": total_time/3600,
-            "rate_per_second": processed_count/total_time,
+            "rate_per_second": self.processed_count/total_time,
+            "workers": workers,
+            "output_format": self.output_format,
+            "stream_xml": self.stream_xml,
+            "parser_backend": self.parser_backend,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.metrics.snapshot()["stages"],
             "completion_date": datetime.now().isoformat()
         }
+        if workers > 1:
+            stats["shards"] = dict(sorted(self.shard_stats.items()))
+        if incremental:
+            stats["incremental"] = self.incremental_stats
         with open(self.output_dir / "statistics.json", 'w') as f:
             json.dump(stats, f, indent=2)
     
-    def convert_to_dataframe(self):
-        """Converte JSONL para DataFrame para análise"""
+    def _check_no_pending_shards(self):
+        """Impede retomar em um processo uma execução paralela interrompida
+        
+        Pastas depois de last_folder podem já ter shard (concluídas fora de ordem);
+        reprocessá-las no JSONL principal duplicaria os currículos.
+        """
+        if not self.shard_dir.exists():
+            return
+        for checkpoint_file in self.shard_dir.glob("checkpoint_*.json"):
+            folder_num = int(checkpoint_file.stem.split('_')[1])
+            if folder_num > self.checkpoint["last_folder"]:
+                raise ValueError(f"A pasta {folder_num:02d} já tem shard de uma execução paralela "
+                                 f"interrompida; retome com workers > 1")
+    
+    def _seed_partial_shard(self):
+        """Continua no shard a pasta que uma execução em um processo deixou pela metade
+        
+        O JSONL principal é truncado em data_offset (o que o checkpoint cobre, até
+        last_file) e o shard da pasta seguinte começa depois de last_file, então
+        nenhum currículo é gravado duas vezes.
+        """
+        self.truncate_to_checkpoint()
+        last_file = self.checkpoint["last_file"]
+        if not last_file:
+            return
+        folder_num = self.checkpoint["last_folder"] + 1
+        shard_checkpoint = self.shard_dir / f"checkpoint_{folder_num:02d}.json"
+        if shard_checkpoint.exists():
+            return
+        self.shard_dir.mkdir(exist_ok=True)
+        with open(shard_checkpoint, 'w') as f:
+            json.dump({"last_folder": folder_num - 1, "last_file": last_file, "processed_count": 0}, f)
+        print(f"Pasta {folder_num:02d} continua no shard a partir de {last_file}")
+    
+    def _process_all_parallel(self, total_folders, workers):
+        """Distribui as pastas entre processos; cada pasta vira um shard JSONL com checkpoint próprio
+        
+        O checkpoint principal avança até a última pasta concluída sem lacunas antes
+        dela; processed_count nele continua contando só o JSONL principal.
+        """
+        self._seed_partial_shard()
+        pending = [n for n in range(total_folders) if n > self.checkpoint["last_folder"]]
+        print(f"Modo paralelo: {len(pending)} pasta(s) em {workers} processos")
+        
+        # Shards de execuções anteriores (pastas concluídas ou interrompidas)
+        for checkpoint_file in self.shard_dir.glob("checkpoint_*.json"):
+            with open(checkpoint_file, 'r') as f:
+                self.processed_count += json.load(f)["processed_count"]
+        processed_before = self.processed_count
+        self.shard_stats = {}
+        finished = set()
+        last_folder = self.checkpoint["last_folder"]
         
-        # Verificar se o arquivo existe
-        if not self.data_file.exists():
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_process_folder_shard, str(self.base_path), str(self.output_dir), n,
+                                self.options): n
+                for n in pending
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                folder_num = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.log_error(f"Erro no worker da pasta {folder_num:02d}: {str(e)}")
+                    self.error_count += 1
+                    continue
+                
+                finished.add(folder_num)
+                if last_folder + 1 in finished:
+                    while last_folder + 1 in finished:
+                        last_folder += 1
+                    self.save_checkpoint(last_folder, "", self.checkpoint["processed_count"])
+                
+                worker_metrics = result.pop("metrics")
+                self.metrics.merge(worker_metrics)
+                self.folder_sizes.append(worker_metrics["counters"]["files"])
+                self.shard_stats[f"{folder_num:02d}"] = result
+                self.processed_count += result["new_count"]
+                self.error_count += result["error_count"]
+                
+                # Pastas restantes estimadas pela média de arquivos das já concluídas
+                avg_files_per_folder = sum(self.folder_sizes) / len(self.folder_sizes)
+                eta = self.metrics.eta_seconds((len(pending) - done) * avg_files_per_folder)
+                self.metrics.maybe_export()
+                
+                elapsed = time.time() - self.start_time
+                rate = (self.processed_count - processed_before) / elapsed
+                print(f"Pasta {folder_num:02d} concluída ({result['new_count']:,} novos) | "
+                      f"Processados: {self.processed_count:,} | "
+                      f"Erros: {self.error_count:,} | "
+                      f"Taxa agregada: {rate:.1f}/s | "
+                      f"Pastas restantes: {len(pending) - done} | "
+                      f"Tempo estimado (total): {format_eta(eta)}")
+    
+    def _process_incremental(self, total_folders):
+        """Percorre as pastas comparando cada ZIP com o manifest e grava só as mudanças
+        
+        O delta (deltas/delta_<execução>.jsonl) tem uma linha por currículo novo ou
+        alterado, no mesmo formato do JSONL, e uma linha
+        {"numero_identificador": ..., "removido": true} por currículo removido.
+        O manifest só é confirmado depois que o delta foi sincronizado em disco; se
+        a execução for interrompida, os ZIPs não confirmados são refeitos na próxima.
+        Um ZIP conhecido que mudou e não pôde ser lido conta como erro: a versão
+        anterior continua valendo e ele é tentado de novo na próxima execução.
+        """
+        # Microssegundos e pid: duas execuções seguidas (ou simultâneas) nunca
+        # compartilham o run_id, e a ordem dos nomes dos deltas segue a cronológica
+        run_id = f"{datetime.now():%Y%m%d%H%M%S%f}_{os.getpid()}"
+        self.delta_dir.mkdir(exist_ok=True)
+        delta_file = self.delta_dir / f"delta_{run_id}.jsonl"
+        
+        manifest = ManifestIndex(self.manifest_file)
+        writer = JsonlWriter(delta_file, metrics=self.metrics)
+        counts = {"novos": 0, "alterados": 0, "inalterados": 0, "removidos": 0, "erros": 0}
+        visited_folders = []
+        
+        try:
+            for folder_num in range(total_folders):
+                folder_name = f"{folder_num:02d}"
+                folder_path = self.base_path / folder_name
+                if not folder_path.exists():
+                    print(f"Pasta {folder_name} não encontrada, pulando...")
+                    continue
+                
+                print(f"\nVerificando pasta {folder_name}...")
+                visited_folders.append(folder_name)
+                
+                for zip_file in sorted(folder_path.glob("*.zip")):
+                    rel_path = f"{folder_name}/{zip_file.name}"
+                    known = False
+                    try:
+                        entry = manifest.get(rel_path)
+                        known = entry is not None and not entry[3]
+                        stat = zip_file.stat()
+                        
+                        # Mesmo tamanho e mtime: nem abre o arquivo
+                        if known and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+                            manifest.touch(rel_path, run_id, stat.st_size, stat.st_mtime)
+                            counts["inalterados"] += 1
+                            continue
+                        
+                        raw = zip_file.read_bytes()
+                        sha1 = hashlib.sha1(raw).hexdigest()
+                        if known and entry[2] == sha1:
+                            manifest.touch(rel_path, run_id, stat.st_size, stat.st_mtime)
+                            counts["inalterados"] += 1
+                            continue
+                        
+                        self.metrics.counters["files"] += 1
+                        data = self.read_curriculo(zip_file, raw)
+                        if data is None:
+                            if known:
+                                manifest.keep(rel_path, run_id)
+                            counts["erros"] += 1
+                            self.error_count += 1
+                            self.metrics.counters["errors"] += 1
+                            continue
+                        
+                        writer.write(data)
+                        manifest.upsert(rel_path, run_id, stat.st_size, stat.st_mtime, sha1,
+                                        data["numero_identificador"],
+                                        data["dados_gerais"].get("data_atualizacao"))
+                        counts["alterados" if known else "novos"] += 1
+                        self.processed_count += 1
+                        
+                        if self.processed_count % 100 == 0:
+                            writer.sync()
+                            manifest.commit()
+                    
+                    except Exception as e:
+                        self.log_error(f"Erro ao processar {zip_file}: {str(e)}")
+                        # O ZIP ainda existe: a versão anterior não vira tombstone
+                        if known:
+                            manifest.keep(rel_path, run_id)
+                        counts["erros"] += 1
+                        self.error_count += 1
+                        self.metrics.counters["errors"] += 1
+                
+                writer.sync()
+                manifest.commit()
+                print(f"Novos: {counts['novos']:,} | Alterados: {counts['alterados']:,} | "
+                      f"Inalterados: {counts['inalterados']:,} | Erros: {self.error_count:,}")
+            
+            # Tombstones: ZIPs das pastas percorridas que não existem mais
+            removed_ids = manifest.mark_removed(run_id, visited_folders)
+            for numero_id in removed_ids:
+                writer.write({"numero_identificador": numero_id, "removido": True})
+            counts["removidos"] = len(removed_ids)
+            writer.sync()
+            manifest.commit()
+        finally:
+            writer.close()
+            manifest.close()
+        
+        print(f"Removidos: {counts['removidos']:,}")
+        print(f"Delta gravado em {delta_file}")
+        self.incremental_stats = {**counts, "delta_file": str(delta_file)}
+    
+    def apply_deltas(self, chunk_size=10_000):
+        """Aplica os deltas pendentes nos dados achatados, sem reparsear nada
+        
+        Para cada delta (em ordem), as linhas dos currículos afetados são removidas
+        dos Parquets atuais em streaming e as versões novas são anexadas. Com
+        output_format="jsonl" o alvo é curriculos_data.parquet; com "parquet", os
+        arquivos de curriculos_data_parquet/ (só os que têm currículos afetados são
+        reescritos) e as versões novas vão para part-delta_<execução>.parquet.
+        Deltas aplicados são movidos para deltas/aplicados.
+        """
+        delta_files = sorted(self.delta_dir.glob("delta_*.jsonl")) if self.delta_dir.exists() else []
+        if not delta_files:
+            print("Nenhum delta pendente.")
+            return
+        
+        applied_dir = self.delta_dir / "aplicados"
+        applied_dir.mkdir(exist_ok=True)
+        for delta_file in delta_files:
+            self._apply_delta(delta_file, chunk_size)
+            os.replace(delta_file, applied_dir / delta_file.name)
+    
+    def _apply_delta(self, delta_file, chunk_size):
+        print(f"Aplicando {delta_file.name}...")
+        
+        # Última linha de cada currículo no delta (a versão que vale)
+        last_line = {}
+        with open(delta_file, 'r', encoding='utf-8') as f:
+            for n, line in enumerate(f):
+                last_line[json.loads(line)["numero_identificador"]] = n
+        affected = pa.array(list(last_line), type=pa.string())
+        
+        kept = 0
+        if self.output_format == "parquet":
+            for part_file in sorted(self.parquet_dir.glob("*.parquet")):
+                ids = pq.read_table(part_file, columns=["numero_identificador"])["numero_identificador"]
+                if not pc.any(pc.is_in(ids, value_set=affected)).as_py():
+                    kept += len(ids)
+                    continue
+                tmp_part = part_file.with_name(part_file.name + '.tmp')
+                with pq.ParquetWriter(tmp_part, FLAT_SCHEMA) as writer:
+                    kept += self._copy_unaffected(part_file, affected, writer, chunk_size)
+                os.replace(tmp_part, part_file)
+            
+            new_part = self.parquet_dir / f"part-{delta_file.stem}.parquet"
+            tmp_part = new_part.with_name(new_part.name + '.tmp')
+            with pq.ParquetWriter(tmp_part, FLAT_SCHEMA) as writer:
+                added = self._write_delta_records(delta_file, last_line, writer, chunk_size)
+            if added:
+                os.replace(tmp_part, new_part)
+            else:
+                tmp_part.unlink()
+        else:
+            output_parquet = self.output_dir / "curriculos_data.parquet"
+            tmp_parquet = output_parquet.with_name(output_parquet.name + '.tmp')
+            with pq.ParquetWriter(tmp_parquet, FLAT_SCHEMA) as writer:
+                if output_parquet.exists():
+                    kept = self._copy_unaffected(output_parquet, affected, writer, chunk_size)
+                added = self._write_delta_records(delta_file, last_line, writer, chunk_size)
+            os.replace(tmp_parquet, output_parquet)
+        
+        print(f"  {kept:,} registros mantidos, {added:,} registros novos ou atualizados")
+    
+    @staticmethod
+    def _copy_unaffected(parquet_file, affected, writer, chunk_size):
+        """Copia as linhas atuais, exceto as dos currículos alterados ou removidos"""
+        kept = 0
+        for batch in pq.ParquetFile(parquet_file).iter_batches(batch_size=chunk_size, columns=FLAT_COLUMNS):
+            table = pa.Table.from_batches([batch]).cast(FLAT_SCHEMA)
+            table = table.filter(pc.invert(pc.is_in(table["numero_identificador"], value_set=affected)))
+            writer.write_table(table)
+            kept += table.num_rows
+        return kept
+    
+    @staticmethod
+    def _write_delta_records(delta_file, last_line, writer, chunk_size):
+        """Grava as versões novas do delta (sem os tombstones), em blocos"""
+        added = 0
+        with open(delta_file, 'r', encoding='utf-8') as f:
+            n = 0
+            for lines in iter(lambda: list(islice(f, chunk_size)), []):
+                records = []
+                for line in lines:
+                    data = json.loads(line)
+                    if last_line[data["numero_identificador"]] == n and not data.get("removido"):
+                        records.extend(flatten_curriculo(data))
+                    n += 1
+                if records:
+                    writer.write_table(pa.Table.from_pylist(records, schema=FLAT_SCHEMA))
+                    added += len(records)
+        return added
+    
+    def data_files(self):
+        """Arquivos JSONL com dados: o principal e depois os shards do modo paralelo
+        
+        Os shards vêm em ordem de pasta, mas o principal pode ter pastas anteriores e
+        posteriores a eles (execuções em um e em vários processos alternadas); cada
+        currículo aparece uma única vez, sem garantia de ordem entre os arquivos.
+        """
+        files = [self.data_file] if self.data_file.exists() else []
+        if self.shard_dir.exists():
+            files.extend(sorted(self.shard_dir.glob("curriculos_data_*.jsonl")))
+        return files
+    
+    def convert_to_dataframe(self, chunk_size=None, write_csv=True):
+        """Converte JSONL para DataFrame para análise
+        
+        Args:
+            chunk_size: Se informado, converte em streaming: lê chunk_size currículos
+                        por vez e grava cada bloco como um row group do Parquet (e,
+                        se pedido, anexa ao CSV). A memória fica limitada ao bloco e
+                        o método retorna None em vez do DataFrame completo
+            write_csv: Se False, grava apenas o Parquet
+        """
+        
+        # Verificar se há dados (arquivo principal ou shards do modo paralelo)
+        data_files = self.data_files()
+        if not data_files:
             print("Nenhum dado foi processado ainda.")
             print("Verifique se o caminho está correto e se existem arquivos ZIP nas pastas.")
             return None
+        
+        if chunk_size is not None:
+            self._convert_chunked(data_files, chunk_size, write_csv)
+            return None
             
         print("Convertendo dados para DataFrame...")
         
         records = []
-        with open(self.data_file, 'r', encoding='utf-8') as f:
+        with fileinput.input(files=data_files, encoding='utf-8') as f:
             for line in f:
                 data = json.loads(line)
                 
-                # Dados base
-                base = {
-                    "numero_identificador": data["numero_identificador"],
-                    "nome_completo": data["dados_gerais"].get("nome_completo"),
-                    "pais_nascimento": data["dados_gerais"].get("pais_nascimento"),
-                    "uf_nascimento": data["dados_gerais"].get("uf_nascimento"),
-                    "cidade_nascimento": data["dados_gerais"].get("cidade_nascimento"),
-                    "data_atualizacao": data["dados_gerais"].get("data_atualizacao")
-                }
-                
-                # Uma linha por formação
-                for formacao in data["formacoes"]:
-                    record = base.copy()
-                    
-                    # Dados da formação
-                    record["tipo_formacao"] = formacao.get("tipo")
-                    record["codigo_instituicao"] = formacao.get("codigo_instituicao")
-                    record["codigo_curso"] = formacao.get("codigo_curso")
-                    record["codigo_area_curso"] = formacao.get("codigo_area_curso")
-                    record["status_curso"] = formacao.get("status")
-                    record["ano_inicio"] = formacao.get("ano_inicio")
-                    record["ano_conclusao"] = formacao.get("ano_conclusao")
-                    record["flag_bolsa"] = formacao.get("flag_bolsa")
-                    
-                    # Adicionar info de instituição
-                    codigo_inst = formacao.get("codigo_instituicao")
-                    if codigo_inst and codigo_inst in data["instituicoes"]:
-                        record["sigla_instituicao"] = data["instituicoes"][codigo_inst].get("sigla_instituicao")
-                        record["uf_instituicao"] = data["instituicoes"][codigo_inst].get("sigla_uf")
-                        record["pais_instituicao"] = data["instituicoes"][codigo_inst].get("nome_pais")
-                    else:
-                        record["sigla_instituicao"] = None
-                        record["uf_instituicao"] = None
-                        record["pais_instituicao"] = None
-                    
-                    # Adicionar info de curso
-                    codigo_curso = formacao.get("codigo_curso")
-                    if codigo_curso and codigo_curso in data["cursos"]:
-                        record["curso_grande_area"] = data["cursos"][codigo_curso].get("nome_grande_area")
-                        record["curso_area"] = data["cursos"][codigo_curso].get("nome_area")
-                    else:
-                        record["curso_grande_area"] = None
-                        record["curso_area"] = None
-                    
-                    # Áreas do conhecimento da formação (separadas e únicas)
-                    areas_conhecimento = formacao.get("areas_conhecimento", [])
-                    if areas_conhecimento:
-                        # Extrair grandes áreas únicas
-                        grandes_areas = list(set([
-                            area.get('nome_grande_area', '') 
-                            for area in areas_conhecimento 
-                            if area.get('nome_grande_area')
-                        ]))
-                        
-                        # Extrair áreas únicas
-                        areas = list(set([
-                            area.get('nome_area', '') 
-                            for area in areas_conhecimento 
-                            if area.get('nome_area')
-                        ]))
-                        
-                        record["grande_area_formacao"] = "; ".join(sorted(grandes_areas)) if grandes_areas else None
-                        record["area_formacao"] = "; ".join(sorted(areas)) if areas else None
-                    else:
-                        record["grande_area_formacao"] = None
-                        record["area_formacao"] = None
-                    
-                    records.append(record)
+                records.extend(flatten_curriculo(data))
         
         df = pd.DataFrame(records)
         df.to_parquet(self.output_dir / "curriculos_data.parquet", index=False)
-        df.to_csv(self.output_dir / "curriculos_data.csv", index=False, encoding='utf-8-sig')
+        if write_csv:
+            df.to_csv(self.output_dir / "curriculos_data.csv", index=False, encoding='utf-8-sig')
         
         print(f"DataFrame salvo com {len(df):,} registros")
         return df
+    
+    def _convert_chunked(self, data_files, chunk_size, write_csv):
+        """Converte o JSONL em blocos de chunk_size currículos, um row group por bloco"""
+        print(f"Convertendo dados em blocos de {chunk_size:,} currículos...")
+        
+        output_parquet = self.output_dir / "curriculos_data.parquet"
+        output_csv = self.output_dir / "curriculos_data.csv"
+        tmp_parquet = output_parquet.with_name(output_parquet.name + '.tmp')
+        
+        total_records = 0
+        csv_file = open(output_csv, 'w', encoding='utf-8-sig', newline='') if write_csv else None
+        try:
+            with pq.ParquetWriter(tmp_parquet, FLAT_SCHEMA) as writer, \
+                 fileinput.input(files=data_files, encoding='utf-8') as f:
+                for lines in iter(lambda: list(islice(f, chunk_size)), []):
+                    records = [record for line in lines for record in flatten_curriculo(json.loads(line))]
+                    table = pa.Table.from_pylist(records, schema=FLAT_SCHEMA)
+                    writer.write_table(table, row_group_size=max(len(records), 1))
+                    
+                    if csv_file is not None:
+                        table.to_pandas().to_csv(csv_file, index=False, header=csv_file.tell() == 0)
+                    
+                    total_records += len(records)
+                    print(f"  {total_records:,} registros convertidos")
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+        os.replace(tmp_parquet, output_parquet)
+        
+        print(f"Parquet salvo com {total_records:,} registros")
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo atual em MB (None onde resource não existe)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def prefetch_zips(zip_files, workers, depth):
+    """Lê os ZIPs em threads à frente do consumidor, preservando a ordem
+    
+    No máximo depth leituras ficam pendentes ou prontas esperando consumo, então
+    a memória fica limitada a depth ZIPs e a leitura para quando o parser atrasa.
+    Gera (zip_file, future); future.result() devolve os bytes ou levanta o erro
+    de leitura daquele arquivo.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch") as executor:
+        files = iter(zip_files)
+        pending = deque(
+            (zip_file, executor.submit(zip_file.read_bytes)) for zip_file in islice(files, depth)
+        )
+        try:
+            while pending:
+                zip_file, future = pending.popleft()
+                next_file = next(files, None)
+                if next_file is not None:
+                    pending.append((next_file, executor.submit(next_file.read_bytes)))
+                yield zip_file, future
+        finally:
+            # Consumidor parou antes do fim: descarta as leituras ainda não iniciadas
+            for _, future in pending:
+                future.cancel()
+
+
+def _process_folder_shard(base_path, output_dir, folder_num, options):
+    """Executado em cada processo do pool: processa uma pasta no seu próprio shard"""
+    processor = LattesProcessor(base_path, output_dir, shard=folder_num, **options)
+    try:
+        processor.process_folder(folder_num, verbose=False)
+    finally:
+        processor.close_writer()
+    
+    elapsed = time.time() - processor.start_time
+    new_count = processor.processed_count - processor.checkpoint["processed_count"]
+    return {
+        "new_count": new_count,
+        "error_count": processor.error_count,
+        "elapsed_seconds": elapsed,
+        "rate_per_second": new_count / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "metrics": processor.metrics.snapshot()
+    }
 
 
 if __name__ == "__main__":
@@ -387,6 +1319,10 @@ if __name__ == "__main__":
         pastas = sorted([p.name for p in Path(base_path).iterdir() if p.is_dir()])
         print(f"Pastas encontradas: {pastas[:10]}...")  # Mostra as 10 primeiras
     
+    # Para gravar direto em Parquet (sem JSONL nem convert_to_dataframe),
+    # use output_format="parquet" e aponte o data_processor para
+    # output_lattes/curriculos_data_parquet
+    # Em HD ou disco de rede, prefetch=4 lê os ZIPs em threads enquanto o parser trabalha
     processor = LattesProcessor(
         base_path=base_path,
         output_dir="output_lattes"
@@ -397,6 +1333,8 @@ if __name__ == "__main__":
     processor.process_all()  # ← MUDE AQUI para testar
     
     # Converter para formato de análise
+    # Para o dump completo, converta em blocos sem carregar tudo na memória:
+    # processor.convert_to_dataframe(chunk_size=100_000, write_csv=False)
     df = processor.convert_to_dataframe()
     
     if df is not None:
@@ -0,0 +1,321 @@
+import argparse
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# Colunas que podem ser filtradas ou agrupadas
+COLUNAS = [
+    'ano_conclusao', 'ano_inicio', 'tipo_formacao', 'genero', 'flag_bolsa', 'curso_concluido',
+    'uf_instituicao', 'regiao_instituicao', 'grande_area', 'area', 'sigla_instituicao'
+]
+# Colunas com vários valores por formação ("A; B"): cada valor conta separadamente
+MULTIVALORADAS = ('grande_area', 'area')
+ANOS = ('ano_conclusao', 'ano_inicio')
+BOOLEANAS = ('flag_bolsa', 'curso_concluido')
+
+
+class ErroConsulta(ValueError):
+    """Parâmetro inválido na consulta (vira HTTP 400)"""
+
+
+class ServicoConsultas:
+    """Contagens e séries filtradas sobre curriculos_processados.parquet, em memória
+
+    Os dados ficam residentes em colunas (categorias do pandas e anos Int16); as
+    colunas com várias áreas por formação são separadas uma vez na carga. Cada
+    consulta é normalizada (colunas e valores ordenados) antes de ir ao cache LRU,
+    então a mesma consulta com parâmetros em outra ordem reaproveita o resultado.
+    """
+
+    def __init__(self, parquet_file, cache_size=1024):
+        inicio = time.perf_counter()
+        df = pd.read_parquet(parquet_file, columns=COLUNAS)
+        for col in COLUNAS:
+            if col in ANOS:
+                df[col] = df[col].astype('Int16')
+            elif col in BOOLEANAS:
+                df[col] = df[col].astype('boolean')
+            elif col not in MULTIVALORADAS:
+                df[col] = df[col].astype('category')
+        self.df = df
+        
+        # Menor e maior ano de cada coluna: intervalos pedidos são recortados a eles
+        self.limites_anos = {}
+        for col in ANOS:
+            anos = df[col].dropna()
+            self.limites_anos[col] = (int(anos.min()), int(anos.max())) if len(anos) else None
+
+        # (linha, valor) de cada área da formação
+        self.pares = {}
+        for col in MULTIVALORADAS:
+            valores = df[col].astype(object).str.split(r';\s*', regex=True).explode().str.strip()
+            valores = valores[valores.notna() & (valores != '')]
+            self.pares[col] = pd.DataFrame({
+                'linha': valores.index.to_numpy(),
+                col: pd.Categorical(valores.to_numpy()),
+            })
+        self.tempo_carga = time.perf_counter() - inicio
+
+        # Cache LRU próprio: o lock só protege o dicionário, nunca o cálculo da consulta
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latencias = {}
+
+    def normalizar(self, params):
+        """Converte os parâmetros da URL em (por, filtros) hasheáveis e ordenados
+
+        por=col1,col2 define os agrupamentos; qualquer outra coluna de COLUNAS é
+        filtro, com valores separados por vírgula. Anos aceitam intervalos
+        (ano_conclusao=2010-2023), recortados aos anos presentes nos dados, e
+        booleanos aceitam true/false.
+        """
+        # Colunas repetidas (por=genero,genero) contam uma vez, na ordem da primeira
+        por = []
+        for valor in params.get('por', []):
+            for col in valor.split(','):
+                if col and col not in por:
+                    por.append(col)
+        for col in por:
+            if col not in COLUNAS:
+                raise ErroConsulta(f"Coluna desconhecida em por: {col}")
+        if sum(col in MULTIVALORADAS for col in por) > 1:
+            raise ErroConsulta("Só uma coluna de áreas pode ser agrupada por vez")
+
+        filtros = []
+        for col, valores in params.items():
+            if col == 'por':
+                continue
+            if col not in COLUNAS:
+                raise ErroConsulta(f"Filtro desconhecido: {col}")
+            aceitos = set()
+            for valor in ','.join(valores).split(','):
+                aceitos.update(self._converter(col, valor.strip()))
+            filtros.append((col, tuple(sorted(aceitos, key=str))))
+        return tuple(por), tuple(sorted(filtros))
+
+    def _converter(self, col, valor):
+        if col in ANOS:
+            try:
+                if '-' in valor:
+                    inicio, fim = sorted(int(ano) for ano in valor.split('-', 1))
+                    limites = self.limites_anos[col]
+                    if limites is None:
+                        return []
+                    return range(max(inicio, limites[0]), min(fim, limites[1]) + 1)
+                return [int(valor)]
+            except ValueError:
+                raise ErroConsulta(f"Ano inválido em {col}: {valor}")
+        if col in BOOLEANAS:
+            if valor.lower() not in ('true', 'false'):
+                raise ErroConsulta(f"Use true ou false em {col}")
+            return [valor.lower() == 'true']
+        return [valor]
+
+    def _mascara(self, filtros):
+        mascara = np.ones(len(self.df), dtype=bool)
+        for col, aceitos in filtros:
+            if col in MULTIVALORADAS:
+                pares = self.pares[col]
+                linhas = pares.loc[pares[col].isin(aceitos), 'linha'].to_numpy()
+                na_coluna = np.zeros(len(self.df), dtype=bool)
+                na_coluna[linhas] = True
+                mascara &= na_coluna
+            else:
+                mascara &= self.df[col].isin(aceitos).to_numpy(dtype=bool, na_value=False)
+        return mascara
+
+    def _consultar(self, por, filtros):
+        """Resultado da consulta normalizada e se ele veio do cache
+        
+        Duas requisições simultâneas com a mesma consulta podem calcular o
+        resultado ao mesmo tempo; as demais consultas seguem em paralelo.
+        """
+        chave = (por, filtros)
+        with self._lock:
+            resultado = self._cache.get(chave)
+            if resultado is not None:
+                self._cache.move_to_end(chave)
+                self.cache_hits += 1
+                return resultado, True
+            self.cache_misses += 1
+        
+        resultado = self._consultar_sem_cache(por, filtros)
+        with self._lock:
+            self._cache[chave] = resultado
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return resultado, False
+    
+    def _consultar_sem_cache(self, por, filtros):
+        mascara = self._mascara(filtros)
+        total = int(mascara.sum())
+        if not por:
+            return {'por': [], 'linhas': [{'qtd': total}], 'total': total}
+
+        multivalorada = next((col for col in por if col in MULTIVALORADAS), None)
+        if multivalorada is None:
+            base = self.df.loc[mascara, list(por)]
+        else:
+            pares = self.pares[multivalorada]
+            pares = pares[mascara[pares['linha'].to_numpy()]]
+            # Filtrada pela própria coluna, só os valores aceitos viram grupos (como em
+            # CuboFormacoes.rollup); as outras áreas das formações filtradas ficam de fora
+            aceitos = dict(filtros).get(multivalorada)
+            if aceitos is not None:
+                pares = pares[pares[multivalorada].isin(aceitos)]
+            base = pd.DataFrame({multivalorada: pares[multivalorada].to_numpy()})
+            for col in por:
+                if col != multivalorada:
+                    base[col] = self.df[col].to_numpy()[pares['linha'].to_numpy()]
+
+        contagens = base.groupby(list(por), dropna=False, observed=True).size().reset_index(name='qtd')
+        contagens = contagens.astype(object).where(contagens.notna(), None)
+        linhas = [
+            {chave: (valor.item() if hasattr(valor, 'item') else valor) for chave, valor in linha.items()}
+            for linha in contagens.to_dict('records')
+        ]
+        return {'por': list(por), 'linhas': linhas, 'total': total}
+
+    def contagem(self, params):
+        """Contagem de formações agrupada por `por` e filtrada pelos demais parâmetros"""
+        por, filtros = self.normalizar(params)
+        return self._consultar(por, filtros)
+
+    def serie(self, params):
+        """Série anual: como contagem, com o ano (padrão ano_conclusao) como primeiro agrupamento
+
+        O resultado vem como {grupo: {ano: qtd}}, pronto para um gráfico de linhas.
+        """
+        params = dict(params)
+        ano = params.pop('ano', ['ano_conclusao'])[0]
+        if ano not in ANOS:
+            raise ErroConsulta(f"ano deve ser uma de {', '.join(ANOS)}")
+        outros = [c for valor in params.pop('por', []) for c in valor.split(',') if c and c != ano]
+        outros = list(dict.fromkeys(outros))
+        params['por'] = [','.join([ano] + outros)]
+        resultado, em_cache = self.contagem(params)
+
+        series = {}
+        for linha in resultado['linhas']:
+            grupo = ' | '.join(str(linha[col]) for col in outros) if outros else 'total'
+            if linha[ano] is not None:
+                series.setdefault(grupo, {})[linha[ano]] = linha['qtd']
+        return {'ano': ano, 'por': outros, 'series': series, 'total': resultado['total']}, em_cache
+
+    def valores(self, _params=None):
+        """Valores distintos de cada coluna (para os filtros do front-end)"""
+        valores = {}
+        for col in COLUNAS:
+            if col in MULTIVALORADAS:
+                valores[col] = sorted(self.pares[col][col].cat.categories.tolist())
+            elif col in ANOS:
+                valores[col] = list(self.limites_anos[col] or [])
+            elif col in BOOLEANAS:
+                valores[col] = [False, True]
+            else:
+                valores[col] = sorted(self.df[col].cat.categories.tolist())
+        return valores, False
+
+    def registrar(self, rota, segundos):
+        # Chamado pelas threads do servidor: o dicionário e os deques só mudam sob o lock
+        with self._lock:
+            self.latencias.setdefault(rota, deque(maxlen=1000)).append(segundos * 1000)
+
+    def estatisticas(self, _params=None):
+        """Latência por rota (últimas 1000 requisições) e uso do cache"""
+        with self._lock:
+            cache = {'hits': self.cache_hits, 'misses': self.cache_misses,
+                     'tamanho': len(self._cache), 'maximo': self.cache_size}
+            latencias = {rota: list(tempos) for rota, tempos in self.latencias.items()}
+        rotas = {}
+        for rota, tempos in latencias.items():
+            tempos = np.array(tempos)
+            rotas[rota] = {
+                'requisicoes': len(tempos),
+                'p50_ms': round(float(np.percentile(tempos, 50)), 3),
+                'p95_ms': round(float(np.percentile(tempos, 95)), 3),
+                'max_ms': round(float(tempos.max()), 3),
+            }
+        return {
+            'linhas': len(self.df),
+            'carga_s': round(self.tempo_carga, 3),
+            'cache': cache,
+            'rotas': rotas,
+        }, False
+
+
+class Handler(BaseHTTPRequestHandler):
+    rotas = {
+        '/contagem': ServicoConsultas.contagem,
+        '/serie': ServicoConsultas.serie,
+        '/valores': ServicoConsultas.valores,
+        '/estatisticas': ServicoConsultas.estatisticas,
+    }
+
+    def do_GET(self):
+        inicio = time.perf_counter()
+        url = urlparse(self.path)
+        rota = self.rotas.get(url.path)
+        em_cache = False
+        if rota is None:
+            status, corpo = 404, {'erro': f"Rota desconhecida: {url.path}", 'rotas': sorted(self.rotas)}
+        else:
+            try:
+                corpo, em_cache = rota(self.server.servico, parse_qs(url.query))
+                status = 200
+            except ErroConsulta as e:
+                status, corpo = 400, {'erro': str(e)}
+            except Exception as e:
+                traceback.print_exc()
+                status, corpo = 500, {'erro': f"Erro interno: {type(e).__name__}: {e}"}
+
+        segundos = time.perf_counter() - inicio
+        self.server.servico.registrar(url.path, segundos)
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('X-Tempo-ms', f"{segundos * 1000:.3f}")
+        self.send_header('X-Cache', 'hit' if em_cache else 'miss')
+        self.end_headers()
+        self.wfile.write(dados)
+        print(f"{status} {self.path} {segundos * 1000:.1f} ms{' (cache)' if em_cache else ''}")
+
+    def log_message(self, format, *args):
+        # O log padrão é substituído pela linha com a latência, impressa em do_GET
+        pass
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serviço local de consultas sobre o Parquet processado")
+    arg_parser.add_argument("--parquet", default="output_lattes/curriculos_processados.parquet")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--cache-size", type=int, default=1024, help="Consultas guardadas no cache LRU")
+    args = arg_parser.parse_args()
+
+    servico = ServicoConsultas(args.parquet, cache_size=args.cache_size)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.servico = servico
+    print("="*60)
+    print(f"✓ {len(servico.df):,} formações em memória (carga em {servico.tempo_carga:.1f}s)")
+    print(f"✓ Servindo em http://{args.host}:{args.port}")
+    print("  /contagem?por=ano_conclusao,genero&tipo_formacao=DOUTORADO&ano_conclusao=2010-2023")
+    print("  /serie?por=genero&grande_area=ENGENHARIAS")
+    print("  /valores  /estatisticas")
+    print("="*60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,3 +1,7 @@
+-- Desnecessário para dados gerados pelo data_processor atual: a etapa 12
+-- (canonizar_instituicoes) já aplica estas regras antes da carga e grava
+-- instituicao_id. Mantido para bancos carregados de CSVs antigos.
+
 BEGIN;
 
 CREATE TEMP TABLE instituicoes_to_merge (
@@ -20,7 +20,8 @@ CREATE TEMP TABLE temp_curriculos (
     sigla_instituicao VARCHAR(50),
     uf_instituicao VARCHAR(2),
     regiao_instituicao VARCHAR(20),
-    pais_instituicao VARCHAR(50)
+    pais_instituicao VARCHAR(50),
+    instituicao_id INTEGER
 );
 
 -- Carregar CSV (arquivo montado em /tmp/output_lattes via docker-compose)
@@ -40,15 +41,20 @@ SELECT DISTINCT ON (numero_identificador)
 FROM temp_curriculos
 ORDER BY numero_identificador, data_atualizacao DESC;
 
-INSERT INTO instituicoes (sigla_instituicao, uf_instituicao, regiao_instituicao, pais_instituicao)
-SELECT DISTINCT
+-- Instituições já canônicas: o data_processor (etapa 12) junta as duplicadas e gera
+-- instituicao_id, então instituicao_fixes.sql e puc_fixes.sql não precisam mais rodar
+INSERT INTO instituicoes (id, sigla_instituicao, uf_instituicao, regiao_instituicao, pais_instituicao)
+SELECT DISTINCT ON (instituicao_id)
+    instituicao_id,
     sigla_instituicao,
     uf_instituicao,
     regiao_instituicao,
     pais_instituicao
 FROM temp_curriculos
-WHERE sigla_instituicao IS NOT NULL AND sigla_instituicao <> ''
-ON CONFLICT (sigla_instituicao, uf_instituicao, pais_instituicao) DO NOTHING;
+WHERE instituicao_id IS NOT NULL
+ORDER BY instituicao_id;
+
+SELECT setval(pg_get_serial_sequence('instituicoes', 'id'), COALESCE((SELECT MAX(id) FROM instituicoes), 0) + 1, false);
 
 INSERT INTO areas (nome_area, tipo)
 SELECT DISTINCT TRIM(unnest_grande_area), 'grande_area'
@@ -67,17 +73,14 @@ ON CONFLICT (nome_area, tipo) DO NOTHING;
 INSERT INTO formacoes (pessoa_id, instituicao_id, tipo_formacao, curso_concluido, ano_inicio, ano_conclusao, flag_bolsa)
 SELECT
     p.id,
-    i.id,
+    t.instituicao_id,
     t.tipo_formacao,
     t.curso_concluido,
     NULLIF(t.ano_inicio, '')::INTEGER,
     NULLIF(t.ano_conclusao, '')::INTEGER,
     t.flag_bolsa
 FROM temp_curriculos t
-JOIN pessoas p ON t.numero_identificador = p.numero_identificador
-LEFT JOIN instituicoes i ON t.sigla_instituicao = i.sigla_instituicao 
-                         AND COALESCE(t.uf_instituicao, '') = COALESCE(i.uf_instituicao, '')
-                         AND COALESCE(t.pais_instituicao, '') = COALESCE(i.pais_instituicao, '');
+JOIN pessoas p ON t.numero_identificador = p.numero_identificador;
 
 WITH formacao_map AS (
     SELECT
@@ -1,3 +1,12 @@
+-- Desnecessário para dados gerados pelo data_processor atual: a etapa 12
+-- (canonizar_instituicoes) já aplica estas regras antes da carga e grava
+-- instituicao_id. Mantido para bancos carregados de CSVs antigos.
+--
+-- Nos dois caminhos a sigla final de toda PUC é 'PUC' (passo 5 abaixo): PUCRS,
+-- PUCRIO, PUCSP... só se distinguem pela UF (no Brasil) ou pelo país. Consultas
+-- por instituição devem agrupar por instituicao_id ou por (sigla, UF, país),
+-- nunca só pela sigla.
+
 -- SE FOR LIKE PUCC OU PUCA && pais_instituicao = 'Brasil' then PUCSP
 -- SE FOR LIKE '%PUC%' COM pais_instituicao = 'Brasil' DEIXAR SOMENTE UMA EM CADA UM DOS ESTADOS: SP, GO, MG, PR, RJ, RS
 -- OUTROS ESTADOS DEIXAR uf_instituicao e regiao_instituicao como NULL 
@@ -8,6 +8,8 @@ SET tipo_formacao = CASE
     ELSE tipo_formacao
 END;
 
+-- UF 'ZZ' e a junção de instituições sem UF (abaixo) já são feitas pelo
+-- data_processor (etapa 12); só têm efeito em bancos carregados de CSVs antigos
 UPDATE instituicoes
 SET uf_instituicao = NULL
 WHERE uf_instituicao = 'ZZ';
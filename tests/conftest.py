@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Os módulos de Python/ se importam pelo nome (from manifest import ...), sem pacote
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "Python"))
+
+from benchmark import generate_corpus  # noqa: E402
+from data_processor import LattesDataProcessor  # noqa: E402
+from parser import LattesProcessor  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    """Corpus sintético pequeno (3 pastas) com o grupos.csv dos nomes usados"""
+    dest = tmp_path_factory.mktemp("corpus")
+    generate_corpus(dest, folders=3, per_folder=40, publicacoes=(0, 10), seed=1)
+    return dest
+
+
+@pytest.fixture(scope="session")
+def curriculos_data(corpus, tmp_path_factory):
+    """curriculos_data.parquet do corpus, como sai do parser"""
+    output_dir = tmp_path_factory.mktemp("parser")
+    processor = LattesProcessor(corpus, output_dir)
+    processor.process_all(max_folders=3)
+    processor.convert_to_dataframe(write_csv=False)
+    return output_dir / "curriculos_data.parquet"
+
+
+@pytest.fixture(scope="session")
+def processados(corpus, curriculos_data, tmp_path_factory):
+    """curriculos_processados.parquet do corpus, processado em memória e sem cache"""
+    output_dir = tmp_path_factory.mktemp("processados")
+    LattesDataProcessor(curriculos_data, corpus / "grupos.csv", output_dir, cache_etapas=False).process_data()
+    return output_dir / "curriculos_processados.parquet"
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analise_pandemia import ANOS, AnalisePandemia
+
+
+@pytest.fixture
+def matriz():
+    """Dois subgrupos com respostas conhecidas
+
+    'linear' segue 100 + 10 por ano desde 2010, exceto 2020 e 2021 (50 abaixo da
+    tendência) e 2023 (incompleto); 'constante' é sempre 50.
+    """
+    anos = list(ANOS)
+    linear = {ano: 100.0 + 10 * (ano - 2010) for ano in anos}
+    linear.update({2020: 150.0, 2021: 160.0, 2023: 0.0})
+    matriz = pd.DataFrame({('tipo_formacao', 'linear'): [linear[ano] for ano in anos],
+                           ('tipo_formacao', 'constante'): [50.0] * len(anos)}, index=anos)
+    matriz.index.name = 'ano'
+    matriz.columns.names = ['dimensao', 'grupo']
+    return matriz
+
+
+def test_tendencia(matriz):
+    analise = AnalisePandemia(matriz)
+    np.testing.assert_allclose(analise.inclinacao, [10, 0], atol=1e-9)
+    assert analise.r2[0] == pytest.approx(1)
+    assert np.isnan(analise.r2[1])
+    np.testing.assert_allclose(analise.residuo[list(ANOS).index(2020)], [-50, 0], atol=1e-9)
+
+
+def test_resumo(matriz):
+    resumo = AnalisePandemia(matriz).resumo().set_index('grupo')
+    linear = resumo.loc['linear']
+
+    assert linear['media_pre'] == pytest.approx(170)
+    # 2020 pesa meio ano: (0.5 * 150 + 160) / 1.5
+    assert linear['media_pandemia'] == pytest.approx(235 / 1.5)
+    assert linear['variacao_pandemia_pct'] == pytest.approx(100 * (235 / 1.5 - 170) / 170)
+    # Resíduos ponderados sobre o esperado ponderado: (0.5 * -50 - 50) / (0.5 * 200 + 210)
+    assert linear['impacto_pct'] == pytest.approx(100 * -75 / 310)
+    # 2023 é incompleto: só 2022 entra na média pós-pandemia
+    assert linear['media_pos'] == pytest.approx(220)
+
+    constante = resumo.loc['constante']
+    assert constante['media_pandemia'] == pytest.approx(50)
+    assert constante['variacao_pandemia_pct'] == pytest.approx(0)
+    assert constante['impacto_pct'] == pytest.approx(0)
+
+
+def test_serie(matriz):
+    serie = AnalisePandemia(matriz).serie()
+    assert len(serie) == matriz.size
+    linha = serie[(serie['grupo'] == 'linear') & (serie['ano'] == 2021)].iloc[0]
+    assert (linha['observado'], linha['esperado'], linha['peso_pandemia']) == (160, pytest.approx(210), 1.0)
+    assert serie.loc[serie['ano'] == 2023, 'incompleto'].all()
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from analytics import LattesAnalytics, split_statements, strip_comments
+
+SQL_QUERIES = Path(__file__).resolve().parents[1] / "SQL" / "SQL_Queries"
+
+
+@pytest.fixture
+def analytics(processados):
+    analytics = LattesAnalytics(processados)
+    yield analytics
+    analytics.close()
+
+
+def test_views(analytics, processados):
+    df = pd.read_parquet(processados)
+    assert analytics.query("SELECT COUNT(*) AS n FROM formacoes")["n"][0] == len(df)
+    assert analytics.query("SELECT COUNT(*) AS n FROM pessoas")["n"][0] == df["numero_identificador"].nunique()
+    assert analytics.query("SELECT COUNT(*) AS n FROM instituicoes")["n"][0] == df["instituicao_id"].nunique()
+
+
+@pytest.mark.parametrize("materializar", [False, True])
+def test_run_file_efeito_pandemia(processados, tmp_path, materializar):
+    analytics = LattesAnalytics(processados, materializar=materializar)
+    try:
+        relatorio = analytics.run_file(SQL_QUERIES / "efeito_pandemia.sql", tmp_path)
+    finally:
+        analytics.close()
+
+    assert [item["erro"] for item in relatorio] == [None] * 11
+    assert all((tmp_path / item["arquivo"]).exists() for item in relatorio)
+
+    # Primeiro comando: conclusões por ano de 2010 a 2023
+    df = pd.read_parquet(processados)
+    anos = df["ano_conclusao"]
+    esperado = anos[(anos > 2009) & (anos < 2024)].value_counts().sort_index()
+    obtido = pd.read_csv(tmp_path / relatorio[0]["arquivo"])
+    assert relatorio[0]["linhas"] == len(obtido) == len(esperado) > 0
+    assert obtido["ano"].tolist() == esperado.index.tolist()
+    assert obtido["qtd_formacoes"].tolist() == esperado.tolist()
+
+    # Comando por bolsa: a soma por ano bate com o primeiro
+    bolsa = pd.read_csv(tmp_path / relatorio[8]["arquivo"])
+    assert bolsa.groupby("ano")["qtd"].sum().tolist() == esperado.tolist()
+
+
+def test_split_statements():
+    sql = """
+    -- cabeçalho; com ponto e vírgula
+    SELECT 'a;b' AS x;
+    SELECT 'it''s; ok' AS y; /* bloco; comentado */
+    SELECT "col;una" FROM t;
+    -- só comentário;
+    SELECT 1
+    SELECT 2;
+    SELECT 3
+    """
+    assert split_statements(sql) == [
+        "-- cabeçalho; com ponto e vírgula\n    SELECT 'a;b' AS x",
+        "SELECT 'it''s; ok' AS y",
+        "/* bloco; comentado */\n    SELECT \"col;una\" FROM t",
+        "-- só comentário;\n    SELECT 1\n    SELECT 2",
+        "SELECT 3",
+    ]
+
+
+def test_split_statements_so_comentarios():
+    assert split_statements("-- nada aqui;\n-- nem aqui\n;") == []
+    assert split_statements("") == []
+
+
+def test_strip_comments():
+    sql = "-- título\nSELECT 1 -- fim de linha fica\n   -- indentado\nFROM t"
+    assert strip_comments(sql) == "SELECT 1 -- fim de linha fica\nFROM t"
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from cubo import CuboFormacoes
+
+
+@pytest.fixture(scope="module")
+def formacoes(processados):
+    df = pd.read_parquet(processados)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+
+@pytest.fixture(scope="module")
+def cubo(processados):
+    return CuboFormacoes.build(processados, batch_size=50)
+
+
+def _grandes_areas(df):
+    # Uma linha por (formação, grande área), como a junção com formacoes_areas
+    separadas = df.assign(grande_area=df["grande_area"].str.split(r";\s*", regex=True)).explode("grande_area")
+    return separadas[separadas["grande_area"].notna() & (separadas["grande_area"] != "")]
+
+
+def _comparar(rollup, esperado, por):
+    esperado = esperado.rename("qtd").reset_index().sort_values(por, ignore_index=True)
+    rollup = rollup.astype({col: object for col in por})
+    assert rollup[por].astype(str).values.tolist() == esperado[por].astype(str).values.tolist()
+    assert rollup["qtd"].tolist() == esperado["qtd"].tolist()
+
+
+def test_rollup_total(cubo, formacoes):
+    assert cubo.rollup()["qtd"].tolist() == [len(formacoes)]
+
+
+@pytest.mark.parametrize("por", [
+    ["tipo_formacao"],
+    ["ano_conclusao", "flag_bolsa"],
+    ["regiao_instituicao", "genero"],
+])
+def test_rollup_igual_groupby(cubo, formacoes, por):
+    anos = range(2000, 2024)
+    df = formacoes[formacoes["ano_conclusao"].isin(anos)]
+    esperado = df.groupby(por, dropna=False).size()
+    _comparar(cubo.rollup(por, {"ano_conclusao": anos}), esperado, por)
+
+
+def test_rollup_por_grande_area(cubo, formacoes):
+    esperado = _grandes_areas(formacoes).groupby("grande_area").size()
+    rollup = cubo.rollup(["grande_area"])
+    _comparar(rollup, esperado, ["grande_area"])
+    # Formações com mais de uma grande área contam em cada uma
+    com_area = formacoes["grande_area"].notna() & (formacoes["grande_area"] != "")
+    assert rollup["qtd"].sum() > com_area.sum()
+
+
+def test_rollup_filtro_grande_area_conta_em_dobro(cubo, formacoes):
+    # Duas grandes áreas aceitas que aparecem juntas em alguma formação
+    combinadas = formacoes["grande_area"].dropna()
+    aceitas = combinadas[combinadas.str.contains(";")].iloc[0].split("; ")
+    separadas = _grandes_areas(formacoes)
+    separadas = separadas[separadas["grande_area"].isin(aceitas)]
+    esperado = separadas.groupby("tipo_formacao").size()
+
+    rollup = cubo.rollup(["tipo_formacao"], {"grande_area": aceitas})
+    _comparar(rollup, esperado, ["tipo_formacao"])
+    # A formação com as duas áreas aceitas conta duas vezes
+    distintas = separadas.index.nunique()
+    assert rollup["qtd"].sum() == len(separadas) > distintas
@@ -0,0 +1,172 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from data_processor import ROW_GROUP_SIZE, LattesDataProcessor, load_processed
+
+
+def _ordenado(df):
+    # Em blocos a ordenação por ano vale dentro de cada bloco; compara-se o conteúdo
+    df = df.astype(str)
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def _processar(curriculos_data, corpus, output_dir, **kwargs):
+    processor = LattesDataProcessor(curriculos_data, corpus / "grupos.csv", output_dir,
+                                    cache_etapas=kwargs.pop("cache_etapas", False))
+    processor.process_data(**kwargs)
+    return processor, pd.read_parquet(output_dir / "curriculos_processados.parquet")
+
+
+def test_em_blocos_igual_em_memoria(corpus, curriculos_data, processados, tmp_path):
+    em_memoria = pd.read_parquet(processados)
+    _, em_blocos = _processar(curriculos_data, corpus, tmp_path, chunk_size=50, workers=2)
+
+    assert list(em_blocos.columns) == list(em_memoria.columns)
+    assert dict(em_blocos.dtypes.astype(str)) == dict(em_memoria.dtypes.astype(str))
+    pd.testing.assert_frame_equal(_ordenado(em_blocos), _ordenado(em_memoria))
+
+
+def test_em_blocos_verbose(corpus, curriculos_data, tmp_path, capsys):
+    _processar(curriculos_data, corpus, tmp_path / "quieto", chunk_size=50, workers=2)
+    quieto = capsys.readouterr().out
+    _processar(curriculos_data, corpus, tmp_path / "verbose", chunk_size=50, workers=2, verbose=True)
+    verbose = capsys.readouterr().out
+
+    # Os prints das etapas vêm dos processos do pool, um conjunto por bloco
+    assert "Predizendo gênero" not in quieto
+    assert verbose.count("Predizendo gênero") == quieto.count("registros processados")
+
+
+def test_saida_ordenada_por_ano(processados):
+    df = pd.read_parquet(processados)
+    anos = df["ano_conclusao"]
+    assert anos.dropna().is_monotonic_increasing
+    assert anos.iloc[anos.notna().sum():].isna().all()
+    assert pq.ParquetFile(processados).metadata.row_group(0).num_rows <= ROW_GROUP_SIZE
+
+
+def test_load_processed_filtra(processados):
+    df = pd.read_parquet(processados)
+    filtrado = load_processed(columns=["ano_conclusao", "tipo_formacao"],
+                              filters={"ano_conclusao": (2000, 2010), "tipo_formacao": ["DOUTORADO"]},
+                              path=processados)
+    esperado = df[df["ano_conclusao"].between(2000, 2010) & (df["tipo_formacao"] == "DOUTORADO")]
+    assert list(filtrado.columns) == ["ano_conclusao", "tipo_formacao"]
+    assert len(filtrado) == len(esperado) > 0
+
+
+# (sigla, UF, país) de entrada -> (sigla, UF, país) canônicos, linha a linha
+CANONIZACAO = {
+    "excecoes_ufs": [
+        (("UFS", "ZZ", "Brasil"), ("UFS", "SE", "Brasil")),
+        (("DCEUFS", "SE", "Brasil"), ("UFS", "SE", "Brasil")),
+        (("UFSC", "SC", "Brasil"), ("UFSC", "SC", "Brasil")),
+        (("UFSM", "", "Brasil"), ("UFSM", "RS", "Brasil")),
+        (("UFSJ", "MG", "Brasil"), ("UFSJ", "MG", "Brasil")),
+        (("UFSCAR", "SP", "Brasil"), ("UFSCAR", "SP", "Brasil")),
+        (("UFSCARUSP", "SP", "Brasil"), ("UFSCAR", "SP", "Brasil")),
+    ],
+    "pucc_puca_sp": [
+        (("PUCCAMP", "SP", "Brasil"), ("PUC", "SP", "Brasil")),
+        (("PUCAMPINAS", "", "Brasil"), ("PUC", "SP", "Brasil")),
+        (("PUCSP", "SP", "Brasil"), ("PUC", "SP", "Brasil")),
+    ],
+    "puc_fora_dos_seis_estados": [
+        (("PUCRS", "RS", "Brasil"), ("PUC", "RS", "Brasil")),
+        (("PUCGO", "GO", "Brasil"), ("PUC", "GO", "Brasil")),
+        (("PUCBA", "BA", "Brasil"), ("PUC", "", "Brasil")),
+        (("PUCPE", "PE", "Brasil"), ("PUC", "", "Brasil")),
+    ],
+    "uma_puc_por_pais": [
+        (("PUCCHILE", "", "Chile"), ("PUC", "", "Chile")),
+        (("PUCUC", "", "Chile"), ("PUC", "", "Chile")),
+        (("PUCP", "", "Peru"), ("PUC", "", "Peru")),
+    ],
+    "uf_unica_absorve": [
+        (("UFABC", "SP", "Brasil"), ("UFABC", "SP", "Brasil")),
+        (("UFABC", "", "Brasil"), ("UFABC", "SP", "Brasil")),
+        (("UNIP", "SP", "Brasil"), ("UNIP", "SP", "Brasil")),
+        (("UNIP", "GO", "Brasil"), ("UNIP", "GO", "Brasil")),
+        (("UNIP", "", "Brasil"), ("UNIP", "", "Brasil")),
+    ],
+}
+
+
+@pytest.mark.parametrize("caso", list(CANONIZACAO))
+def test_canonizar_instituicoes(corpus, tmp_path, caso):
+    entrada, esperado = zip(*CANONIZACAO[caso])
+    chave = ["sigla_instituicao", "uf_instituicao", "pais_instituicao"]
+    df = pd.DataFrame(list(entrada), columns=chave)
+    processor = LattesDataProcessor(tmp_path / "entrada.parquet", corpus / "grupos.csv", tmp_path)
+
+    resultado = processor.canonizar_instituicoes(df)
+
+    assert list(resultado[chave].itertuples(index=False, name=None)) == list(esperado)
+    # Mesma tripla canônica, mesmo id; triplas diferentes, ids diferentes
+    ids = resultado.groupby(chave)["instituicao_id"].nunique()
+    assert (ids == 1).all()
+    assert resultado["instituicao_id"].nunique() == len(set(esperado))
+
+
+def test_cache_de_etapas_desligado_por_padrao(corpus, curriculos_data, tmp_path):
+    LattesDataProcessor(curriculos_data, corpus / "grupos.csv", tmp_path).process_data()
+    assert not (tmp_path / "cache" / "etapas").exists()
+
+
+def test_cache_de_etapas_reaproveita(corpus, curriculos_data, processados, tmp_path):
+    processor, primeira = _processar(curriculos_data, corpus, tmp_path, cache_etapas=True)
+    assert not any(processor.etapas_em_cache.values())
+
+    processor, segunda = _processar(curriculos_data, corpus, tmp_path, cache_etapas=True)
+    assert all(processor.etapas_em_cache.values())
+    pd.testing.assert_frame_equal(segunda, primeira)
+    pd.testing.assert_frame_equal(segunda, pd.read_parquet(processados))
+
+
+def test_cache_de_etapas_invalida_com_auxiliar(corpus, curriculos_data, tmp_path, monkeypatch):
+    _processar(curriculos_data, corpus, tmp_path, cache_etapas=True)
+
+    # Mesmo comportamento, código diferente: as etapas que usam o auxiliar são refeitas
+    original = LattesDataProcessor._normalize_text
+
+    def _normalize_text(self, text):
+        return original(self, text)
+
+    monkeypatch.setattr(LattesDataProcessor, "_normalize_text", _normalize_text)
+    processor, _ = _processar(curriculos_data, corpus, tmp_path, cache_etapas=True)
+
+    usam = {numero for numero, _, _, _, _, codigo, _ in processor._etapas()
+            if any("original(self, text)" in fonte for fonte in processor._codigo_etapa(codigo))}
+    refeitas = {numero for numero, em_cache in processor.etapas_em_cache.items() if not em_cache}
+    assert usam
+    assert refeitas == usam
+
+
+def test_cache_de_etapas_invalida_com_grupos(corpus, curriculos_data, tmp_path):
+    _processar(curriculos_data, corpus, tmp_path, cache_etapas=True)
+
+    grupos = tmp_path / "grupos.csv"
+    texto = (corpus / "grupos.csv").read_text(encoding='utf-8')
+    grupos.write_text(texto + "ZULMIRA,F,0,0,0,0,ZULMIRA,1.0,ZULMIRA\n", encoding='utf-8')
+    processor = LattesDataProcessor(curriculos_data, grupos, tmp_path, cache_etapas=True)
+    processor.process_data()
+
+    refeitas = {numero for numero, em_cache in processor.etapas_em_cache.items() if not em_cache}
+    assert refeitas == {4}
+
+
+def test_cache_de_etapas_limite(corpus, curriculos_data, tmp_path):
+    _processar(curriculos_data, corpus, tmp_path, cache_etapas=True)
+    arquivos = set((tmp_path / "cache" / "etapas").glob("*.pkl"))
+
+    # Outra entrada com limite 0: só ficam as entradas usadas nesta execução
+    pequeno = tmp_path / "pequeno.parquet"
+    pd.read_parquet(curriculos_data).iloc[:30].to_parquet(pequeno, index=False)
+    processor = LattesDataProcessor(pequeno, corpus / "grupos.csv", tmp_path, cache_etapas=True,
+                                    cache_etapas_mb=0)
+    processor.process_data()
+
+    restantes = {arquivo.name for arquivo in (tmp_path / "cache" / "etapas").glob("*.pkl")}
+    assert restantes == {nome for nome in processor.arquivos_cache if nome.endswith(".pkl")}
+    assert not restantes & {arquivo.name for arquivo in arquivos}
@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pytest
+
+from db_loader import COLUNAS, LEITURA, LattesDatabaseLoader, build_tables
+
+
+@pytest.fixture
+def linhas_processadas():
+    """Cinco linhas no formato de curriculos_processados.parquet
+
+    A pessoa 1 tem dois currículos (o de 2024 é o mais recente), a pessoa 2 tem
+    uma formação sem instituição e campos vazios, e a última linha não tem
+    numero_identificador válido (é descartada).
+    """
+    return pd.DataFrame({
+        'numero_identificador': ['1', '1', '2', '3', 'x'],
+        'genero': ['F', 'F', '', 'M', 'M'],
+        'data_atualizacao': ['2020-01-01', '2024-05-10', '2023-02-02', '2022-03-03', '2022-03-03'],
+        'uf_nascimento': ['SP', 'SP', '', 'RJ', 'RJ'],
+        'capital_nascimento': [True, True, False, True, True],
+        'regiao_nascimento': ['Sudeste', 'Sudeste', '', 'Sudeste', 'Sudeste'],
+        'pais_nascimento': ['Brasil'] * 5,
+        'tipo_formacao': ['GRADUACAO', 'DOUTORADO', 'MESTRADO', 'GRADUACAO', 'GRADUACAO'],
+        'curso_concluido': [True, False, True, True, True],
+        'ano_inicio': [2010, 2020, None, 2001, 2001],
+        'ano_conclusao': [2014, None, 2019, 2005, 2005],
+        'grande_area': ['CIENCIAS EXATAS E DA TERRA', 'CIENCIAS EXATAS E DA TERRA; ENGENHARIAS',
+                        '', 'CIENCIAS HUMANAS', 'CIENCIAS HUMANAS'],
+        'area': ['Matemática', 'Matemática; Engenharia Elétrica', '', 'História', 'História'],
+        'flag_bolsa': [False, True, False, True, True],
+        'sigla_instituicao': ['USP', 'UNICAMP', '', 'UFRJ', 'UFRJ'],
+        'uf_instituicao': ['SP', 'SP', '', 'RJ', 'RJ'],
+        'regiao_instituicao': ['Sudeste', 'Sudeste', '', 'Sudeste', 'Sudeste'],
+        'pais_instituicao': ['Brasil', 'Brasil', '', 'Brasil', 'Brasil'],
+        'instituicao_id': [1, 2, None, 3, 3],
+    })
+
+
+def test_build_tables_contagens(linhas_processadas):
+    tabelas = build_tables(linhas_processadas)
+
+    assert {nome: list(tabela.columns) for nome, tabela in tabelas.items()} == COLUNAS
+    assert len(tabelas['formacoes']) == 4
+    assert len(tabelas['pessoas']) == 3
+    assert len(tabelas['instituicoes']) == 3
+    assert sorted(tabelas['areas']['nome_area']) == sorted([
+        'CIENCIAS EXATAS E DA TERRA', 'ENGENHARIAS', 'CIENCIAS HUMANAS',
+        'Matemática', 'Engenharia Elétrica', 'História',
+    ])
+    # 2 áreas na 1ª formação, 4 na 2ª, nenhuma na 3ª, 2 na 4ª
+    assert len(tabelas['formacoes_areas']) == 8
+
+
+def test_build_tables_chaves(linhas_processadas):
+    tabelas = build_tables(linhas_processadas)
+    pessoas, instituicoes = tabelas['pessoas'], tabelas['instituicoes']
+    formacoes, areas, formacoes_areas = tabelas['formacoes'], tabelas['areas'], tabelas['formacoes_areas']
+
+    for tabela in tabelas.values():
+        assert tabela['id'].is_unique
+    assert pessoas['numero_identificador'].is_unique
+    assert formacoes['pessoa_id'].isin(pessoas['id']).all()
+    assert formacoes['instituicao_id'].dropna().isin(instituicoes['id']).all()
+    assert formacoes_areas['formacao_id'].isin(formacoes['id']).all()
+    assert formacoes_areas['area_id'].isin(areas['id']).all()
+    assert not formacoes_areas.duplicated(['formacao_id', 'area_id']).any()
+    assert not areas.duplicated(['nome_area', 'tipo']).any()
+    assert not instituicoes.duplicated(['sigla_instituicao', 'uf_instituicao', 'pais_instituicao']).any()
+
+
+def test_build_tables_valores(linhas_processadas):
+    tabelas = build_tables(linhas_processadas)
+    pessoas = tabelas['pessoas'].set_index('numero_identificador')
+
+    # Currículo mais recente e vazios como NULL
+    assert str(pessoas.loc[1, 'data_atualizacao']) == '2024-05-10'
+    assert pd.isna(pessoas.loc[2, 'genero'])
+    assert pd.isna(tabelas['formacoes']['instituicao_id'].iloc[2])
+
+
+@pytest.mark.skipif(not os.environ.get("LATTES_DB_URL"),
+                    reason="defina LATTES_DB_URL com um banco descartável (as tabelas são recriadas)")
+def test_load_verify(linhas_processadas, tmp_path):
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("psycopg2")
+    parquet_file = tmp_path / "curriculos_processados.parquet"
+    linhas_processadas.assign(extra='não lida').to_parquet(parquet_file, index=False)
+
+    loader = LattesDatabaseLoader(parquet_file)
+    tabelas = loader.load()
+
+    assert {nome: len(tabela) for nome, tabela in tabelas.items()} == {
+        nome: len(tabela) for nome, tabela in build_tables(linhas_processadas[LEITURA]).items()
+    }
+    assert loader.verify(tabelas)
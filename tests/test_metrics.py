@@ -0,0 +1,95 @@
+import json
+import re
+
+from metrics import STAGES, PipelineMetrics
+from parser import LattesProcessor
+
+# Linha de amostra do formato texto do Prometheus: nome{rótulos} valor
+AMOSTRA = re.compile(
+    r'^(?P<nome>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?:\{(?P<rotulos>[a-zA-Z_][a-zA-Z0-9_]*="[^"\\\n]*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="[^"\\\n]*")*)\})?'
+    r' (?P<valor>\S+)$'
+)
+TIPOS = ('counter', 'gauge', 'histogram', 'summary', 'untyped')
+
+
+def _ler_prom(texto):
+    """Valida o formato e devolve {(nome, rótulos): valor} e {nome: tipo}"""
+    assert texto.endswith('\n')
+    amostras, tipos = {}, {}
+    for linha in texto.splitlines():
+        if linha.startswith('# TYPE '):
+            _, _, nome, tipo = linha.split(' ')
+            assert tipo in TIPOS
+            assert nome not in tipos, f"TYPE repetido: {nome}"
+            tipos[nome] = tipo
+        elif linha.startswith('# HELP '):
+            assert len(linha.split(' ', 3)) == 4
+        else:
+            casa = AMOSTRA.match(linha)
+            assert casa, f"linha inválida: {linha!r}"
+            # O TYPE vem antes da primeira amostra da métrica
+            assert casa['nome'] in tipos, f"amostra sem TYPE: {linha!r}"
+            chave = (casa['nome'], casa['rotulos'] or '')
+            assert chave not in amostras, f"amostra repetida: {linha!r}"
+            amostras[chave] = float(casa['valor'])
+    return amostras, tipos
+
+
+def test_export(tmp_path):
+    metrics = PipelineMetrics(tmp_path)
+    with metrics.stage('xml_parse'):
+        pass
+    metrics.counters["files"] += 3
+    metrics.eta_seconds(files_remaining=7)
+    metrics.export()
+    metrics.counters["files"] += 1
+    metrics.export()
+
+    # metrics.jsonl: um snapshot por exportação, acumulando
+    with open(tmp_path / "metrics.jsonl", encoding='utf-8') as f:
+        snapshots = [json.loads(linha) for linha in f]
+    assert len(snapshots) == 2
+    for snapshot in snapshots:
+        assert set(snapshot) == {"timestamp", "elapsed_seconds", "counters", "gauges", "stages"}
+        assert list(snapshot["stages"]) == list(STAGES)
+        for valores in snapshot["stages"].values():
+            assert set(valores) == {"wall_seconds", "cpu_seconds", "calls"}
+    assert [s["counters"]["files"] for s in snapshots] == [3, 4]
+    assert snapshots[1]["stages"]["xml_parse"]["calls"] == 1
+    assert snapshots[1]["gauges"]["files_remaining"] == 7
+
+    # metrics.prom: regravado com a última exportação
+    amostras, tipos = _ler_prom((tmp_path / "metrics.prom").read_text(encoding='utf-8'))
+    for stage in STAGES:
+        for metrica in ("lattes_stage_wall_seconds_total", "lattes_stage_cpu_seconds_total",
+                        "lattes_stage_calls_total"):
+            assert (metrica, f'stage="{stage}"') in amostras
+            assert tipos[metrica] == 'counter'
+    assert amostras[("lattes_stage_calls_total", 'stage="xml_parse"')] == 1
+    assert amostras[("lattes_files_total", '')] == 4
+    assert tipos["lattes_files_total"] == 'counter'
+    assert amostras[("lattes_files_remaining", '')] == 7
+    assert tipos["lattes_eta_seconds"] == tipos["lattes_elapsed_seconds"] == 'gauge'
+    assert not (tmp_path / "metrics.tmp").exists()
+
+
+def test_export_sem_eta(tmp_path):
+    # Sem taxa ainda, eta_seconds é None e o gauge fica de fora (não vira "None")
+    metrics = PipelineMetrics(tmp_path)
+    assert metrics.eta_seconds(files_remaining=5) is None
+    metrics.export()
+    amostras, tipos = _ler_prom((tmp_path / "metrics.prom").read_text(encoding='utf-8'))
+    assert "lattes_eta_seconds" not in tipos
+    assert amostras[("lattes_files_remaining", '')] == 5
+
+
+def test_export_do_parser(corpus, tmp_path):
+    processor = LattesProcessor(corpus, tmp_path)
+    processor.process_all(max_folders=3)
+
+    with open(tmp_path / "metrics.jsonl", encoding='utf-8') as f:
+        ultimo = [json.loads(linha) for linha in f][-1]
+    assert ultimo["counters"]["files"] == processor.processed_count + processor.error_count
+    amostras, _ = _ler_prom((tmp_path / "metrics.prom").read_text(encoding='utf-8'))
+    assert amostras[("lattes_files_total", '')] == ultimo["counters"]["files"]
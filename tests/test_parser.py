@@ -0,0 +1,300 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import zipfile
+from random import Random
+
+import pandas as pd
+import pytest
+
+from benchmark import build_curriculo_xml, generate_corpus
+from parser import LattesProcessor, flatten_curriculo, lxml_etree
+
+XML = '''<?xml version="1.0" encoding="ISO-8859-1" standalone="no" ?>
+<CURRICULO-VITAE SISTEMA-ORIGEM-XML="LATTES" NUMERO-IDENTIFICADOR="1234567890123456" DATA-ATUALIZACAO="15032021">
+<DADOS-GERAIS NOME-COMPLETO="Maria José da Silva" PAIS-DE-NASCIMENTO="Brasil" UF-NASCIMENTO="PE" CIDADE-NASCIMENTO="Recife">
+<FORMACAO-ACADEMICA-TITULACAO>
+<DOUTORADO SEQUENCIA-FORMACAO="3" CODIGO-INSTITUICAO="000000000002" CODIGO-CURSO="00000020" CODIGO-AREA-CURSO="00000000" STATUS-DO-CURSO="CONCLUIDO" ANO-DE-INICIO="2012" ANO-DE-CONCLUSAO="2016" FLAG-BOLSA="SIM">
+<AREAS-DO-CONHECIMENTO><AREA-DO-CONHECIMENTO-1 NOME-GRANDE-AREA-DO-CONHECIMENTO="CIENCIAS_EXATAS_E_DA_TERRA" NOME-DA-AREA-DO-CONHECIMENTO="Matemática"/></AREAS-DO-CONHECIMENTO>
+</DOUTORADO>
+<GRADUACAO SEQUENCIA-FORMACAO="1" CODIGO-INSTITUICAO="000000000001" STATUS-DO-CURSO="CONCLUIDO" ANO-DE-INICIO="2004" ANO-DE-CONCLUSAO="2008"/>
+<MESTRADO SEQUENCIA-FORMACAO="2" CODIGO-INSTITUICAO="000000000001" CODIGO-CURSO="00000010" STATUS-DO-CURSO="EM_ANDAMENTO" ANO-DE-INICIO="2009" ANO-DE-CONCLUSAO="" FLAG-BOLSA="NAO"/>
+</FORMACAO-ACADEMICA-TITULACAO>
+</DADOS-GERAIS>
+<PRODUCAO-BIBLIOGRAFICA><ARTIGOS-PUBLICADOS><ARTIGO-PUBLICADO><DADOS-BASICOS-DO-ARTIGO TITULO-DO-ARTIGO="Ignorado"/></ARTIGO-PUBLICADO></ARTIGOS-PUBLICADOS></PRODUCAO-BIBLIOGRAFICA>
+<DADOS-COMPLEMENTARES><INFORMACOES-ADICIONAIS-INSTITUICOES>
+<INFORMACAO-ADICIONAL-INSTITUICAO CODIGO-INSTITUICAO="000000000001" SIGLA-INSTITUICAO="UFPE" SIGLA-UF-INSTITUICAO="PE" NOME-PAIS-INSTITUICAO="Brasil"/>
+<INFORMACAO-ADICIONAL-INSTITUICAO CODIGO-INSTITUICAO="000000000002" SIGLA-INSTITUICAO="IMPA" SIGLA-UF-INSTITUICAO="RJ" NOME-PAIS-INSTITUICAO="Brasil"/>
+<INFORMACAO-ADICIONAL-INSTITUICAO CODIGO-INSTITUICAO="000000000099" SIGLA-INSTITUICAO="XX" SIGLA-UF-INSTITUICAO="SP" NOME-PAIS-INSTITUICAO="Brasil"/>
+</INFORMACOES-ADICIONAIS-INSTITUICOES><INFORMACOES-ADICIONAIS-CURSOS>
+<INFORMACAO-ADICIONAL-CURSO CODIGO-CURSO="00000010" NOME-GRANDE-AREA-DO-CONHECIMENTO="CIENCIAS_EXATAS_E_DA_TERRA" NOME-DA-AREA-DO-CONHECIMENTO="Matemática"/>
+<INFORMACAO-ADICIONAL-CURSO CODIGO-CURSO="00000020" NOME-GRANDE-AREA-DO-CONHECIMENTO="CIENCIAS_EXATAS_E_DA_TERRA" NOME-DA-AREA-DO-CONHECIMENTO="Matemática Aplicada"/>
+</INFORMACOES-ADICIONAIS-CURSOS></DADOS-COMPLEMENTARES>
+</CURRICULO-VITAE>'''.encode('iso-8859-1')
+
+# Saída do parser original (ElementTree com a árvore inteira) para XML: a GRADUACAO
+# não entra, as formações seguem FORMACAO_TIPOS e só ficam as instituições e cursos citados
+ESPERADO = {
+    "numero_identificador": "1234567890123456",
+    "dados_gerais": {
+        "nome_completo": "Maria José da Silva", "pais_nascimento": "Brasil",
+        "uf_nascimento": "PE", "cidade_nascimento": "Recife", "data_atualizacao": "15032021",
+    },
+    "formacoes": [
+        {"tipo": "MESTRADO", "codigo_instituicao": "000000000001", "codigo_curso": "00000010",
+         "codigo_area_curso": None, "status": "EM_ANDAMENTO", "ano_inicio": "2009",
+         "ano_conclusao": "", "flag_bolsa": "NAO", "areas_conhecimento": []},
+        {"tipo": "DOUTORADO", "codigo_instituicao": "000000000002", "codigo_curso": "00000020",
+         "codigo_area_curso": "00000000", "status": "CONCLUIDO", "ano_inicio": "2012",
+         "ano_conclusao": "2016", "flag_bolsa": "SIM",
+         "areas_conhecimento": [{"nome_grande_area": "CIENCIAS_EXATAS_E_DA_TERRA", "nome_area": "Matemática"}]},
+    ],
+    "instituicoes": {
+        "000000000001": {"sigla_instituicao": "UFPE", "sigla_uf": "PE", "nome_pais": "Brasil"},
+        "000000000002": {"sigla_instituicao": "IMPA", "sigla_uf": "RJ", "nome_pais": "Brasil"},
+    },
+    "cursos": {
+        "00000010": {"nome_grande_area": "CIENCIAS_EXATAS_E_DA_TERRA", "nome_area": "Matemática"},
+        "00000020": {"nome_grande_area": "CIENCIAS_EXATAS_E_DA_TERRA", "nome_area": "Matemática Aplicada"},
+    },
+}
+
+
+def _gravar_zip(zip_path, conteudo):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr("curriculo.xml", conteudo)
+
+
+def test_parse_curriculo_igual_ao_original(tmp_path):
+    processor = LattesProcessor(tmp_path, tmp_path / "out")
+    zip_path = tmp_path / "1234567890123456.zip"
+    _gravar_zip(zip_path, XML)
+
+    assert processor.parse_curriculo(XML) == ESPERADO
+    assert processor.read_curriculo(zip_path) == ESPERADO
+
+
+def test_parse_curriculo_str(tmp_path):
+    processor = LattesProcessor(tmp_path, tmp_path / "out")
+    # Como no parser original, texto já decodificado também é aceito
+    assert processor.parse_curriculo(XML.decode('iso-8859-1')) == ESPERADO
+    with pytest.raises(TypeError):
+        processor.parse_curriculo(12345)
+
+
+def _equivalentes(corpus, tmp_path, **opcoes):
+    """Cada ZIP do corpus dá o mesmo currículo com as opções dadas e com as padrão"""
+    base = LattesProcessor(corpus, tmp_path / "base")
+    outro = LattesProcessor(corpus, tmp_path / "outro", **opcoes)
+    zips = sorted(corpus.glob("*/*.zip"))
+    assert zips
+    for zip_path in zips:
+        esperado = base.read_curriculo(zip_path)
+        assert esperado is not None
+        assert outro.read_curriculo(zip_path) == esperado
+
+
+def test_stream_xml_igual_ao_original(tmp_path):
+    processor = LattesProcessor(tmp_path, tmp_path / "out", stream_xml=True)
+    zip_path = tmp_path / "1234567890123456.zip"
+    _gravar_zip(zip_path, XML)
+
+    assert processor.read_curriculo(zip_path) == ESPERADO
+    assert processor.parse_curriculo(io.BytesIO(XML)) == ESPERADO
+
+
+def test_stream_xml_equivalente_no_corpus(corpus, tmp_path):
+    _equivalentes(corpus, tmp_path, stream_xml=True)
+
+
+sem_lxml = pytest.mark.skipif(lxml_etree is None, reason="lxml não instalado")
+
+
+@sem_lxml
+@pytest.mark.parametrize("stream", [False, True])
+def test_lxml_igual_ao_original(tmp_path, stream):
+    processor = LattesProcessor(tmp_path, tmp_path / "out", parser_backend="lxml", stream_xml=stream)
+    zip_path = tmp_path / "1234567890123456.zip"
+    _gravar_zip(zip_path, XML)
+
+    assert processor.read_curriculo(zip_path) == ESPERADO
+    assert processor.parse_curriculo(io.BytesIO(XML)) == ESPERADO
+    assert processor.parse_curriculo(XML.decode('iso-8859-1')) == ESPERADO
+
+
+@sem_lxml
+@pytest.mark.parametrize("stream", [False, True])
+def test_lxml_equivalente_no_corpus(corpus, tmp_path, stream):
+    _equivalentes(corpus, tmp_path, parser_backend="lxml", stream_xml=stream)
+
+
+def test_parser_backend(tmp_path):
+    assert LattesProcessor(tmp_path, tmp_path / "out").parser_backend == "etree"
+    with pytest.raises(ValueError):
+        LattesProcessor(tmp_path, tmp_path / "out", parser_backend="sax")
+
+
+def _ler_dados(processor):
+    if processor.output_format == "parquet":
+        return pd.read_parquet(processor.parquet_dir)
+    return pd.read_parquet(processor.output_dir / "curriculos_data.parquet")
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "parquet"])
+def test_incremental_novo_alterado_removido(tmp_path, output_format):
+    base = tmp_path / "corpus"
+    generate_corpus(base, folders=2, per_folder=5, publicacoes=(0, 5), seed=3)
+    processor = LattesProcessor(base, tmp_path / "out", output_format=output_format)
+    processor.process_all(max_folders=2, incremental=True)
+    processor.apply_deltas()
+    antes = _ler_dados(processor)
+    assert processor.incremental_stats["novos"] == 10
+
+    zips = sorted(base.glob("*/*.zip"))
+    rng = Random(99)
+    alterado = zips[0]
+    _gravar_zip(alterado, build_curriculo_xml(rng, alterado.stem, formacoes=(3, 3), publicacoes=(0, 0)))
+    removido = zips[1]
+    removido.unlink()
+    quebrado = zips[6]
+    quebrado.write_bytes(b"isto nao e um zip")
+    novo = base / "01" / "9999999999999901.zip"
+    _gravar_zip(novo, build_curriculo_xml(rng, novo.stem, formacoes=(1, 1), publicacoes=(0, 0)))
+
+    processor = LattesProcessor(base, tmp_path / "out", output_format=output_format)
+    processor.process_all(max_folders=2, incremental=True)
+    stats = processor.incremental_stats
+    assert (stats["novos"], stats["alterados"], stats["removidos"], stats["erros"]) == (1, 1, 1, 1)
+    assert stats["inalterados"] == 7
+
+    # O delta só traz o tombstone do currículo que deixou de existir
+    with open(stats["delta_file"], encoding='utf-8') as f:
+        tombstones = [linha for linha in map(json.loads, f) if linha.get("removido")]
+    assert tombstones == [{"numero_identificador": removido.stem, "removido": True}]
+
+    processor.apply_deltas()
+    depois = _ler_dados(processor)
+    ids = set(depois["numero_identificador"])
+    assert removido.stem not in ids
+    assert novo.stem in ids
+    # A versão anterior do ZIP ilegível continua valendo
+    pd.testing.assert_frame_equal(
+        depois[depois["numero_identificador"] == quebrado.stem].reset_index(drop=True),
+        antes[antes["numero_identificador"] == quebrado.stem].reset_index(drop=True),
+    )
+    esperado = pd.DataFrame(flatten_curriculo(processor.read_curriculo(alterado)))
+    obtido = depois[depois["numero_identificador"] == alterado.stem].reset_index(drop=True)
+    pd.testing.assert_frame_equal(obtido[esperado.columns], esperado, check_dtype=False)
+    assert ids == set(antes["numero_identificador"]) - {removido.stem} | {novo.stem}
+
+    # Sem mudanças: nada novo, e o ZIP ilegível é tentado de novo
+    processor = LattesProcessor(base, tmp_path / "out", output_format=output_format)
+    processor.process_all(max_folders=2, incremental=True)
+    stats = processor.incremental_stats
+    assert (stats["novos"], stats["alterados"], stats["removidos"], stats["erros"]) == (0, 0, 0, 1)
+
+
+# Processo que para no meio de uma gravação (sem fechar nada), como numa queda de energia:
+# a linha fica pela metade depois do último checkpoint
+INTERROMPER = '''
+import os, sys
+from parser import LattesProcessor
+
+processor = LattesProcessor(sys.argv[1], sys.argv[2])
+original = processor.parse_curriculo
+lidos = [0]
+
+def parse_curriculo(xml_content, filename=None):
+    lidos[0] += 1
+    if lidos[0] == int(sys.argv[3]):
+        processor.writer.file.write(b'{"numero_identificador": "pela met')
+        processor.writer.file.flush()
+        os._exit(1)
+    return original(xml_content, filename)
+
+processor.parse_curriculo = parse_curriculo
+processor.process_all(max_folders=int(sys.argv[4]))
+'''
+
+
+def _interromper(base, output_dir, no_curriculo, pastas):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    resultado = subprocess.run([sys.executable, "-c", INTERROMPER, str(base), str(output_dir),
+                                str(no_curriculo), str(pastas)], env=env, capture_output=True)
+    assert resultado.returncode == 1, resultado.stderr.decode()
+
+
+def _ids_gravados(processor):
+    ids = []
+    for data_file in processor.data_files():
+        with open(data_file, encoding='utf-8') as f:
+            ids.extend(json.loads(linha)["numero_identificador"] for linha in f)
+    return ids
+
+
+def test_retomar_descarta_dados_apos_checkpoint(tmp_path):
+    base = tmp_path / "corpus"
+    generate_corpus(base, folders=2, per_folder=80, publicacoes=(0, 5), seed=3)
+    output_dir = tmp_path / "out"
+    # Checkpoint no 100º currículo (20º da pasta 01); a queda vem no 130º
+    _interromper(base, output_dir, 130, 2)
+
+    processor = LattesProcessor(base, output_dir)
+    data_offset = processor.checkpoint["data_offset"]
+    # Linhas completas além do checkpoint (lote gravado antes da queda), seguidas
+    # da linha pela metade deixada pela queda
+    with open(processor.data_file, 'rb') as f:
+        cobertas = f.read(data_offset).splitlines(keepends=True)
+    conteudo = processor.data_file.read_bytes()
+    processor.data_file.write_bytes(conteudo[:data_offset] + b"".join(cobertas[:10]) + conteudo[data_offset:])
+    assert processor.data_file.stat().st_size > data_offset
+
+    processor.process_all(max_folders=2)
+
+    ids = _ids_gravados(processor)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {zip_file.stem for zip_file in base.glob("*/*.zip")}
+    with open(processor.data_file, 'rb') as f:
+        assert f.read(data_offset).splitlines(keepends=True) == cobertas
+
+
+def test_paralelo_igual_ao_serial(corpus, curriculos_data, tmp_path):
+    processor = LattesProcessor(corpus, tmp_path / "out")
+    processor.process_all(max_folders=3, workers=3)
+    paralelo = processor.convert_to_dataframe(write_csv=False)
+
+    assert LattesProcessor(corpus, tmp_path / "out").checkpoint["last_folder"] == 2
+    serial = pd.read_parquet(curriculos_data)
+    ordem = ["numero_identificador", "tipo_formacao", "ano_inicio", "codigo_curso"]
+    pd.testing.assert_frame_equal(paralelo.sort_values(ordem, ignore_index=True),
+                                  serial.sort_values(ordem, ignore_index=True))
+
+
+def test_retomar_em_paralelo_depois_de_queda_serial(tmp_path):
+    base = tmp_path / "corpus"
+    generate_corpus(base, folders=4, per_folder=40, publicacoes=(0, 5), seed=5)
+    output_dir = tmp_path / "out"
+    # Checkpoint no 100º currículo (20º da pasta 02); a queda vem no 110º, na mesma pasta
+    _interromper(base, output_dir, 110, 4)
+
+    processor = LattesProcessor(base, output_dir)
+    assert processor.checkpoint["last_folder"] == 1
+    assert processor.checkpoint["last_file"]
+    processor.process_all(max_folders=4, workers=3)
+
+    ids = _ids_gravados(processor)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {zip_file.stem for zip_file in base.glob("*/*.zip")}
+    assert LattesProcessor(base, output_dir).checkpoint["last_folder"] == 3
+
+
+def test_retomar_em_serie_com_shards_pendentes(corpus, tmp_path):
+    processor = LattesProcessor(corpus, tmp_path / "out")
+    processor.process_all(max_folders=3, workers=3)
+    processor.checkpoint_file.unlink()
+
+    # Pastas com shard depois de last_folder seriam gravadas de novo no JSONL principal
+    with pytest.raises(ValueError):
+        LattesProcessor(corpus, tmp_path / "out").process_all(max_folders=3)
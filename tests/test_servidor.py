@@ -0,0 +1,157 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from cubo import CuboFormacoes
+from servidor import ErroConsulta, Handler, ServicoConsultas
+
+
+@pytest.fixture(scope="module")
+def servico(processados):
+    return ServicoConsultas(processados, cache_size=4)
+
+
+@pytest.fixture(scope="module")
+def url(servico):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.servico = servico
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url) as resposta:
+            return resposta.status, dict(resposta.headers), json.loads(resposta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.loads(e.read())
+
+
+def test_normalizar_ordem_e_repeticao(servico):
+    a = servico.normalizar({'por': ['genero,tipo_formacao,genero'],
+                            'tipo_formacao': ['MESTRADO,DOUTORADO'], 'genero': ['F']})
+    b = servico.normalizar({'genero': ['F'], 'tipo_formacao': ['DOUTORADO', 'MESTRADO'],
+                            'por': ['genero', 'tipo_formacao']})
+    assert a == b
+    assert a[0] == ('genero', 'tipo_formacao')
+
+
+def test_normalizar_tipos(servico):
+    _, filtros = servico.normalizar({'flag_bolsa': ['TRUE'], 'ano_conclusao': ['2010']})
+    assert dict(filtros) == {'flag_bolsa': (True,), 'ano_conclusao': (2010,)}
+
+
+def test_normalizar_recorta_intervalo_de_anos(servico):
+    minimo, maximo = servico.limites_anos['ano_conclusao']
+    _, filtros = servico.normalizar({'ano_conclusao': ['0-99999']})
+    assert dict(filtros)['ano_conclusao'] == tuple(range(minimo, maximo + 1))
+    _, invertido = servico.normalizar({'ano_conclusao': [f'{maximo}-{minimo}']})
+    assert invertido == filtros
+
+
+@pytest.mark.parametrize("params", [
+    {'por': ['inexistente']},
+    {'inexistente': ['1']},
+    {'por': ['grande_area,area']},
+    {'ano_conclusao': ['dois mil']},
+    {'flag_bolsa': ['talvez']},
+])
+def test_normalizar_invalido(servico, params):
+    with pytest.raises(ErroConsulta):
+        servico.normalizar(params)
+
+
+def test_contagem_soma_o_total(servico):
+    resultado, _ = servico.contagem({'por': ['genero']})
+    assert resultado['total'] == len(servico.df)
+    assert sum(linha['qtd'] for linha in resultado['linhas']) == resultado['total']
+
+
+def test_contagem_em_cache(servico):
+    params = {'por': ['regiao_instituicao'], 'tipo_formacao': ['DOUTORADO']}
+    primeiro, em_cache = servico.contagem(params)
+    assert not em_cache
+    segundo, em_cache = servico.contagem({'tipo_formacao': ['DOUTORADO'], 'por': ['regiao_instituicao']})
+    assert em_cache
+    assert segundo == primeiro
+    assert len(servico._cache) <= servico.cache_size
+
+
+def _linhas(df, por):
+    df = df[por + ['qtd']].astype(object)
+    return sorted(tuple(str(valor) for valor in linha) for linha in df.where(df.notna(), None).values)
+
+
+@pytest.mark.parametrize("por", [['grande_area'], ['grande_area', 'genero']])
+def test_contagem_area_filtrada_igual_ao_cubo(servico, processados, por):
+    areas = servico.pares['grande_area']['grande_area'].value_counts().index[:2].tolist()
+    resultado, _ = servico.contagem({'por': [','.join(por)], 'grande_area': [','.join(areas)]})
+    rollup = CuboFormacoes.build(processados).rollup(por, {'grande_area': areas})
+
+    obtido = pd.DataFrame(resultado['linhas'], columns=por + ['qtd'])
+    assert set(obtido['grande_area']) == set(areas)
+    assert _linhas(obtido, por) == _linhas(rollup, por)
+
+
+def test_serie(servico):
+    resultado, _ = servico.serie({'por': ['genero,ano_conclusao']})
+    assert resultado['ano'] == 'ano_conclusao'
+    assert resultado['por'] == ['genero']
+    anos = [ano for serie in resultado['series'].values() for ano in serie]
+    assert all(isinstance(ano, int) for ano in anos)
+    with pytest.raises(ErroConsulta):
+        servico.serie({'ano': ['tipo_formacao']})
+
+
+def test_http_200_e_cache(url):
+    status, headers, corpo = _get(f"{url}/contagem?por=tipo_formacao&flag_bolsa=true")
+    assert status == 200
+    assert headers['X-Cache'] == 'miss'
+    assert corpo['por'] == ['tipo_formacao']
+    _, headers, _ = _get(f"{url}/contagem?flag_bolsa=true&por=tipo_formacao")
+    assert headers['X-Cache'] == 'hit'
+
+
+def test_http_400(url):
+    status, _, corpo = _get(f"{url}/contagem?por=inexistente")
+    assert status == 400
+    assert 'inexistente' in corpo['erro']
+
+
+def test_http_404(url):
+    status, _, corpo = _get(f"{url}/nada")
+    assert status == 404
+    assert '/contagem' in corpo['rotas']
+
+
+def test_http_500(url, servico, monkeypatch):
+    def falha(por, filtros):
+        raise RuntimeError("falha simulada")
+
+    monkeypatch.setattr(servico, "_consultar_sem_cache", falha)
+    status, _, corpo = _get(f"{url}/contagem?por=genero&uf_instituicao=ZZ")
+    assert status == 500
+    assert 'falha simulada' in corpo['erro']
+
+
+def test_http_concorrente(url):
+    # Rotas novas (404) criam entradas em latencias enquanto /estatisticas as percorre
+    caminhos = []
+    for i in range(100):
+        caminhos += [f"/nada{i}", "/estatisticas", f"/contagem?por=genero&ano_conclusao={1990 + i % 30}"]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        respostas = list(executor.map(lambda caminho: _get(url + caminho), caminhos))
+
+    for caminho, (status, _, _) in zip(caminhos, respostas):
+        assert status == (404 if caminho.startswith("/nada") else 200), caminho
+    _, _, estatisticas = _get(f"{url}/estatisticas")
+    assert estatisticas['rotas']['/estatisticas']['requisicoes'] >= 100